@@ -0,0 +1,92 @@
+import hashlib
+import json
+import re
+import unicodedata
+import logging
+from typing import Any, Dict, Optional
+from cachetools import TTLCache
+from db.db_operations import db_operations
+from lib.config import analysis_cache_ttl, analysis_cache_l1_size
+from lib import metrics
+
+logger = logging.getLogger(__name__)
+
+# Parts of a message that differ between copies of the same call
+CHANNEL_NOISE_RE = re.compile(r"(https?://)?t\.me/\S+|@\w+", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = CHANNEL_NOISE_RE.sub(" ", text)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+class AnalysisCache:
+    """Analysis results keyed by message content.
+
+    A small in-process LRU sits in front of Redis so repeats within one
+    process never leave it, while Redis shares results across restarts.
+    """
+
+    def __init__(self, db, ttl: int, l1_size: int):
+        self.db = db
+        self.ttl = ttl
+        self.l1 = TTLCache(maxsize=l1_size, ttl=ttl)
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(message_text: Optional[str], image_hash: Optional[str]) -> str:
+        digest = hashlib.sha256(normalize_text(message_text).encode()).hexdigest()
+        return f"analysis:{digest}:{image_hash or '-'}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self.l1.get(key)
+        if cached is not None:
+            self.l1_hits += 1
+            metrics.cache_lookups.labels(cache="analysis", result="l1_hit").inc()
+            return dict(cached)
+
+        if self.db.redis:
+            try:
+                cached_data = await self.db.redis.get(key)
+                if cached_data:
+                    result = json.loads(cached_data)
+                    self.l1[key] = result
+                    self.l2_hits += 1
+                    metrics.cache_lookups.labels(
+                        cache="analysis", result="l2_hit"
+                    ).inc()
+                    return dict(result)
+            except Exception as e:
+                logger.error(f"Analysis cache error: {e}")
+
+        self.misses += 1
+        metrics.cache_lookups.labels(cache="analysis", result="miss").inc()
+        return None
+
+    async def set(self, key: str, result: Dict[str, Any]):
+        self.l1[key] = dict(result)
+        if self.db.redis:
+            try:
+                await self.db.redis.set(key, json.dumps(result), ex=self.ttl)
+            except Exception as e:
+                logger.error(f"Failed to cache analysis: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        hits = self.l1_hits + self.l2_hits
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "l1_size": len(self.l1),
+        }
+
+
+analysis_cache = AnalysisCache(
+    db_operations.db, ttl=analysis_cache_ttl, l1_size=analysis_cache_l1_size
+)
@@ -1,9 +1,12 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from db.db_operations import db_operations
 from lib.config import allowed_origins
-from routers import auth, user, subscription, tokens
-
+from lib.http_client import http_client
+from lib import metrics
+from trending_stream import trending_hub
+from routers import auth, user, subscription, tokens, metrics as metrics_router
 
 app = FastAPI()
 
@@ -19,16 +22,39 @@ app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(subscription.router)
 app.include_router(tokens.router)
+app.include_router(metrics_router.router)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # The route template keeps label cardinality bounded
+        route = request.scope.get("route")
+        metrics.http_request_duration.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        ).observe(time.perf_counter() - started)
 
 
 @app.on_event("startup")
 async def startup():
     await db_operations.connect()
+    db_operations.token_repo.trending_cache.start()
+    db_operations.token_repo.market_data.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await trending_hub.stop()
     await db_operations.token_repo.cleanup()
+    await http_client.close()
     await db_operations.close()
 
 
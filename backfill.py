@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from telethon.errors import FloodWaitError
+from db.db_operations import db_operations
+from lib.config import (
+    telegram_backfill_seed_limit,
+    telegram_backfill_concurrency,
+    telegram_backfill_page_size,
+)
+
+logger = logging.getLogger(__name__)
+
+AnalyzeMessage = Callable[
+    [Any, Callable[[], Awaitable[Any]]], Awaitable[Optional[Dict]]
+]
+
+
+class CheckpointTracker:
+    """Tracks the last processed message id per channel.
+
+    Messages finish out of order, so a channel's checkpoint only moves up to
+    the highest completed id below every message still in flight. A message
+    that was dropped or failed holds the checkpoint below it for the rest of
+    the run, so the next backfill picks it up again.
+
+    While a channel is being backfilled, live messages must not move its
+    checkpoint past the range still being replayed, so their ids are held
+    back and applied once the backfill of that channel finishes. If it fails
+    instead, they are dropped and the checkpoint stays where the backfill
+    left it.
+    """
+
+    def __init__(self, channel_repo):
+        self.channel_repo = channel_repo
+        self.in_flight: Dict[int, Set[int]] = {}
+        # Heaps of completed ids waiting on lower ones still in flight
+        self.completed: Dict[int, List[int]] = {}
+        # Lowest dropped or failed id; the checkpoint stays below it
+        self.abandoned: Dict[int, int] = {}
+        self.backfilling: Set[int] = set()
+        self.deferred: Dict[int, int] = {}
+
+    def track(self, channel_id: int, message_id: int):
+        """Called when a message is received, before it is handed off."""
+        self.in_flight.setdefault(channel_id, set()).add(message_id)
+
+    def abandon(self, channel_id: int, message_id: int):
+        """The message was dropped or failed; never checkpoint past it."""
+        self.in_flight.get(channel_id, set()).discard(message_id)
+        self.abandoned[channel_id] = min(
+            self.abandoned.get(channel_id, message_id), message_id
+        )
+
+    async def complete(self, channel_id: int, message_id: int):
+        """The message was fully handled; advances as far as is contiguous."""
+        in_flight = self.in_flight.get(channel_id, set())
+        in_flight.discard(message_id)
+        abandoned = self.abandoned.get(channel_id)
+        if abandoned is not None and message_id > abandoned:
+            return  # Can never become the checkpoint during this run
+
+        # Every tracked id below the bound has completed
+        bound = min(in_flight, default=None)
+        if abandoned is not None and (bound is None or abandoned < bound):
+            bound = abandoned
+
+        completed = self.completed.setdefault(channel_id, [])
+        heapq.heappush(completed, message_id)
+        checkpoint = None
+        while completed and (bound is None or completed[0] < bound):
+            checkpoint = heapq.heappop(completed)
+        if checkpoint is not None:
+            await self.advance(channel_id, checkpoint)
+
+    async def advance(self, channel_id: int, message_id: int):
+        if channel_id in self.backfilling:
+            self.deferred[channel_id] = max(
+                self.deferred.get(channel_id, 0), message_id
+            )
+            return
+        try:
+            await self.channel_repo.update_checkpoint(channel_id, message_id)
+        except Exception as e:
+            logger.error(f"Failed to update checkpoint for {channel_id}: {e}")
+
+    def begin(self, channel_id: int):
+        self.backfilling.add(channel_id)
+
+    async def finish(self, channel_id: int):
+        self.backfilling.discard(channel_id)
+        deferred = self.deferred.pop(channel_id, None)
+        if deferred:
+            await self.advance(channel_id, deferred)
+
+    def fail(self, channel_id: int):
+        """The backfill did not get through its range; keep the checkpoint
+        below the gap for the rest of the run."""
+        self.backfilling.discard(channel_id)
+        self.deferred.pop(channel_id, None)
+        # Below every message id, so no later completion can advance it
+        self.abandon(channel_id, 0)
+
+
+PublishMessage = Callable[[Any, Any], Awaitable[Any]]
+
+
+def _completed_prefix(messages: List[Any], results: List[Any]):
+    """Cuts a page at its first failed message; the next backfill resumes
+    from it."""
+    failed = next(
+        (i for i, result in enumerate(results) if isinstance(result, Exception)),
+        None,
+    )
+    if failed is None:
+        return messages, results, None
+    return messages[:failed], results[:failed], results[failed]
+
+
+async def _advance(channel, messages: List[Any]):
+    if messages:
+        # Written through directly; `advance` would defer it during the backfill
+        await db_operations.channel_repo.update_checkpoint(
+            channel.id, max(message.id for message in messages)
+        )
+
+
+async def _process_page(channel, messages: List[Any], analyze: AnalyzeMessage):
+    async def get_chat():
+        return channel
+
+    results = await asyncio.gather(
+        *(analyze(message, get_chat) for message in messages),
+        return_exceptions=True,
+    )
+    messages, results, error = _completed_prefix(messages, results)
+
+    alpha_calls = [result for result in results if result]
+    if alpha_calls:
+        await db_operations.token_repo.save_alpha_calls(alpha_calls)
+
+    await _advance(channel, messages)
+    if error is not None:
+        raise error
+    return len(alpha_calls)
+
+
+async def _publish_page(channel, messages: List[Any], publish: PublishMessage):
+    """Hands a page to the stream workers; published counts as handled."""
+    results = await asyncio.gather(
+        *(publish(message, channel) for message in messages),
+        return_exceptions=True,
+    )
+    messages, _, error = _completed_prefix(messages, results)
+    await _advance(channel, messages)
+    if error is not None:
+        raise error
+    return 0
+
+
+async def backfill_channel(
+    client,
+    channel,
+    analyze: AnalyzeMessage,
+    last_id: Optional[int],
+    publish: Optional[PublishMessage] = None,
+):
+    """Replays the channel's messages after `last_id`. They are analyzed
+    here, or with `publish` handed to the stream workers like live ones."""
+    latest = await client.get_messages(channel.input_peer(), limit=1)
+    if not latest:
+        return
+    # Everything above this id arrives through the live handler
+    max_id = latest[0].id + 1
+
+    if last_id is None:
+        # New channel: seed it with its most recent history
+        last_id = max(0, max_id - 1 - telegram_backfill_seed_limit)
+
+    async def process_page(page):
+        if publish:
+            return await _publish_page(channel, page, publish)
+        return await _process_page(channel, page, analyze)
+
+    processed = 0
+    saved = 0
+    while last_id < max_id - 1:
+        page = []
+        try:
+            async for message in client.iter_messages(
+                channel.input_peer(), min_id=last_id, max_id=max_id, reverse=True
+            ):
+                page.append(message)
+                if len(page) >= telegram_backfill_page_size:
+                    saved += await process_page(page)
+                    processed += len(page)
+                    last_id = page[-1].id
+                    page = []
+            if page:
+                saved += await process_page(page)
+                processed += len(page)
+            break
+        except FloodWaitError as e:
+            # Longer than the client's flood_sleep_threshold; resume from
+            # the last completed page once the wait is over
+            logger.warning(f"Flood wait of {e.seconds}s while backfilling {channel.id}")
+            await asyncio.sleep(e.seconds)
+
+    outcome = "published to the stream" if publish else f"{saved} alpha calls saved"
+    logger.info(
+        f"Backfilled {processed} messages from {getattr(channel, 'title', channel.id)}, "
+        f"{outcome}"
+    )
+
+
+async def backfill_channels(
+    client,
+    channels: List[Any],
+    analyze: AnalyzeMessage,
+    checkpoints,
+    publish: Optional[PublishMessage] = None,
+):
+    semaphore = asyncio.Semaphore(telegram_backfill_concurrency)
+    # Hold back live checkpoint updates before reading the stored ones
+    for channel in channels:
+        checkpoints.begin(channel.id)
+    try:
+        stored = await db_operations.channel_repo.get_checkpoints()
+    except Exception as e:
+        # Without them live messages could move a checkpoint past the gap
+        logger.error(f"Skipping backfill, checkpoints could not be read: {e}")
+        for channel in channels:
+            checkpoints.fail(channel.id)
+        return
+
+    async def run(channel):
+        try:
+            async with semaphore:
+                await backfill_channel(
+                    client, channel, analyze, stored.get(channel.id), publish
+                )
+        except asyncio.CancelledError:
+            checkpoints.fail(channel.id)
+            raise
+        except Exception as e:
+            logger.error(f"Backfill failed for {channel.id}: {e}")
+            checkpoints.fail(channel.id)
+        else:
+            await checkpoints.finish(channel.id)
+
+    await asyncio.gather(*(run(channel) for channel in channels))
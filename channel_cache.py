@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from telethon.errors import FloodWaitError
+from telethon.tl.types import InputPeerChannel
+from db.db_operations import db_operations
+from lib.config import channel_metadata_refresh_interval
+
+logger = logging.getLogger(__name__)
+
+CHANNELS_KEY = "telegram_channels"  # channel id -> ChannelInfo json
+USERNAMES_KEY = "telegram_channel_usernames"  # lowercase username -> channel id
+
+# Pause between refresh lookups so a long channel list can't trip flood limits
+REFRESH_SPACING = 2
+
+
+class ChannelInfo(BaseModel):
+    """What we need about a channel; also usable as the `chat` of a message."""
+
+    id: int
+    access_hash: Optional[int] = None
+    title: Optional[str] = None
+    username: Optional[str] = None
+    updated_at: float = 0
+
+    @classmethod
+    def from_entity(cls, entity) -> "ChannelInfo":
+        return cls(
+            id=entity.id,
+            access_hash=getattr(entity, "access_hash", None),
+            title=getattr(entity, "title", None),
+            username=getattr(entity, "username", None),
+            updated_at=time.time(),
+        )
+
+    def input_peer(self) -> InputPeerChannel:
+        return InputPeerChannel(self.id, self.access_hash)
+
+
+class ChannelMetadataCache:
+    """Channel id -> id, access hash, title and username.
+
+    Persisted in Redis so restarts resolve configured usernames without
+    `get_entity` calls. Messages take their chat title and username from it
+    instead of calling `get_chat()`. A background task re-fetches each
+    channel every `refresh_interval` seconds to pick up renames.
+    """
+
+    def __init__(self, db, refresh_interval: float):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.channels: Dict[int, ChannelInfo] = {}
+        self.usernames: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self):
+        if not self.db.redis:
+            return
+        try:
+            channels = await self.db.redis.hgetall(CHANNELS_KEY)
+            usernames = await self.db.redis.hgetall(USERNAMES_KEY)
+        except Exception as e:
+            logger.error(f"Error loading channel metadata: {e}")
+            return
+        for data in channels.values():
+            info = ChannelInfo.model_validate_json(data)
+            self.channels[info.id] = info
+        for username, channel_id in usernames.items():
+            username = username.decode() if isinstance(username, bytes) else username
+            self.usernames[username] = int(channel_id)
+        logger.info(f"Loaded metadata for {len(self.channels)} channels")
+
+    async def store(self, info: ChannelInfo, *usernames: str):
+        self.channels[info.id] = info
+        names = {name.lower() for name in (info.username, *usernames) if name}
+        for name in names:
+            self.usernames[name] = info.id
+        if not self.db.redis:
+            return
+        try:
+            pipe = self.db.redis.pipeline(transaction=False)
+            pipe.hset(CHANNELS_KEY, str(info.id), info.model_dump_json())
+            for name in names:
+                pipe.hset(USERNAMES_KEY, name, str(info.id))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to store channel metadata: {e}")
+
+    def get(self, channel_id: int) -> Optional[ChannelInfo]:
+        return self.channels.get(channel_id)
+
+    async def resolve(self, client, usernames: List[str]) -> List[ChannelInfo]:
+        """Configured usernames -> channels, calling Telegram only for new ones."""
+        await self.load()
+        resolved = []
+        for username in usernames:
+            username = username.strip()
+            if not username:
+                continue
+            channel_id = self.usernames.get(username.lower().lstrip("@"))
+            info = self.channels.get(channel_id) if channel_id else None
+            if info is None or info.access_hash is None:
+                entity = await client.get_entity(username)
+                info = ChannelInfo.from_entity(entity)
+                await self.store(info, username.lower().lstrip("@"))
+            resolved.append(info)
+        return resolved
+
+    def chat_getter(self, event):
+        """A `get_chat` for `event` that prefers the cached channel."""
+
+        async def get_chat():
+            channel_id = getattr(event.message.peer_id, "channel_id", None)
+            info = self.channels.get(channel_id) if channel_id else None
+            if info:
+                self.hits += 1
+                return info
+            self.misses += 1
+            chat = await event.get_chat()
+            if channel_id and chat is not None:
+                await self.store(ChannelInfo.from_entity(chat))
+            return chat
+
+        return get_chat
+
+    async def refresh(self, client):
+        """Keeps titles and usernames current; runs until cancelled."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            for info in list(self.channels.values()):
+                if time.time() - info.updated_at < self.refresh_interval:
+                    continue
+                try:
+                    entity = await client.get_entity(info.input_peer())
+                    await self.store(ChannelInfo.from_entity(entity))
+                except FloodWaitError as e:
+                    logger.warning(f"Flood wait of {e.seconds}s refreshing channels")
+                    await asyncio.sleep(e.seconds)
+                except Exception as e:
+                    logger.error(f"Failed to refresh channel {info.id}: {e}")
+                await asyncio.sleep(REFRESH_SPACING)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "channels": len(self.channels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+channel_cache = ChannelMetadataCache(
+    db_operations.db, refresh_interval=channel_metadata_refresh_interval
+)
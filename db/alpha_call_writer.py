@@ -0,0 +1,190 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from dateutil.parser import parse
+from db.utils import logger
+from lib import metrics
+
+ALPHA_CALL_COLUMNS = (
+    "token_ticker",
+    "token_address",
+    "token_name",
+    "token_image",
+    "network",
+    "additional_info",
+    "channel_name",
+    "message_url",
+    "date",
+    "long_term",
+)
+
+
+def to_naive_utc(value: Union[datetime, str]) -> datetime:
+    """alpha_calls.date is a UTC TIMESTAMP without time zone."""
+    # Strings are only parsed for older callers; live messages pass datetimes
+    date = parse(value) if isinstance(value, str) else value
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+class AlphaCallRecord(NamedTuple):
+    """One alpha_calls row, in ALPHA_CALL_COLUMNS order."""
+
+    token_ticker: str
+    token_address: str
+    token_name: Optional[str]
+    token_image: Optional[str]
+    network: str
+    additional_info: Optional[str]
+    channel_name: str
+    message_url: str
+    date: datetime
+    long_term: bool
+
+    @classmethod
+    def from_alpha_call(cls, alpha_call: Dict[str, Any]) -> "AlphaCallRecord":
+        return cls(
+            alpha_call["token_ticker"],
+            alpha_call["token_address"],
+            alpha_call.get("token_name"),
+            alpha_call.get("token_image"),
+            alpha_call["network"],
+            alpha_call.get("additional_info"),
+            alpha_call["channel_name"],
+            alpha_call["message_url"],
+            to_naive_utc(alpha_call["date"]),
+            bool(alpha_call.get("long_term", False)),
+        )
+
+
+class AlphaCallWriter:
+    """Write-behind buffer for alpha_calls inserts.
+
+    Records are collected and written with COPY in one transaction (see
+    `TokenRepository.insert_alpha_calls`) once `batch_size` are pending or
+    `flush_interval` seconds have passed. Each `submit` returns a future that
+    resolves once its record is committed (or was already saved), or carries
+    the error if it could not be. If a batch fails, it is retried row by row
+    so one bad record does not fail the others.
+    """
+
+    def __init__(
+        self,
+        repo,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+        on_written: Optional[Callable[[List[AlphaCallRecord]], None]] = None,
+    ):
+        self.repo = repo
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_written = on_written
+        self.buffer: List[Tuple[AlphaCallRecord, asyncio.Future]] = []
+        self.flush_lock = asyncio.Lock()
+        self.flusher: Optional[asyncio.Task] = None
+        self.stopping: Optional[asyncio.Event] = None
+        self.flush_tasks = set()
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self):
+        if self.flusher is None:
+            self.stopping = asyncio.Event()
+            self.flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Writes everything submitted so far, then returns to write-through."""
+        if self.flusher:
+            # Not cancelled: a batch it has taken out of the buffer would be
+            # rolled back and lost
+            self.stopping.set()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        if self.flush_tasks:
+            await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+        await self.flush()
+
+    async def submit(self, record: AlphaCallRecord) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.buffer.append((record, future))
+        if self.flusher is None or len(self.buffer) >= self.max_pending:
+            # Not started (write-through), or writes are falling behind and
+            # the producer has to wait for them
+            await self.flush()
+        elif len(self.buffer) >= self.batch_size:
+            task = asyncio.create_task(self.flush())
+            self.flush_tasks.add(task)
+            task.add_done_callback(self.flush_tasks.discard)
+        return future
+
+    async def write(self, record: AlphaCallRecord):
+        await (await self.submit(record))
+
+    async def flush(self):
+        async with self.flush_lock:
+            while self.buffer:
+                batch = self.buffer[: self.batch_size]
+                del self.buffer[: self.batch_size]
+                await self._write_batch(batch)
+
+    async def _flush_periodically(self):
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Alpha call flush failed: {e}")
+
+    async def _write_batch(self, batch: List[Tuple[AlphaCallRecord, asyncio.Future]]):
+        records = [record for record, _ in batch]
+        try:
+            with metrics.timed(metrics.alpha_call_insert_duration):
+                inserted = await self.repo.insert_alpha_calls(records)
+            self.batches += 1
+            self._written(batch, inserted)
+        except Exception as e:
+            logger.error(f"COPY of {len(batch)} alpha calls failed, retrying rows: {e}")
+            for item in batch:
+                try:
+                    inserted = await self.repo.insert_alpha_calls([item[0]])
+                    self._written([item], inserted)
+                except Exception as row_error:
+                    self.failed += 1
+                    metrics.alpha_call_inserts.labels(outcome="failed").inc()
+                    if not item[1].done():
+                        item[1].set_exception(row_error)
+
+    def _written(
+        self,
+        batch: List[Tuple[AlphaCallRecord, asyncio.Future]],
+        inserted: List[AlphaCallRecord],
+    ):
+        self.written += len(inserted)
+        metrics.alpha_call_inserts.labels(outcome="written").inc(len(inserted))
+        if len(inserted) < len(batch):
+            metrics.alpha_call_inserts.labels(outcome="duplicate").inc(
+                len(batch) - len(inserted)
+            )
+        if self.on_written and inserted:
+            try:
+                self.on_written(inserted)
+            except Exception as e:
+                logger.error(f"Alpha call write callback failed: {e}")
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self.buffer),
+            "batches": self.batches,
+            "written": self.written,
+            "failed": self.failed,
+        }
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
 
 
 class Repository(ABC):
@@ -10,6 +11,15 @@ class Repository(ABC):
     async def execute(self, query: str, *args) -> Any:
         pass
 
+    @abstractmethod
+    async def executemany(self, query: str, args: list[tuple]) -> None:
+        pass
+
+    @abstractmethod
+    def transaction(self) -> AsyncIterator[Any]:
+        """Async context manager yielding a connection inside a transaction."""
+        pass
+
     @abstractmethod
     async def fetch(self, query: str, *args) -> list[Any]:
         pass
@@ -24,6 +34,17 @@ class PostgresRepository(Repository):
         async with self.db.pool.acquire() as conn:
             return await conn.execute(query, *args)
 
+    async def executemany(self, query: str, args: list[tuple]) -> None:
+        async with self.db.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(query, args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.db.pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+
     async def fetch(self, query: str, *args) -> list[Any]:
         async with self.db.pool.acquire() as conn:
             return await conn.fetch(query, *args)
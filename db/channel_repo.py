@@ -0,0 +1,27 @@
+from typing import Dict
+from db.base_repo import PostgresRepository
+
+
+class ChannelRepository(PostgresRepository):
+    async def get_checkpoints(self) -> Dict[int, int]:
+        # Raises: an empty result would re-seed every channel from scratch
+        rows = await self.fetch(
+            "SELECT channel_id, last_message_id FROM channel_checkpoints"
+        )
+        return {row["channel_id"]: row["last_message_id"] for row in rows}
+
+    async def update_checkpoint(self, channel_id: int, message_id: int):
+        # Never move a checkpoint backwards; workers can finish out of order
+        await self.execute(
+            """
+            INSERT INTO channel_checkpoints (channel_id, last_message_id)
+            VALUES ($1, $2)
+            ON CONFLICT (channel_id) DO UPDATE
+            SET last_message_id = GREATEST(
+                    channel_checkpoints.last_message_id, EXCLUDED.last_message_id
+                ),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            channel_id,
+            message_id,
+        )
@@ -13,6 +13,7 @@ from aioredis import Redis
 from abc import ABC, abstractmethod
 from db.user_repo import UserRepository
 from db.token_repo import TokenRepository
+from db.channel_repo import ChannelRepository
 from db.utils import logger
 
 
@@ -60,6 +61,7 @@ class DatabaseOperations:
         self.db = db
         self.user_repo = UserRepository(db)
         self.token_repo = TokenRepository(db)
+        self.channel_repo = ChannelRepository(db)
 
     async def connect(self):
         await self.db.connect()
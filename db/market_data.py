@@ -0,0 +1,280 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+from db.utils import logger
+from db.trending_cache import RELEASE_LOCK_SCRIPT
+from lib.http_client import http_client
+from lib.config import dexscreener_api_url
+
+# Maximum number of addresses DexScreener accepts per /tokens request
+DEXSCREENER_TOKENS_BATCH_SIZE = 30
+
+MARKET_DATA_FIELDS = ("pair", "price", "h24_change", "h24_volume")
+
+CACHE_KEY = "dex_data:{}"
+UNKNOWN_KEY = "dex_data:unknown:{}"  # DexScreener had no pairs for it
+TRACKED_KEY = "market_data:tracked"  # address -> last time it was served
+LEADER_KEY = "market_data:refresher"
+
+# Extends the leader lease only while we still hold it
+RENEW_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class MarketData:
+    """DexScreener market data for trending tokens, cached in Redis.
+
+    Requests read `dex_data:{address}` with one MGET and fetch only what is
+    missing, once per address however many requests need it. Addresses
+    served in trending responses are tracked, and a background refresher
+    re-fetches them before their entries expire, so requests for tokens
+    that are still trending find them warm. One process across all API
+    workers runs the refresher, holding a leader lease in Redis. Addresses
+    DexScreener answered without pairs are cached as unknown for
+    `negative_ttl` and neither fetched nor refreshed meanwhile; failed
+    requests are not cached.
+    """
+
+    def __init__(
+        self,
+        db,
+        ttl: int,
+        negative_ttl: int,
+        refresh_interval: float,
+        track_ttl: float,
+        max_concurrency: int,
+    ):
+        self.db = db
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_interval = refresh_interval
+        self.track_ttl = track_ttl
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.refresher: Optional[asyncio.Task] = None
+        self.leader = False
+        self.fetched = 0
+        self.unknown = 0
+        self.coalesced = 0
+        self.refreshed = 0
+
+    async def get_many(self, addresses: List[str]) -> Dict[str, dict]:
+        """Market data per address, from cache or fetched if missing."""
+        addresses = list(dict.fromkeys(address for address in addresses if address))
+        if not addresses:
+            return {}
+
+        found: Dict[str, dict] = {}
+        unknown: Set[str] = set()
+        if self.db.redis:
+            try:
+                pipe = self.db.redis.pipeline(transaction=False)
+                pipe.mget(
+                    [CACHE_KEY.format(address) for address in addresses]
+                    + [UNKNOWN_KEY.format(address) for address in addresses]
+                )
+                # Keeps the refresher interested in what is being served
+                now = time.time()
+                pipe.zadd(TRACKED_KEY, {address: now for address in addresses})
+                cached, _ = await pipe.execute()
+                found = {
+                    address: json.loads(data)
+                    for address, data in zip(addresses, cached)
+                    if data
+                }
+                unknown = {
+                    address
+                    for address, flag in zip(addresses, cached[len(addresses) :])
+                    if flag
+                }
+            except Exception as e:
+                logger.error(f"Cache error: {e}")
+
+        missing = [
+            address
+            for address in addresses
+            if address not in found and address not in unknown
+        ]
+        if missing:
+            found.update(await self.fetch(missing))
+        return found
+
+    async def fetch(self, addresses: List[str]) -> Dict[str, dict]:
+        """Fetches and caches `addresses`; joins fetches already running."""
+        tasks: Dict[str, asyncio.Task] = {}
+        new = []
+        for address in addresses:
+            if address in self.inflight:
+                tasks[address] = self.inflight[address]
+                self.coalesced += 1
+            else:
+                new.append(address)
+
+        if new:
+            task = asyncio.create_task(self._fetch(new))
+            for address in new:
+                self.inflight[address] = tasks[address] = task
+
+            def done(_, new=new, task=task):
+                for address in new:
+                    if self.inflight.get(address) is task:
+                        del self.inflight[address]
+
+            task.add_done_callback(done)
+
+        results: Dict[str, dict] = {}
+        for task in set(tasks.values()):
+            # A cancelled request must not cancel a fetch others are waiting on
+            results.update(await asyncio.shield(task))
+        return {
+            address: results[address] for address in addresses if address in results
+        }
+
+    async def _fetch(self, addresses: List[str]) -> Dict[str, dict]:
+        chunks = [
+            addresses[i : i + DEXSCREENER_TOKENS_BATCH_SIZE]
+            for i in range(0, len(addresses), DEXSCREENER_TOKENS_BATCH_SIZE)
+        ]
+        responses = await asyncio.gather(*(self.fetch_pairs(chunk) for chunk in chunks))
+
+        # The first pair listed for a token is the one we report
+        pairs: Dict[str, dict] = {}
+        answered: Set[str] = set()
+        for chunk, response in zip(chunks, responses):
+            if response is None:
+                continue  # Failed; not evidence that the token is unknown
+            answered.update(chunk)
+            for pair in response:
+                try:
+                    pairs.setdefault(pair["baseToken"]["address"].lower(), pair)
+                except (KeyError, TypeError, AttributeError):
+                    logger.warning(f"Ignoring malformed DexScreener pair: {pair}")
+
+        fetched = {}
+        unknown = []
+        for address in addresses:
+            pair = pairs.get(address.lower())
+            if pair:
+                # New pairs often come without price change or volume yet
+                fetched[address] = {
+                    "pair": f"{pair['baseToken'].get('symbol')}/"
+                    f"{(pair.get('quoteToken') or {}).get('symbol')}",
+                    "price": pair.get("priceUsd", 0),
+                    "h24_change": (pair.get("priceChange") or {}).get("h24"),
+                    "h24_volume": (pair.get("volume") or {}).get("h24"),
+                }
+            else:
+                logger.warning(f"Failed to fetch data from DexScreener for {address}")
+                if address in answered:
+                    unknown.append(address)
+        self.fetched += len(fetched)
+        self.unknown += len(unknown)
+
+        if self.db.redis and (fetched or unknown):
+            try:
+                pipe = self.db.redis.pipeline(transaction=False)
+                for address, data in fetched.items():
+                    pipe.set(CACHE_KEY.format(address), json.dumps(data), ex=self.ttl)
+                for address in unknown:
+                    pipe.set(UNKNOWN_KEY.format(address), 1, ex=self.negative_ttl)
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to set redis: {e}")
+        return fetched
+
+    async def fetch_pairs(self, addresses: List[str]) -> Optional[List[dict]]:
+        """Pairs of `addresses`, or None if the request failed."""
+        dex_url = f"{dexscreener_api_url}/latest/dex/tokens/{','.join(addresses)}"
+        async with self.semaphore:
+            try:
+                dex_data = await http_client.get_json(dex_url)
+                return dex_data.get("pairs") or []
+            except Exception as e:
+                logger.error(f"Error fetching DexScreener data: {e}")
+                return None
+
+    def start(self):
+        if self.refresher is None and self.db.redis:
+            self.refresher = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.refresher:
+            self.refresher.cancel()
+            await asyncio.gather(self.refresher, return_exceptions=True)
+            self.refresher = None
+
+    async def run(self):
+        """Refreshes tracked addresses while holding the leader lease."""
+        token = uuid.uuid4().hex
+        # Lapses if the leader dies, so another worker takes over
+        lease = int(self.refresh_interval * 3)
+        try:
+            while True:
+                try:
+                    if self.leader:
+                        self.leader = bool(
+                            await self.db.redis.eval(
+                                RENEW_LOCK_SCRIPT, 1, LEADER_KEY, token, lease
+                            )
+                        )
+                    else:
+                        self.leader = bool(
+                            await self.db.redis.set(
+                                LEADER_KEY, token, ex=lease, nx=True
+                            )
+                        )
+                        if self.leader:
+                            logger.info("Market data refresher elected leader")
+                    if self.leader:
+                        await self.refresh()
+                except Exception as e:
+                    logger.error(f"Market data refresh error: {e}")
+                await asyncio.sleep(self.refresh_interval)
+        finally:
+            if self.leader:
+                self.leader = False
+                await self.db.redis.eval(RELEASE_LOCK_SCRIPT, 1, LEADER_KEY, token)
+
+    async def refresh(self):
+        """Re-fetches tracked entries that would expire before the next run."""
+        redis = self.db.redis
+        now = time.time()
+        await redis.zremrangebyscore(TRACKED_KEY, "-inf", now - self.track_ttl)
+        addresses = [
+            member.decode() if isinstance(member, bytes) else member
+            for member in await redis.zrange(TRACKED_KEY, 0, -1)
+        ]
+        if not addresses:
+            return
+
+        pipe = redis.pipeline(transaction=False)
+        for address in addresses:
+            pipe.ttl(CACHE_KEY.format(address))
+            pipe.exists(UNKNOWN_KEY.format(address))
+        results = await pipe.execute()
+        # Missing keys report -2; one more interval plus a margin for the fetch
+        due = [
+            address
+            for address, ttl, unknown in zip(addresses, results[::2], results[1::2])
+            if ttl < self.refresh_interval * 1.5 and not unknown
+        ]
+        if due:
+            # Through `fetch` so requests missing the same addresses join in
+            refreshed = await self.fetch(due)
+            self.refreshed += len(refreshed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leader": self.leader,
+            "fetched": self.fetched,
+            "unknown": self.unknown,
+            "coalesced": self.coalesced,
+            "refreshed": self.refreshed,
+            "inflight": len(self.inflight),
+        }
@@ -0,0 +1,232 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from db.utils import logger
+from db.trending_cache import RELEASE_LOCK_SCRIPT
+
+BUCKET_KEY = "trending:mentions:{:%Y%m%d%H}"  # token member -> mentions that hour
+LATEST_KEY = "trending:latest"  # token member -> latest mention (epoch seconds)
+TOKEN_KEY = "trending:token:{}"  # token member -> hash of name and image
+SEEDED_KEY = "trending:seeded"
+SEED_LOCK_KEY = "trending:seeding"
+SEED_LOCK_TTL = 300
+# Temporary sets of `top`; normally deleted right away, this covers a crash
+UNION_TTL = 60
+
+# ZADD GT for servers older than Redis 6.2
+SET_LATEST_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    local current = redis.call("zscore", KEYS[1], ARGV[i + 1])
+    if not current or tonumber(current) < tonumber(ARGV[i]) then
+        redis.call("zadd", KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return 0
+"""
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def token_member(ticker: str, network: str, address: Optional[str]) -> str:
+    return f"{ticker}|{network}|{address or ''}"
+
+
+def epoch(date: datetime) -> float:
+    """alpha_calls dates are naive UTC."""
+    return date.replace(tzinfo=timezone.utc).timestamp()
+
+
+class MentionCounters:
+    """Per-hour mention counts in Redis sorted sets.
+
+    Every written alpha call ZINCRBYs its token in the sorted set of its
+    hour; a window is answered by ZUNIONSTOREing the hours it spans and
+    taking the top N, so trending cost depends on the number of tokens in
+    the window rather than on the size of alpha_calls. Windows are rounded
+    out to whole hours. Buckets expire once older than `max_window`; the
+    latest-mention scores and token hashes are kept over the same horizon,
+    so every member of a bucket still has them.
+
+    The sets are seeded from alpha_call_rollups when Redis has none, by the
+    ingester only. A seed overwrites each hour, so increments made by other
+    processes while it runs can be lost for the current hour.
+    """
+
+    def __init__(self, db, max_window: timedelta):
+        self.db = db
+        self.max_window = max_window
+        # A window rounded out to whole hours reaches one hour further back
+        self.horizon = max_window + timedelta(hours=1)
+
+    def covers(self, time_window: timedelta) -> bool:
+        return self.db.redis is not None and time_window <= self.max_window
+
+    def _bucket_expiry(self, bucket: datetime) -> int:
+        return int(epoch(bucket + self.horizon))
+
+    def bucket_keys(self, start: datetime, end: datetime) -> List[str]:
+        hour = start.replace(minute=0, second=0, microsecond=0)
+        keys = []
+        while hour <= end:
+            keys.append(BUCKET_KEY.format(hour))
+            hour += timedelta(hours=1)
+        return keys
+
+    async def record(self, rollups: List[tuple]):
+        """Adds rows shaped like alpha_call_rollups (see `rollup_rows`)."""
+        if not self.db.redis or not rollups:
+            return
+        ttl = int(self.horizon.total_seconds())
+        latest: Dict[str, float] = {}
+        pipe = self.db.redis.pipeline(transaction=False)
+        for bucket, ticker, network, address, count, date, name, image in rollups:
+            key = BUCKET_KEY.format(bucket)
+            member = token_member(ticker, network, address)
+            pipe.zincrby(key, count, member)
+            pipe.expireat(key, self._bucket_expiry(bucket))
+            metadata = {
+                field: value
+                for field, value in (("token_name", name), ("token_image", image))
+                if value
+            }
+            if metadata:
+                pipe.hset(TOKEN_KEY.format(member), mapping=metadata)
+            pipe.expire(TOKEN_KEY.format(member), ttl)
+            latest[member] = max(latest.get(member, 0), epoch(date))
+        args = [value for member, ts in latest.items() for value in (ts, member)]
+        pipe.eval(SET_LATEST_SCRIPT, 1, LATEST_KEY, *args)
+        now = datetime.now(timezone.utc).timestamp()
+        pipe.zremrangebyscore(LATEST_KEY, "-inf", now - ttl)
+        await pipe.execute()
+
+    async def seed(self, repo, force: bool = False):
+        """Loads the last `max_window` of rollups unless already seeded."""
+        redis = self.db.redis
+        if not redis or (not force and await redis.exists(SEEDED_KEY)):
+            return
+        lock = uuid.uuid4().hex
+        if not await redis.set(SEED_LOCK_KEY, lock, ex=SEED_LOCK_TTL, nx=True):
+            return  # Another process is seeding
+
+        try:
+            since = datetime.now(timezone.utc).replace(tzinfo=None) - self.max_window
+            rows = await repo.fetch(
+                """
+                SELECT
+                    bucket, token_ticker, network, token_address, mention_count,
+                    latest_date, token_name, token_image
+                FROM alpha_call_rollups
+                WHERE bucket >= $1
+                """,
+                since.replace(minute=0, second=0, microsecond=0),
+            )
+            buckets: Dict[datetime, Dict[str, int]] = {}
+            for row in rows:
+                member = token_member(
+                    row["token_ticker"], row["network"], row["token_address"]
+                )
+                buckets.setdefault(row["bucket"], {})[member] = row["mention_count"]
+
+            pipe = redis.pipeline(transaction=False)
+            for bucket, counts in buckets.items():
+                # Built aside and renamed, so readers never see a partial hour
+                staging = f"{BUCKET_KEY.format(bucket)}:seed"
+                pipe.delete(staging)
+                pipe.zadd(staging, counts)
+                pipe.rename(staging, BUCKET_KEY.format(bucket))
+                pipe.expireat(BUCKET_KEY.format(bucket), self._bucket_expiry(bucket))
+            await pipe.execute()
+            # Names, images and latest dates; counts were set above
+            await self.record(
+                [
+                    (
+                        row["bucket"],
+                        row["token_ticker"],
+                        row["network"],
+                        row["token_address"],
+                        0,
+                        row["latest_date"],
+                        row["token_name"],
+                        row["token_image"],
+                    )
+                    for row in rows
+                ]
+            )
+            await redis.set(SEEDED_KEY, datetime.now(timezone.utc).isoformat())
+            logger.info(
+                f"Seeded mention counters with {len(rows)} rollups "
+                f"in {len(buckets)} hours"
+            )
+        finally:
+            await redis.eval(RELEASE_LOCK_SCRIPT, 1, SEED_LOCK_KEY, lock)
+
+    async def top(
+        self, start: datetime, limit: int, sort_by: str, sort_order: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Trending rows since `start` (naive UTC), or None when not seeded.
+
+        Rows have the columns of the trending SQL query. `sort_by` is
+        mention_count or latest_date.
+        """
+        redis = self.db.redis
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        keys = self.bucket_keys(start, now)
+
+        union = f"trending:union:{uuid.uuid4().hex}"
+        by_latest = f"{union}:latest"
+        ranked = by_latest if sort_by == "latest_date" else union
+        pipe = redis.pipeline(transaction=True)
+        pipe.exists(SEEDED_KEY)
+        pipe.zunionstore(union, keys)
+        pipe.expire(union, UNION_TTL)
+        if ranked == by_latest:
+            # Members of the window scored by their latest mention
+            pipe.zinterstore(by_latest, {union: 0, LATEST_KEY: 1})
+            pipe.expire(by_latest, UNION_TTL)
+        if sort_order == "desc":
+            pipe.zrevrange(ranked, 0, limit - 1, withscores=True)
+        else:
+            pipe.zrange(ranked, 0, limit - 1, withscores=True)
+        results = await pipe.execute()
+        seeded, ranking = results[0], results[-1]
+        if not seeded:
+            await redis.delete(union, by_latest)
+            return None
+
+        members = [_decode(member) for member, _ in ranking]
+        pipe = redis.pipeline(transaction=False)
+        for member in members:
+            if ranked == by_latest:
+                pipe.zscore(union, member)
+            else:
+                pipe.zscore(LATEST_KEY, member)
+            pipe.hgetall(TOKEN_KEY.format(member))
+        pipe.delete(union, by_latest)
+        results = await pipe.execute()
+
+        rows = []
+        for i, (member, score) in enumerate(ranking):
+            other, metadata = results[2 * i], results[2 * i + 1]
+            count, latest = (other, score) if ranked == by_latest else (score, other)
+            metadata = {_decode(key): _decode(value) for key, value in metadata.items()}
+            ticker, network, address = members[i].split("|", 2)
+            rows.append(
+                {
+                    "token_ticker": ticker,
+                    "network": network,
+                    "token_address": address or None,
+                    "token_name": metadata.get("token_name"),
+                    "token_image": metadata.get("token_image"),
+                    "mention_count": int(count or 0),
+                    "latest_date": (
+                        datetime.fromtimestamp(latest, timezone.utc).replace(
+                            tzinfo=None
+                        )
+                        if latest
+                        else None
+                    ),
+                }
+            )
+        return rows
@@ -0,0 +1,69 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class TickerIndex:
+    """In-memory ticker -> network/address mention counts.
+
+    Loaded from alpha_call_rollups, reloaded periodically and updated on
+    every call this process saves, so the most mentioned network and address
+    for a ticker are answered without touching the database. Tickers are
+    matched case-insensitively.
+    """
+
+    def __init__(self):
+        self.networks: Dict[str, Counter] = {}
+        self.addresses: Dict[Tuple[str, str], Counter] = {}
+        # Current leaders, kept up to date so lookups are O(1)
+        self.top_network: Dict[str, str] = {}
+        self.top_address: Dict[Tuple[str, str], str] = {}
+        self.loaded = False
+
+    @staticmethod
+    def _key(ticker: str) -> str:
+        return ticker.upper()
+
+    def add(self, ticker: str, network: str, address: str, count: int = 1):
+        if not ticker or not network or not address:
+            return
+        ticker = self._key(ticker)
+
+        networks = self.networks.setdefault(ticker, Counter())
+        networks[network] += count
+        leader = self.top_network.get(ticker)
+        if leader is None or networks[network] > networks[leader]:
+            self.top_network[ticker] = network
+
+        key = (ticker, network.lower())
+        addresses = self.addresses.setdefault(key, Counter())
+        addresses[address] += count
+        leader = self.top_address.get(key)
+        if leader is None or addresses[address] > addresses[leader]:
+            self.top_address[key] = address
+
+    def load(self, rows: Iterable[Tuple[str, str, str, int]]):
+        """Replace the index with (ticker, network, address, count) rows."""
+        index = TickerIndex()
+        for ticker, network, address, count in rows:
+            index.add(ticker, network, address, count)
+        self.networks = index.networks
+        self.addresses = index.addresses
+        self.top_network = index.top_network
+        self.top_address = index.top_address
+        self.loaded = True
+
+    def network_for(self, ticker: str) -> Optional[str]:
+        if not ticker:
+            return None
+        return self.top_network.get(self._key(ticker))
+
+    def address_for(self, ticker: str, network: Optional[str] = None) -> Optional[str]:
+        if not ticker:
+            return None
+        network = network or self.network_for(ticker)
+        if not network:
+            return None
+        return self.top_address.get((self._key(ticker), network.lower()))
+
+    def stats(self) -> Dict[str, int]:
+        return {"tickers": len(self.networks), "addresses": len(self.top_address)}
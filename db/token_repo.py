@@ -1,10 +1,35 @@
 from typing import Optional, List, Dict, Any, Literal
-import aiohttp
 from datetime import datetime, timezone, timedelta
-from dateutil.parser import parse
-import json
 from db.base_repo import PostgresRepository
-from db.utils import logger, json_serial
+from db.utils import logger
+from db.ticker_index import TickerIndex
+from db.trending_cache import TrendingCache
+from db.mention_counters import MentionCounters
+from db.market_data import MARKET_DATA_FIELDS, MarketData
+from db.alpha_call_writer import (
+    ALPHA_CALL_COLUMNS,
+    AlphaCallRecord,
+    AlphaCallWriter,
+)
+from lib.config import (
+    alpha_call_writer_batch_size,
+    alpha_call_writer_flush_interval_ms,
+    alpha_call_writer_max_pending,
+    ticker_index_refresh_interval,
+    trending_cache_l1_size,
+    trending_cache_l1_ttl,
+    trending_cache_soft_ttl,
+    trending_cache_hard_ttl,
+    trending_invalidate_interval_ms,
+    trending_counters_enabled,
+    trending_counters_max_window_hours,
+    market_data_ttl,
+    market_data_negative_ttl,
+    market_data_refresh_interval,
+    market_data_track_ttl,
+    market_data_max_concurrency,
+)
+from lib import metrics
 from pydantic import BaseModel
 import asyncio
 
@@ -17,14 +42,69 @@ def safe_getattr(obj, attr, default):
         return default
 
 
+UPSERT_ROLLUP_QUERY = """
+    INSERT INTO alpha_call_rollups (
+        bucket, token_ticker, network, token_address,
+        mention_count, latest_date, token_name, token_image
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (bucket, token_ticker, network, token_address) DO UPDATE
+    SET mention_count = alpha_call_rollups.mention_count + EXCLUDED.mention_count,
+        latest_date = GREATEST(alpha_call_rollups.latest_date, EXCLUDED.latest_date),
+        token_name = GREATEST(alpha_call_rollups.token_name, EXCLUDED.token_name),
+        token_image = GREATEST(alpha_call_rollups.token_image, EXCLUDED.token_image)
+"""
+
+
+# COPY has no ON CONFLICT, so rows are copied into a staging table first
+CREATE_STAGING_QUERY = """
+    CREATE TEMP TABLE alpha_calls_staging ON COMMIT DROP AS
+    SELECT {columns} FROM alpha_calls WITH NO DATA
+""".format(columns=", ".join(ALPHA_CALL_COLUMNS))
+
+INSERT_FROM_STAGING_QUERY = """
+    INSERT INTO alpha_calls ({columns})
+    SELECT {columns} FROM alpha_calls_staging
+    ON CONFLICT (message_url, date) DO NOTHING
+    RETURNING {columns}
+""".format(columns=", ".join(ALPHA_CALL_COLUMNS))
+
+
+def hour_bucket(date: datetime) -> datetime:
+    return date.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_rows(records: List[AlphaCallRecord]) -> List[tuple]:
+    """Aggregates records into alpha_call_rollups rows, like the rebuild does."""
+    rollups: Dict[tuple, list] = {}
+    for record in records:
+        key = (
+            hour_bucket(record.date),
+            record.token_ticker,
+            record.network,
+            record.token_address or "",
+        )
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollups[key] = [1, record.date, record.token_name, record.token_image]
+            continue
+        rollup[0] += 1
+        rollup[1] = max(rollup[1], record.date)
+        # GREATEST/MAX ignore NULLs
+        rollup[2] = max(filter(None, (rollup[2], record.token_name)), default=None)
+        rollup[3] = max(filter(None, (rollup[3], record.token_image)), default=None)
+    # A fixed order keeps concurrent writers from deadlocking on the upsert
+    return [key + tuple(rollups[key]) for key in sorted(rollups)]
+
+
 class TrendingToken(BaseModel):
     token_ticker: str
     network: str
-    token_address: str
+    # Calls that only named a ticker are grouped without an address
+    token_address: Optional[str] = None
     token_name: Optional[str] = None
     token_image: Optional[str] = None
     mention_count: int
-    latest_date: datetime
+    latest_date: Optional[datetime] = None
     pair: Optional[str] = None
     price: Optional[float] = None
     h24_change: Optional[float] = None
@@ -59,35 +139,180 @@ class TokenRepository(PostgresRepository):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.task_manager = TaskManager()
+        self.ticker_index = TickerIndex()
+        self.ticker_index_refresher: Optional[asyncio.Task] = None
+        # Started by the ingester; until then saves are written through
+        self.alpha_call_writer = AlphaCallWriter(
+            self,
+            batch_size=alpha_call_writer_batch_size,
+            flush_interval=alpha_call_writer_flush_interval_ms / 1000,
+            max_pending=alpha_call_writer_max_pending,
+            on_written=self._index_alpha_calls,
+        )
+        # Started by the API; the ingester only publishes invalidations
+        self.trending_cache = TrendingCache(
+            self.db,
+            TrendingToken,
+            l1_size=trending_cache_l1_size,
+            l1_ttl=trending_cache_l1_ttl,
+            soft_ttl=trending_cache_soft_ttl,
+            hard_ttl=trending_cache_hard_ttl,
+            invalidate_interval=trending_invalidate_interval_ms / 1000,
+        )
+        # Its refresher is started by the API
+        self.market_data = MarketData(
+            self.db,
+            ttl=market_data_ttl,
+            negative_ttl=market_data_negative_ttl,
+            refresh_interval=market_data_refresh_interval,
+            track_ttl=market_data_track_ttl,
+            max_concurrency=market_data_max_concurrency,
+        )
+        self.mention_counters = (
+            MentionCounters(
+                self.db, max_window=timedelta(hours=trending_counters_max_window_hours)
+            )
+            if trending_counters_enabled
+            else None
+        )
+
+    def _index_alpha_calls(self, records: List[AlphaCallRecord]):
+        for record in records:
+            self.ticker_index.add(
+                record.token_ticker, record.network, record.token_address
+            )
+        self.trending_cache.invalidate()
+
+    async def insert_alpha_calls(
+        self, records: List[AlphaCallRecord]
+    ) -> List[AlphaCallRecord]:
+        """COPY raw rows and fold them into the hourly rollups atomically.
+
+        Messages that were already saved (replayed by a backfill or after a
+        restart) are skipped; returns the records that were inserted.
+        """
+        async with self.transaction() as conn:
+            await conn.execute(CREATE_STAGING_QUERY)
+            await conn.copy_records_to_table(
+                "alpha_calls_staging",
+                records=records,
+                columns=list(ALPHA_CALL_COLUMNS),
+            )
+            inserted = [
+                AlphaCallRecord(*row)
+                for row in await conn.fetch(INSERT_FROM_STAGING_QUERY)
+            ]
+            # Only new rows are counted
+            rollups = rollup_rows(inserted)
+            if rollups:
+                await conn.executemany(UPSERT_ROLLUP_QUERY, rollups)
+
+        if self.mention_counters and rollups:
+            # After the commit; a failure here must not get the rows rewritten
+            try:
+                await self.mention_counters.record(rollups)
+            except Exception as e:
+                logger.error(f"Failed to update mention counters: {e}")
+        return inserted
+
+    async def seed_mention_counters(self, force: bool = False):
+        if not self.mention_counters:
+            return
+        try:
+            await self.mention_counters.seed(self, force=force)
+        except Exception as e:
+            logger.error(f"Error seeding mention counters: {e}")
+
+    async def rebuild_rollups(self, since: Optional[datetime] = None):
+        """Recomputes alpha_call_rollups from raw rows (from `since`'s hour on)."""
+        since = hour_bucket(since) if since else datetime.min
+        async with self.transaction() as conn:
+            await conn.execute(
+                "DELETE FROM alpha_call_rollups WHERE bucket >= $1", since
+            )
+            return await conn.execute(
+                """
+                INSERT INTO alpha_call_rollups (
+                    bucket, token_ticker, network, token_address,
+                    mention_count, latest_date, token_name, token_image
+                )
+                SELECT
+                    date_trunc('hour', date),
+                    token_ticker,
+                    network,
+                    COALESCE(token_address, ''),
+                    COUNT(*),
+                    MAX(date),
+                    MAX(token_name),
+                    MAX(token_image)
+                FROM alpha_calls
+                WHERE date >= $1
+                GROUP BY 1, 2, 3, 4
+                """,
+                since,
+            )
 
     async def save_alpha_call(self, alpha_call: Dict[str, Any]):
-        date = parse(alpha_call["date"])
-        if date.tzinfo is None:
-            date = date.replace(tzinfo=timezone.utc)
-        else:
-            date = date.astimezone(timezone.utc)
-
-        naive_utc_date = date.replace(tzinfo=None)
-
-        await self.execute(
-            """
-            INSERT INTO alpha_calls (
-                token_ticker, token_address, token_name, token_image, network, 
-                additional_info, channel_name, message_url, date, long_term
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            """,
-            alpha_call["token_ticker"],
-            alpha_call["token_address"],
-            alpha_call.get("token_name"),
-            alpha_call.get("token_image"),
-            alpha_call["network"],
-            alpha_call.get("additional_info"),
-            alpha_call["channel_name"],
-            alpha_call["message_url"],
-            naive_utc_date,
-            alpha_call.get("long_term", False),
+        await self.alpha_call_writer.write(AlphaCallRecord.from_alpha_call(alpha_call))
+
+    async def submit_alpha_call(self, alpha_call: Dict[str, Any]) -> asyncio.Future:
+        """Queues an alpha call; the future resolves once it is written."""
+        return await self.alpha_call_writer.submit(
+            AlphaCallRecord.from_alpha_call(alpha_call)
         )
 
+    async def save_alpha_calls(self, alpha_calls: List[Dict[str, Any]]):
+        """Queue many alpha calls and wait until all of them are written."""
+        futures = [
+            await self.alpha_call_writer.submit(AlphaCallRecord.from_alpha_call(call))
+            for call in alpha_calls
+        ]
+        await asyncio.gather(*futures)
+
+    async def start_ticker_index(self):
+        """Loads the ticker index and keeps reloading it; for roles that
+        analyze messages. Between reloads it only sees this process's saves.
+        """
+        if self.ticker_index_refresher is None:
+            await self.load_ticker_index()
+            self.ticker_index_refresher = asyncio.create_task(
+                self._refresh_ticker_index()
+            )
+
+    async def stop_ticker_index(self):
+        if self.ticker_index_refresher:
+            self.ticker_index_refresher.cancel()
+            await asyncio.gather(self.ticker_index_refresher, return_exceptions=True)
+            self.ticker_index_refresher = None
+
+    async def _refresh_ticker_index(self):
+        while True:
+            await asyncio.sleep(ticker_index_refresh_interval)
+            await self.load_ticker_index()
+
+    async def load_ticker_index(self):
+        """Builds the ticker index from alpha_call_rollups, which every
+        writer updates in the transaction of its insert."""
+        try:
+            rows = await self.fetch("""
+                SELECT token_ticker, network, token_address,
+                    SUM(mention_count) as count
+                FROM alpha_call_rollups
+                GROUP BY token_ticker, network, token_address
+                """)
+            self.ticker_index.load(
+                (
+                    row["token_ticker"],
+                    row["network"],
+                    row["token_address"],
+                    row["count"],
+                )
+                for row in rows
+            )
+            logger.info(f"Ticker index loaded: {self.ticker_index.stats()}")
+        except Exception as e:
+            logger.error(f"Error loading ticker index: {e}")
+
     async def get_trending_tokens(
         self,
         time_window: timedelta,
@@ -96,209 +321,166 @@ class TokenRepository(PostgresRepository):
             "mention_count", "latest_date", "price", "h24_change", "h24_volume"
         ] = "mention_count",
         sort_order: Literal["asc", "desc"] = "desc",
+        raise_errors: bool = False,
     ) -> List[TrendingToken]:
+        """Trending tokens for a window, from the caches when possible.
+
+        A failed build returns an empty list, or raises with `raise_errors`
+        for callers that must tell a failure from an empty leaderboard.
+        """
         print(
             f"Fetching trending tokens with {time_window=}, {limit=}, {sort_by=}, {sort_order=}"
         )
-        cache_key = f"trending_tokens:{time_window}:{limit}:{sort_by}:{sort_order}"
-        lock_key = f"{cache_key}:lock"
-
-        if self.db.redis:
-            try:
-                # Try to get cached data
-                cached_data = await self.db.redis.get(cache_key)
-                if cached_data:
-                    # Check if we need to revalidate
-                    ttl = await self.db.redis.ttl(cache_key)
-                    if ttl <= 0:
-                        # Cache has expired, start revalidation if not already running
-                        self.task_manager.create_task(
-                            cache_key,
-                            self.revalidate_cache(
-                                cache_key,
-                                lock_key,
-                                time_window,
-                                limit,
-                                sort_by,
-                                sort_order,
-                            ),
-                        )
-
-                    # Return cached data immediately
-                    logger.info("Returning cached result")
-                    return [
-                        TrendingToken.model_validate(token)
-                        for token in json.loads(cached_data)
-                    ]
-            except Exception as e:
-                logger.error(f"Cache error: {e}")
+        try:
+            return await self._get_trending_tokens(
+                time_window, limit, sort_by, sort_order
+            )
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"An error occurred: {e}")
+            return []
 
-        # If no cached data or cache error, fetch fresh data
-        return await self.fetch_fresh_data(
-            cache_key, time_window, limit, sort_by, sort_order
+    async def _get_trending_tokens(
+        self, time_window: timedelta, limit: int, sort_by: str, sort_order: str
+    ) -> List[TrendingToken]:
+        cache_key = self.trending_cache.key(
+            f"{time_window}:{limit}:{sort_by}:{sort_order}"
         )
 
-    async def revalidate_cache(
-        self,
-        cache_key: str,
-        lock_key: str,
-        time_window: timedelta,
-        limit: int,
-        sort_by: str,
-        sort_order: str,
-    ):
-        try:
-            # Set lock to prevent multiple revalidations
-            if not await self.db.redis.set(lock_key, "1", ex=60, nx=True):
-                return  # Another revalidation is already in progress
+        trending_tokens = self.trending_cache.get(cache_key)
+        if trending_tokens is not None:
+            return trending_tokens
 
-            fresh_data = await self.fetch_fresh_data(
-                cache_key, time_window, limit, sort_by, sort_order
-            )
+        # Taken before reading, so a bump during the build marks it stale
+        generation = self.trending_cache.generation
 
-            # Update cache with fresh data
-            await self.db.redis.set(
-                cache_key,
-                json.dumps(fresh_data, default=json_serial),
-                ex=60 * 5,  # 5 minutes expiry
+        def fetch():
+            return self.fetch_fresh_data(
+                cache_key, generation, time_window, limit, sort_by, sort_order
             )
-            logger.info(f"Cache revalidated for {cache_key}")
-        except Exception as e:
-            logger.error(f"Revalidation error for {cache_key}: {e}")
-        finally:
-            # Release lock
-            await self.db.redis.delete(lock_key)
+
+        cached = await self.trending_cache.read(cache_key)
+        if cached and cached[1] < generation:
+            # Built before the latest calls were written; rebuilt right away
+            # instead of being served
+            cached = None
+        if cached:
+            trending_tokens, cached_generation, stale = cached
+            if stale:
+                # Served as is; one worker rebuilds it in the background
+                self.task_manager.create_task(
+                    cache_key, self.trending_cache.refresh(cache_key, fetch)
+                )
+            else:
+                self.trending_cache.set(cache_key, trending_tokens, cached_generation)
+            logger.info("Returning cached result")
+            metrics.cache_lookups.labels(cache="trending", result="l2_hit").inc()
+            return trending_tokens
+
+        metrics.cache_lookups.labels(cache="trending", result="miss").inc()
+        return await self.trending_cache.load(cache_key, fetch)
 
     async def fetch_fresh_data(
         self,
         cache_key: str,
+        generation: int,
         time_window: timedelta,
         limit: int,
         sort_by: str,
         sort_order: str,
     ) -> List[TrendingToken]:
-        try:
-            now = datetime.now(timezone.utc)
-            naive_utc_date = now.replace(tzinfo=None)
-            query = """
-                SELECT 
-                    token_ticker, 
-                    network, 
-                    token_address,
-                    MAX(token_name) as token_name,
-                    MAX(token_image) as token_image,
-                    COUNT(*) as mention_count,
-                    MAX(date) as latest_date
+        """Builds a trending response and caches it; raises if it fails."""
+        now = datetime.now(timezone.utc)
+        naive_utc_date = now.replace(tzinfo=None)
+        # Whole hours come from the rollups; only the partial first hour
+        # of the window is read from raw rows
+        query = """
+            WITH mentions AS (
+                SELECT
+                    token_ticker, network, token_address, mention_count,
+                    latest_date, token_name, token_image
+                FROM alpha_call_rollups
+                WHERE bucket >= $3
+                UNION ALL
+                SELECT
+                    token_ticker, network, COALESCE(token_address, ''), 1,
+                    date, token_name, token_image
                 FROM alpha_calls
-                WHERE date > $1
-                GROUP BY token_ticker, network, token_address
-                ORDER BY {sort_field} {sort_order}
-                LIMIT $2
-            """
-
-            if sort_by in ["mention_count", "latest_date"]:
-                sort_field = sort_by
-            else:
-                sort_field = "mention_count"
-
-            query = query.format(sort_field=sort_field, sort_order=sort_order.upper())
-            rows = await self.fetch(query, naive_utc_date - time_window, limit)
-
-            trending_tokens = []
-            async with aiohttp.ClientSession() as session:
-                tasks = [self.fetch_token_data(session, dict(row)) for row in rows]
-                trending_tokens = await asyncio.gather(*tasks)
-
-                if sort_by in ["price", "h24_change", "h24_volume"]:
-                    default_value = (
-                        float("-inf") if sort_order == "desc" else float("inf")
-                    )
-                    trending_tokens.sort(
-                        key=lambda x: safe_getattr(x, sort_by, default_value),
-                        reverse=(sort_order == "desc"),
-                    )
-
-            if self.db.redis:
-                try:
-                    await self.db.redis.set(
-                        cache_key,
-                        json.dumps(trending_tokens, default=json_serial),
-                        ex=60 * 5,  # 5 minutes expiry
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to set redis: {e}")
-
-            return trending_tokens
-
-        except Exception as e:
-            logger.error(f"An error occurred: {e}")
-            return []
-
-    async def fetch_token_data(
-        self, session: aiohttp.ClientSession, token_data: dict
-    ) -> TrendingToken:
-        token_address = token_data["token_address"]
-
-        cache_key = f"dex_data:{token_address}"
+                WHERE date > $1 AND date < $3
+            )
+            SELECT 
+                token_ticker, 
+                network, 
+                NULLIF(token_address, '') as token_address,
+                MAX(token_name) as token_name,
+                MAX(token_image) as token_image,
+                SUM(mention_count)::INTEGER as mention_count,
+                MAX(latest_date) as latest_date
+            FROM mentions
+            GROUP BY token_ticker, network, token_address
+            ORDER BY {sort_field} {sort_order}
+            LIMIT $2
+        """
+
+        if sort_by in ["mention_count", "latest_date"]:
+            sort_field = sort_by
+        else:
+            sort_field = "mention_count"
 
-        if self.db.redis:
-            cached_data = await self.db.redis.get(cache_key)
-            if cached_data:
-                return json.loads(cached_data)
+        query = query.format(sort_field=sort_field, sort_order=sort_order.upper())
+        start = naive_utc_date - time_window
 
-        dex_url = f"https://api.dexscreener.com/latest/dex/tokens/{token_address}"
+        rows = None
+        if self.mention_counters and self.mention_counters.covers(time_window):
+            try:
+                rows = await self.mention_counters.top(
+                    start, limit, sort_field, sort_order
+                )
+            except Exception as e:
+                logger.error(f"Mention counters error: {e}")
+        if rows is None:
+            first_full_hour = hour_bucket(start) + timedelta(hours=1)
+            rows = [
+                dict(row)
+                for row in await self.fetch(query, start, limit, first_full_hour)
+            ]
+
+        trending_tokens = [
+            TrendingToken.model_validate(row)
+            for row in await self.fetch_token_data(rows)
+        ]
+
+        if sort_by in ["price", "h24_change", "h24_volume"]:
+            default_value = float("-inf") if sort_order == "desc" else float("inf")
+            trending_tokens.sort(
+                key=lambda x: safe_getattr(x, sort_by, default_value),
+                reverse=(sort_order == "desc"),
+            )
 
-        try:
-            async with session.get(dex_url) as response:
-                if response.status == 200:
-                    dex_data = await response.json()
-                    if dex_data["pairs"] and len(dex_data["pairs"]) > 0:
-                        pair = dex_data["pairs"][0]
-                        token_data.update(
-                            {
-                                "pair": f"{pair['baseToken']['symbol']}/{pair['quoteToken']['symbol']}",
-                                "price": pair.get("priceUsd", 0),
-                                "h24_change": pair["priceChange"]["h24"],
-                                "h24_volume": pair["volume"]["h24"],
-                            }
-                        )
-
-                        if self.db.redis:
-                            await self.db.redis.set(
-                                cache_key,
-                                json.dumps(token_data, default=json_serial),
-                                ex=300,
-                            )  # Cache for 5 minutes
-                    else:
-                        logger.warning(
-                            f"Failed to fetch data from DexScreener for {token_address}"
-                        )
-        except Exception as e:
-            logger.error(f"Error fetching DexScreener data: {e}")
+        await self.trending_cache.write(cache_key, trending_tokens, generation)
+        return trending_tokens
 
-        # return TrendingToken(**token_data)
-        return token_data
+    async def fetch_token_data(self, rows: List[dict]) -> List[dict]:
+        """Adds DexScreener market data to trending rows (see MarketData)."""
+        market_data = await self.market_data.get_many(
+            [row["token_address"] for row in rows]
+        )
+        for row in rows:
+            data = market_data.get(row["token_address"])
+            if data:
+                row.update({field: data.get(field) for field in MARKET_DATA_FIELDS})
+        return rows
 
     async def get_network_for_ticker(self, ticker: str) -> Optional[str]:
-        try:
-            result = await self.fetchrow(
-                """
-                SELECT network, COUNT(*) as count
-                FROM alpha_calls
-                WHERE token_ticker = $1
-                GROUP BY network
-                ORDER BY count DESC
-                LIMIT 1
-                """,
-                ticker,
-            )
-            return result["network"] if result else None
-        except Exception as e:
-            logger.error(f"An error occurred while fetching network for ticker: {e}")
-            return None
+        # Answered from the in-memory index instead of a GROUP BY per call
+        return self.ticker_index.network_for(ticker)
 
     async def cleanup(self):
         """Cleanup method to be called when shutting down the application"""
+        await self.trending_cache.stop()
+        await self.market_data.stop()
+        await self.stop_ticker_index()
         self.task_manager.cancel_all_tasks()
         # Wait for all tasks to complete
         tasks = list(self.task_manager.tasks.values())
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+from cachetools import TTLCache
+from pydantic import BaseModel
+from db.utils import logger
+from lib import metrics
+
+GENERATION_KEY = "trending_tokens:generation"
+INVALIDATION_CHANNEL = "trending_tokens:invalidate"
+
+# Held while one process rebuilds an entry; outlives a slow DexScreener fan-out
+LOCK_TTL = 60
+# How long a cold miss waits for another worker's rebuild before doing its own
+LOCK_WAIT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+# Deletes the lock only if we still hold it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class TrendingCache:
+    """Built /trending_tokens responses, in process and in Redis.
+
+    Each API worker keeps validated responses in a small TTL LRU, so a hit
+    costs no Redis round trip. The ingester bumps a generation number
+    (INCR + PUBLISH) after writing new alpha calls; workers subscribed to
+    the channel drop their L1 on each bump.
+
+    Redis values are envelopes holding the generation they were built under
+    and a soft expiry, with a longer hard TTL on the key. An entry past its
+    soft expiry is still served while one worker rebuilds it in the
+    background. An entry of an older generation misses calls written since,
+    so callers treat it as a miss. Misses are single-flight, per process
+    and, through a Redis lock, across workers. Both levels hold `model`
+    instances.
+    """
+
+    def __init__(
+        self,
+        db,
+        model: Type[BaseModel],
+        l1_size: int,
+        l1_ttl: float,
+        soft_ttl: float,
+        hard_ttl: int,
+        invalidate_interval: float,
+    ):
+        self.db = db
+        self.model = model
+        self.l1 = TTLCache(maxsize=l1_size, ttl=l1_ttl)
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.loading: Dict[str, asyncio.Task] = {}
+        # Bursts of writes are coalesced into one bump per interval
+        self.invalidate_interval = invalidate_interval
+        self.generation = 0
+        self.listener: Optional[asyncio.Task] = None
+        self.publisher: Optional[asyncio.Task] = None
+        self.last_published = 0.0
+        self.dirty = False
+        self.l1_hits = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def key(self, base: str) -> str:
+        return f"trending_tokens:{base}"
+
+    def get(self, key: str) -> Optional[List[Any]]:
+        tokens = self.l1.get(key)
+        if tokens is not None:
+            self.l1_hits += 1
+            metrics.cache_lookups.labels(cache="trending", result="l1_hit").inc()
+        return tokens
+
+    def set(self, key: str, tokens: List[BaseModel], generation: int):
+        # A response built before a bump must not outlive it in L1
+        if generation == self.generation:
+            self.l1[key] = tokens
+
+    async def read(self, key: str) -> Optional[Tuple[List[BaseModel], int, bool]]:
+        """The Redis entry's tokens, generation and whether it is past its
+        soft expiry."""
+        if not self.db.redis:
+            return None
+        try:
+            cached_data = await self.db.redis.get(key)
+        except Exception as e:
+            logger.error(f"Cache error: {e}")
+            return None
+        if not cached_data:
+            return None
+        try:
+            envelope = json.loads(cached_data)
+            tokens = [self.model.model_validate(token) for token in envelope["tokens"]]
+            generation = envelope["generation"]
+            stale = time.time() >= envelope["soft_expires_at"]
+            return tokens, generation, stale
+        except (TypeError, KeyError, ValueError):
+            logger.warning(f"Ignoring malformed cache entry {key}")
+            return None
+
+    async def write(self, key: str, tokens: List[BaseModel], generation: int):
+        """Stores tokens built from data as of `generation`."""
+        self.set(key, tokens, generation)
+        if not self.db.redis:
+            return
+        envelope = {
+            "generation": generation,
+            "soft_expires_at": time.time() + self.soft_ttl,
+            "tokens": [token.model_dump(mode="json") for token in tokens],
+        }
+        try:
+            await self.db.redis.set(key, json.dumps(envelope), ex=self.hard_ttl)
+        except Exception as e:
+            logger.error(f"Failed to set redis: {e}")
+
+    async def acquire(self, key: str) -> Optional[str]:
+        """Takes the rebuild lock of `key`; returns its token if we got it."""
+        token = uuid.uuid4().hex
+        if await self.db.redis.set(f"{key}:lock", token, ex=LOCK_TTL, nx=True):
+            return token
+        return None
+
+    async def release(self, key: str, token: str):
+        try:
+            await self.db.redis.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+        except Exception as e:
+            logger.error(f"Failed to release lock for {key}: {e}")
+
+    async def load(self, key: str, fetch: Callable[[], Awaitable[List[Any]]]):
+        """Builds a missing entry once, however many requests are waiting."""
+        task = self.loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, fetch))
+            self.loading[key] = task
+            task.add_done_callback(lambda _: self.loading.pop(key, None))
+        else:
+            self.coalesced += 1
+            metrics.cache_lookups.labels(cache="trending", result="coalesced").inc()
+        # A cancelled request must not cancel the others waiting on the build
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, fetch):
+        generation = self.generation
+        token = None
+        if self.db.redis:
+            try:
+                token = await self.acquire(key)
+                if token is None:
+                    deadline = time.monotonic() + LOCK_WAIT
+                    while time.monotonic() < deadline:
+                        await asyncio.sleep(LOCK_POLL_INTERVAL)
+                        cached = await self.read(key)
+                        # The other worker's build, not the entry it replaces
+                        if cached and cached[1] >= generation:
+                            return cached[0]
+                    logger.warning(f"Timed out waiting for {key}, building it")
+            except Exception as e:
+                logger.error(f"Cache lock error: {e}")
+        try:
+            return await fetch()
+        finally:
+            if token:
+                await self.release(key, token)
+
+    async def refresh(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        """Rebuilds a soft-expired entry unless another worker already is."""
+        token = await self.acquire(key)
+        if token is None:
+            return
+        try:
+            await fetch()
+            logger.info(f"Cache revalidated for {key}")
+        finally:
+            await self.release(key, token)
+
+    def _apply(self, generation: int):
+        if generation != self.generation:
+            self.generation = generation
+            self.l1.clear()
+            self.invalidations += 1
+
+    def start(self):
+        if self.listener is None and self.db.redis:
+            self.listener = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        for task in (self.listener, self.publisher):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self.listener = self.publisher = None
+
+    async def listen(self):
+        """Follows generation bumps from other processes until cancelled."""
+        while True:
+            pubsub = self.db.redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Read after subscribing so no bump in between is missed
+                self._apply(int(await self.db.redis.get(GENERATION_KEY) or 0))
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._apply(int(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Trending cache invalidation listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+
+    def invalidate(self):
+        """Schedules a generation bump; called when alpha calls are written."""
+        if not self.db.redis:
+            return
+        self.dirty = True
+        if self.publisher is None or self.publisher.done():
+            self.publisher = asyncio.create_task(self._publish())
+
+    async def _publish(self):
+        # Writes that land while a bump is in flight get one of their own
+        while self.dirty:
+            delay = self.last_published + self.invalidate_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.dirty = False
+            self.last_published = time.monotonic()
+            try:
+                generation = await self.db.redis.incr(GENERATION_KEY)
+                await self.db.redis.publish(INVALIDATION_CHANNEL, generation)
+                self._apply(generation)
+            except Exception as e:
+                logger.error(f"Failed to invalidate trending cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "l1_hits": self.l1_hits,
+            "l1_size": len(self.l1),
+            "coalesced": self.coalesced,
+            "loading": len(self.loading),
+            "invalidations": self.invalidations,
+        }
@@ -1,18 +1,202 @@
+import asyncio
 import json
+import random
+import re
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, Callable, Dict, Optional
 import google.generativeai as genai
-from PIL import Image
-from lib.config import google_ai_api_key
+from lib.config import (
+    google_ai_api_key,
+    gemini_max_concurrency,
+    gemini_requests_per_minute,
+    gemini_tokens_per_minute,
+    gemini_max_retries,
+    gemini_batch_enabled,
+    gemini_batch_max_size,
+    gemini_batch_max_wait_ms,
+    gemini_pro_model,
+    gemini_cascade_enabled,
+    gemini_fast_model,
+    gemini_fast_max_concurrency,
+    gemini_fast_requests_per_minute,
+    gemini_fast_tokens_per_minute,
+    gemini_cascade_confidence_threshold,
+    gemini_cascade_image_text_chars,
+    llm_provider,
+    fake_llm_latency_ms,
+    fake_llm_fast_latency_ms,
+    fake_llm_error_rate,
+)
+from lib.rate_limit import TokenBucket
+from lib import metrics
 
-genai.configure(api_key=google_ai_api_key)
-model = genai.GenerativeModel("gemini-1.5-pro")
+logger = logging.getLogger(__name__)
 
+if llm_provider == "fake":
+    from providers.fake_model import FakeModel
+else:
+    genai.configure(api_key=google_ai_api_key)
 
-async def analyze_with_gemini(image_path, message_text):
-    prompt = f"""
-    Analyze the following crypto-related message and image (if provided):
 
-    Message: {message_text}
+def create_model(name: str, fake_latency_ms: float):
+    if llm_provider == "fake":
+        return FakeModel(fake_latency_ms, error_rate=fake_llm_error_rate)
+    return genai.GenerativeModel(name)
+
+
+model = create_model(gemini_pro_model, fake_llm_latency_ms)
+
+# Rough token accounting used to reserve TPM budget before a request is sent
+IMAGE_TOKENS = 258
+RESPONSE_TOKENS = 200
+
+
+# Held around each request actually sent, e.g. the ingestion "llm" stage;
+# never while a message only waits in the batcher
+Slot = Callable[[], AsyncContextManager]
+
+
+@asynccontextmanager
+async def no_slot():
+    yield
+
+
+def is_retryable(error: Exception) -> bool:
+    # google.api_core errors carry the HTTP status in `code`
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+
+class GeminiScheduler:
+    """Runs blocking `generate_content` calls on a dedicated thread pool.
+
+    Requests wait for both a requests-per-minute and a tokens-per-minute
+    budget before they are sent, and 429/5xx responses are retried with
+    jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        name: str = gemini_pro_model,
+    ):
+        self.model = model
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="gemini"
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.queued = 0
+        self.in_flight = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def generate(self, contents, estimated_tokens: int):
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            self.queued += 1
+            try:
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(estimated_tokens)
+                await self.semaphore.acquire()
+            finally:
+                self.queued -= 1
+
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await loop.run_in_executor(
+                    self.executor, self.model.generate_content, contents
+                )
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.failures += 1
+                    self._observe("error", started)
+                    raise
+                self._observe("retry", started)
+                attempt += 1
+                self.retries += 1
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2**attempt)
+                )
+                logger.warning(
+                    f"Gemini request failed ({e}), retry {attempt} in {delay:.1f}s"
+                )
+            else:
+                self._observe("success", started)
+                usage = getattr(response, "usage_metadata", None)
+                if usage and usage.total_token_count:
+                    self.token_bucket.adjust(usage.total_token_count - estimated_tokens)
+                    metrics.llm_tokens.labels(model=self.name).inc(
+                        usage.total_token_count
+                    )
+                return response
+            finally:
+                self.in_flight -= 1
+                self.semaphore.release()
+
+            await asyncio.sleep(delay)
+
+    def _observe(self, outcome: str, started: float):
+        metrics.llm_requests.labels(model=self.name, outcome=outcome).inc()
+        metrics.llm_request_duration.labels(model=self.name, outcome=outcome).observe(
+            time.perf_counter() - started
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "retries": self.retries,
+            "failures": self.failures,
+            "request_budget": self.request_bucket.available(),
+            "token_budget": self.token_bucket.available(),
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+scheduler = GeminiScheduler(
+    model,
+    max_concurrency=gemini_max_concurrency,
+    requests_per_minute=gemini_requests_per_minute,
+    tokens_per_minute=gemini_tokens_per_minute,
+    max_retries=gemini_max_retries,
+    name=gemini_pro_model,
+)
 
+# The cheaper first tier of the cascade, with its own quota
+fast_scheduler = (
+    GeminiScheduler(
+        create_model(gemini_fast_model, fake_llm_fast_latency_ms),
+        max_concurrency=gemini_fast_max_concurrency,
+        requests_per_minute=gemini_fast_requests_per_minute,
+        tokens_per_minute=gemini_fast_tokens_per_minute,
+        max_retries=gemini_max_retries,
+        name=gemini_fast_model,
+    )
+    if gemini_cascade_enabled
+    else None
+)
+
+
+ANALYSIS_CRITERIA = """
     Determine if this is an alpha call for a cryptocurrency. Carefully examine the entire message for the following information:
 
     1. Token Ticker: Look for symbols like $XXX or similar patterns that represent a token's ticker. This is case sensitive and could be any combination of letters, numbers and casing.
@@ -21,50 +205,320 @@ async def analyze_with_gemini(image_path, message_text):
 
     If the token ticker and network are not present, consider this message invalid.
     Else assume it is an alpha call, unless the Message gives you reason to believe otherwise.
-    
-    Format your response as a JSON object with the following structure:
-    {{
+"""
+
+RESULT_FIELDS = """
         "is_alpha_call": true/false,
         "token_ticker": "XXX",
         "network": "Ethereum/Solana/BSC/etc.",
         "additional_info": "Any other relevant information, including reasons for your decision",
-        "long_term": true/false
+        "long_term": true/false,
+        "confidence": 0.0-1.0, how sure you are that is_alpha_call, token_ticker and network are all correct"""
+
+
+def build_prompt(message_text):
+    return f"""
+    Analyze the following crypto-related message and image (if provided):
+
+    Message: {message_text}
+    {ANALYSIS_CRITERIA}
+    Format your response as a JSON object with the following structure:
+    {{{RESULT_FIELDS}
     }}
-    
+
     Ensure all fields are present in the JSON, using null for missing values. null is not a string.
     Return ONLY the JSON object, without any additional text or explanation.
     """
 
+
+def build_batch_prompt(messages: Dict[str, str]):
+    payload = json.dumps(
+        [
+            {"message_id": message_id, "text": text}
+            for message_id, text in messages.items()
+        ],
+        ensure_ascii=False,
+    )
+    return f"""
+    Analyze each of the following crypto-related messages independently. They are given as a JSON array:
+
+    Messages: {payload}
+    {ANALYSIS_CRITERIA}
+    Format your response as a JSON array with exactly one object per message, each with the following structure:
+    [{{
+        "message_id": "the message_id of the message this result is for",{RESULT_FIELDS}
+    }}]
+
+    Ensure all fields are present in every object, using null for missing values. null is not a string.
+    Return ONLY the JSON array, without any additional text or explanation.
+    """
+
+
+def parse_response(response_text) -> Optional[Dict[str, Any]]:
+    # Try to parse the JSON directly
     try:
-        if image_path:
-            image = Image.open(image_path)
-            response = model.generate_content([prompt, image])
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        # If direct parsing fails, try to find and extract the JSON object
+        json_match = re.search(r"\{.*\}", response_text, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                print("Error: Invalid JSON in extracted content")
+                return None
         else:
-            response = model.generate_content(prompt)
+            print("Error: No valid JSON object found in the response")
+            return None
 
-        # Extract the text content from the response
-        response_text = response.text
 
-        # Try to parse the JSON directly
+def parse_batch_response(response_text) -> Optional[Dict[str, Dict[str, Any]]]:
+    try:
+        results = json.loads(response_text)
+    except json.JSONDecodeError:
+        json_match = re.search(r"\[.*\]", response_text, re.DOTALL)
+        if not json_match:
+            return None
         try:
-            result = json.loads(response_text)
-            return result
+            results = json.loads(json_match.group())
         except json.JSONDecodeError:
-            # If direct parsing fails, try to find and extract the JSON object
-            import re
-
-            json_match = re.search(r"\{.*\}", response_text, re.DOTALL)
-            if json_match:
-                try:
-                    result = json.loads(json_match.group())
-                    return result
-                except json.JSONDecodeError:
-                    print("Error: Invalid JSON in extracted content")
-                    return None
-            else:
-                print("Error: No valid JSON object found in the response")
-                return None
+            return None
+
+    if not isinstance(results, list):
+        return None
+    return {
+        str(result.pop("message_id")): result
+        for result in results
+        if isinstance(result, dict) and result.get("message_id") is not None
+    }
+
+
+async def analyze_single(
+    image_data,
+    message_text,
+    tier: GeminiScheduler = scheduler,
+    slot: Slot = no_slot,
+):
+    prompt = build_prompt(message_text)
+    estimated_tokens = len(prompt) // 4 + RESPONSE_TOKENS
+
+    try:
+        if image_data:
+            # Images arrive already downscaled and JPEG encoded
+            contents = [prompt, {"mime_type": "image/jpeg", "data": image_data}]
+            estimated_tokens += IMAGE_TOKENS
+        else:
+            contents = prompt
+
+        async with slot():
+            response = await tier.generate(contents, estimated_tokens)
+
+        # Extract the text content from the response
+        return parse_response(response.text)
 
     except Exception as e:
         print(f"Error in analyze_with_gemini: {str(e)}")
         return None
+
+
+class GeminiBatcher:
+    """Groups text-only analyses into a single prompt.
+
+    A batch is sent once it has `max_size` messages or `max_wait` seconds
+    after its first message arrived, whichever comes first. Messages missing
+    from the model's answer, or every message of a failed batch, fall back to
+    individual requests. Callers' slots are only taken for requests sent, so
+    a stage limit bounds concurrent requests rather than batch sizes.
+    """
+
+    def __init__(self, max_size: int, max_wait: float, tier: GeminiScheduler):
+        self.tier = tier
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.pending: list = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: set = set()
+        self.batches = 0
+        self.batched_messages = 0
+        self.fallbacks = 0
+
+    async def analyze(self, message_text, slot: Slot = no_slot):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((message_text, future, slot))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(
+                self.max_wait, self.flush
+            )
+        return await future
+
+    def flush(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self._run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run_batch(self, batch):
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+
+        # Batch-local ids; Telegram message ids are only unique per channel
+        messages = {str(i): message_text for i, (message_text, *_) in enumerate(batch)}
+        results = None
+        try:
+            prompt = build_batch_prompt(messages)
+            estimated_tokens = len(prompt) // 4 + RESPONSE_TOKENS * len(batch)
+            # One request, so one slot: the first caller's
+            async with batch[0][2]():
+                response = await self.tier.generate(prompt, estimated_tokens)
+            results = parse_batch_response(response.text)
+        except Exception as e:
+            logger.error(f"Batch analysis of {len(batch)} messages failed: {e}")
+
+        self.batches += 1
+        self.batched_messages += len(batch)
+
+        fallbacks = []
+        for message_id, pending in zip(messages, batch):
+            result = (results or {}).get(message_id)
+            if result is not None:
+                self._resolve(pending[1], result)
+            else:
+                fallbacks.append(pending)
+
+        if fallbacks:
+            self.fallbacks += len(fallbacks)
+            await asyncio.gather(*(self._run_single(*pending) for pending in fallbacks))
+
+    async def _run_single(self, message_text, future, slot: Slot):
+        self._resolve(future, await analyze_single(None, message_text, self.tier, slot))
+
+    @staticmethod
+    def _resolve(future, result):
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "batches": self.batches,
+            "avg_batch_size": (
+                self.batched_messages / self.batches if self.batches else 0.0
+            ),
+            "fallbacks": self.fallbacks,
+        }
+
+
+batcher = (
+    GeminiBatcher(
+        gemini_batch_max_size,
+        gemini_batch_max_wait_ms / 1000,
+        # With the cascade, batches go to the first tier
+        fast_scheduler or scheduler,
+    )
+    if gemini_batch_enabled
+    else None
+)
+
+
+def confidence_of(result: Optional[Dict[str, Any]]) -> float:
+    try:
+        return float((result or {}).get("confidence") or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ModelCascade:
+    """Classifies with the fast model and escalates to the pro model.
+
+    A fast answer is kept if its self-reported confidence reaches
+    `threshold`. Otherwise, or if the fast request failed, the message is
+    re-analyzed by the pro model. Images with little text go straight to
+    pro, since reading the image is the whole job.
+    """
+
+    def __init__(
+        self,
+        fast: GeminiScheduler,
+        pro: GeminiScheduler,
+        threshold: float,
+        image_text_chars: int,
+    ):
+        self.fast = fast
+        self.pro = pro
+        self.threshold = threshold
+        self.image_text_chars = image_text_chars
+        self.decisions = {
+            "fast_accepted": 0,
+            "escalated_low_confidence": 0,
+            "escalated_failed": 0,
+            "pro_direct_image": 0,
+        }
+
+    def _record(self, decision: str):
+        self.decisions[decision] += 1
+        metrics.llm_cascade_decisions.labels(decision=decision).inc()
+
+    async def analyze(self, image_data, message_text, slot: Slot = no_slot):
+        if image_data and len((message_text or "").strip()) < self.image_text_chars:
+            self._record("pro_direct_image")
+            return await analyze_single(image_data, message_text, self.pro, slot)
+
+        if batcher and not image_data:
+            result = await batcher.analyze(message_text, slot)
+        else:
+            result = await analyze_single(image_data, message_text, self.fast, slot)
+
+        if result is None:
+            self._record("escalated_failed")
+        else:
+            confidence = confidence_of(result)
+            metrics.llm_cascade_confidence.observe(confidence)
+            if confidence >= self.threshold:
+                self._record("fast_accepted")
+                return result
+            self._record("escalated_low_confidence")
+
+        return await analyze_single(image_data, message_text, self.pro, slot)
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.decisions.values())
+        escalated = (
+            self.decisions["escalated_low_confidence"]
+            + self.decisions["escalated_failed"]
+        )
+        return {
+            **self.decisions,
+            "escalation_rate": escalated / total if total else 0.0,
+            "fast": self.fast.stats(),
+        }
+
+    def shutdown(self):
+        self.fast.shutdown()
+
+
+cascade = (
+    ModelCascade(
+        fast_scheduler,
+        scheduler,
+        threshold=gemini_cascade_confidence_threshold,
+        image_text_chars=gemini_cascade_image_text_chars,
+    )
+    if fast_scheduler
+    else None
+)
+
+
+async def analyze_with_gemini(image_data, message_text, slot: Slot = no_slot):
+    if cascade:
+        return await cascade.analyze(image_data, message_text, slot)
+    # Only text-only messages are batched; images go out on their own
+    if batcher and not image_data:
+        return await batcher.analyze(message_text, slot)
+    return await analyze_single(image_data, message_text, slot=slot)
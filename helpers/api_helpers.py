@@ -1,5 +1,5 @@
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Cookie, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import BaseModel
@@ -12,18 +12,41 @@ from lib.config import secret_key, jwt_algorithm
 from models.user_models import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 
 class TokenData(BaseModel):
     identifier: Optional[str] = None
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def credentials_error() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    return await get_user_from_token(token)
+
+
+async def get_stream_user(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None),
+    cookie_token: Optional[str] = Cookie(None, alias="access_token"),
+):
+    """`get_current_user` for server-sent event streams: a browser's
+    EventSource cannot set headers, so the JWT may also come as an
+    `access_token` query parameter or cookie."""
+    token = header_token or access_token or cookie_token
+    if not token:
+        raise credentials_error()
+    return await get_user_from_token(token)
+
+
+async def get_user_from_token(token: str):
+    credentials_exception = credentials_error()
     try:
         payload = jwt.decode(token, secret_key, algorithms=[jwt_algorithm])
         identifier: str = payload.get("sub")
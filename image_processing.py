@@ -0,0 +1,71 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from PIL import Image
+from lib.config import image_max_side, image_jpeg_quality, image_processing_workers
+
+logger = logging.getLogger(__name__)
+
+# Decoding and resizing are CPU bound, so they run outside the event loop
+# process entirely. Created lazily so importing this module stays cheap.
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def dhash(image: Image.Image, size: int = 8) -> str:
+    """64-bit difference hash; survives re-compression and resizing."""
+    pixels = list(
+        image.convert("L").resize((size + 1, size), Image.LANCZOS).getdata()
+    )
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{size * size // 4}x}"
+
+
+def prepare_image(data: bytes, max_side: int, quality: int) -> Tuple[bytes, str]:
+    """Decode, hash and downscale an image, re-encoding it as JPEG."""
+    with Image.open(io.BytesIO(data)) as image:
+        image_hash = dhash(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue(), image_hash
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # Forking a process with a running event loop, Redis/Postgres pools
+        # and Gemini threads copies their state and locks; start clean ones
+        _process_pool = ProcessPoolExecutor(
+            max_workers=image_processing_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+async def process_image(data: bytes) -> Optional[Tuple[bytes, str]]:
+    """Returns (jpeg_bytes, perceptual_hash), or None if the image can't be decoded."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            get_process_pool(), prepare_image, data, image_max_side, image_jpeg_quality
+        )
+    except Exception as e:
+        logger.error(f"Failed to process image: {e}")
+        return None
+
+
+def shutdown():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,171 @@
+import asyncio
+import time
+import logging
+import itertools
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+from lib import metrics
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("media", "llm", "enrichment", "persist")
+
+
+class TransientAnalysisError(Exception):
+    """A message could not be analyzed now (LLM or upstream failure).
+
+    Unlike a discarded message it was not handled, so it must not be
+    acknowledged or checkpointed; it is retried later instead.
+    """
+
+
+class IngestionPipeline:
+    """Bounded queue of incoming messages drained by a fixed pool of workers.
+
+    Each processing stage gets its own semaphore so a slow dependency
+    (Gemini, DexScreener, Postgres) can't be hit by every worker at once.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        workers: int,
+        queue_size: int,
+        stage_limits: Dict[str, int],
+        enqueue_timeout: Optional[float] = None,
+    ):
+        self.handler = handler
+        self.worker_count = workers
+        self.enqueue_timeout = enqueue_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stage_limits = {stage: stage_limits[stage] for stage in STAGES}
+        self.semaphores = {
+            stage: asyncio.Semaphore(limit) for stage, limit in self.stage_limits.items()
+        }
+        self.in_flight = {stage: 0 for stage in STAGES}
+        self.workers: list[asyncio.Task] = []
+
+        # Submission time of every message not yet picked up by a worker,
+        # including submitters still blocked on a full queue
+        self._pending: OrderedDict = OrderedDict()
+        self._seq = itertools.count()
+        self.enqueued = 0
+        self.dequeued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    def start(self):
+        if self.workers:
+            return
+        for i in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(i)))
+        logger.info(
+            f"Ingestion pipeline started with {self.worker_count} workers, "
+            f"queue size {self.queue.maxsize}, stage limits {self.stage_limits}"
+        )
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def submit(self, item: Any) -> bool:
+        """Enqueue an item, waiting while the queue is full.
+
+        Returns False if the item was dropped because the queue stayed full
+        for longer than `enqueue_timeout`.
+        """
+        seq = next(self._seq)
+        self._pending[seq] = time.monotonic()
+        try:
+            if self.enqueue_timeout is None:
+                await self.queue.put((seq, item))
+            else:
+                await asyncio.wait_for(
+                    self.queue.put((seq, item)), self.enqueue_timeout
+                )
+        except asyncio.TimeoutError:
+            self._pending.pop(seq, None)
+            self.dropped += 1
+            metrics.messages_dropped.inc()
+            logger.warning(
+                f"Ingestion queue full ({self.queue.qsize()}), dropping message"
+            )
+            return False
+
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        metrics.queue_depth.set(self.queue.qsize())
+        return True
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        with metrics.timed(metrics.stage_wait, stage=name):
+            await self.semaphores[name].acquire()
+        self.in_flight[name] += 1
+        try:
+            with metrics.timed(metrics.stage_duration, stage=name):
+                yield
+        finally:
+            self.in_flight[name] -= 1
+            self.semaphores[name].release()
+
+    async def _worker(self, index: int):
+        while True:
+            seq, item = await self.queue.get()
+            enqueued_at = self._pending.pop(seq, None)
+            self.dequeued += 1
+            metrics.queue_depth.set(self.queue.qsize())
+            if enqueued_at is not None:
+                wait = time.monotonic() - enqueued_at
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                metrics.queue_wait.observe(wait)
+
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ingestion worker {index} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        oldest_age = (
+            time.monotonic() - next(iter(self._pending.values()))
+            if self._pending
+            else 0.0
+        )
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "max_depth": self.max_depth,
+            "oldest_age": oldest_age,
+            "avg_wait": (
+                self.total_wait / self.dequeued if self.dequeued else 0.0
+            ),
+            "max_wait": self.max_wait,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "in_flight": dict(self.in_flight),
+        }
+
+    async def log_stats(
+        self, interval: float, extra: Optional[Dict[str, Callable[[], Any]]] = None
+    ):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"Ingestion stats: {self.stats()}")
+            for name, stats in (extra or {}).items():
+                logger.info(f"{name} stats: {stats()}")
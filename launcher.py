@@ -0,0 +1,265 @@
+"""Runs the service as separate processes per role, under a supervisor.
+
+    python launcher.py                      # api + ingester (+ workers in stream mode)
+    python launcher.py --roles api          # only the API, e.g. on extra nodes
+    python launcher.py --role ingester      # one role in the foreground
+
+Roles:
+    api       uvicorn with API_WORKERS processes, uvloop and httptools
+    ingester  the Telegram listener; exactly one per Telegram session
+    worker    stream analysis workers (INGESTION_MODE=stream), STREAM_WORKERS of them
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from lib.config import api_host, api_port, api_workers, stream_workers, ingestion_mode
+from lib.metrics import mark_process_dead
+from misc.migrate import ensure_partitions
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("launcher")
+
+ROLES = ("api", "ingester", "worker")
+
+# A role that stays up this long is considered healthy again
+STABLE_AFTER = 60
+MAX_RESTART_DELAY = 60
+# How often the supervisor creates upcoming alpha_calls partitions
+PARTITION_INTERVAL = 24 * 3600
+PARTITION_TIMEOUT = 60
+
+
+def install_uvloop():
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        logger.warning("uvloop not available, using the default event loop")
+
+
+def run_api(workers: int):
+    import uvicorn
+
+    # uvicorn forks and watches the worker processes itself
+    uvicorn.run(
+        "api:app",
+        host=api_host,
+        port=api_port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+    )
+
+
+async def run_ingester():
+    from db.db_operations import db_operations
+    from telegram_client import start_telegram_client
+
+    await db_operations.connect()
+    try:
+        await start_telegram_client()
+    finally:
+        await db_operations.close()
+
+
+async def run_until_signalled(coro):
+    """Cancels the role on SIGTERM/SIGINT so its cleanup (flushes) runs."""
+    task = asyncio.ensure_future(coro)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        logger.info("Stopped")
+
+
+def run_role(role: str, api_worker_count: int):
+    if role == "api":
+        run_api(api_worker_count)
+        return
+
+    install_uvloop()
+    if role == "ingester":
+        asyncio.run(run_until_signalled(run_ingester()))
+    else:
+        from stream_worker import run_stream_worker
+
+        asyncio.run(run_until_signalled(run_stream_worker()))
+
+
+def create_partitions():
+    # Months ahead are created, so a failed run is retried the next day
+    try:
+        asyncio.run(asyncio.wait_for(ensure_partitions(), PARTITION_TIMEOUT))
+    except Exception as e:
+        logger.error(f"Could not create alpha_calls partitions: {e}")
+
+
+class Child:
+    def __init__(
+        self, name: str, command: List[str], env: Optional[Dict[str, str]] = None
+    ):
+        self.name = name
+        self.command = command
+        self.env = env or {}
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.restart_at = 0.0
+        self.failures = 0
+
+    def start(self):
+        logger.info(f"Starting {self.name}")
+        self.process = subprocess.Popen(self.command, env={**os.environ, **self.env})
+        self.started_at = time.monotonic()
+
+    def check(self):
+        """Restarts the process with exponential backoff if it exited."""
+        now = time.monotonic()
+        if self.process is None:
+            if now >= self.restart_at:
+                self.start()
+            return
+
+        code = self.process.poll()
+        if code is None:
+            if self.failures and now - self.started_at > STABLE_AFTER:
+                self.failures = 0
+            return
+
+        # Its live gauges no longer count towards the node's totals
+        mark_process_dead(self.process.pid)
+        self.failures += 1
+        delay = min(MAX_RESTART_DELAY, 2 ** (self.failures - 1))
+        logger.error(f"{self.name} exited with code {code}, restarting in {delay}s")
+        self.process = None
+        self.restart_at = now + delay
+
+    def stop(self, timeout: float):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"{self.name} did not stop in time, killing it")
+                self.process.kill()
+                self.process.wait()
+
+
+class Supervisor:
+    def __init__(
+        self,
+        roles: List[str],
+        api_worker_count: int,
+        worker_count: int,
+        periodic: Optional[List[Tuple[float, Callable[[], None]]]] = None,
+    ):
+        self.children: List[Child] = []
+        # (interval, job) pairs run every interval on a background thread, so
+        # a slow job never holds up restarts or signal handling
+        self.periodic = periodic or []
+        for role in roles:
+            count = worker_count if role == "worker" else 1
+            for i in range(count):
+                command = [
+                    sys.executable,
+                    __file__,
+                    "--role",
+                    role,
+                    "--api-workers",
+                    str(api_worker_count),
+                ]
+                name = role if count == 1 else f"{role}-{i}"
+                # Workers keep their stream consumer name across restarts
+                env = {"WORKER_INDEX": str(i)} if role == "worker" else None
+                self.children.append(Child(name, command, env))
+        self.stopping = False
+
+    def handle_signal(self, signum, frame):
+        logger.info(f"Received signal {signum}, shutting down")
+        self.stopping = True
+
+    def run(self, stop_timeout: float = 30):
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        due = [time.monotonic() + interval for interval, _ in self.periodic]
+        running: List[Optional[threading.Thread]] = [None] * len(self.periodic)
+        for child in self.children:
+            child.start()
+        try:
+            while not self.stopping:
+                for i, (interval, job) in enumerate(self.periodic):
+                    if time.monotonic() < due[i]:
+                        continue
+                    # A run still going is not started a second time
+                    if running[i] is None or not running[i].is_alive():
+                        running[i] = threading.Thread(target=job, daemon=True)
+                        running[i].start()
+                    due[i] = time.monotonic() + interval
+                for child in self.children:
+                    child.check()
+                time.sleep(1)
+        finally:
+            for child in self.children:
+                child.stop(stop_timeout)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--role", choices=ROLES, help="run a single role in-process")
+    parser.add_argument(
+        "--roles",
+        help="comma-separated roles to supervise (default: api,ingester and "
+        "worker in stream mode)",
+    )
+    parser.add_argument("--api-workers", type=int, default=api_workers)
+    parser.add_argument("--stream-workers", type=int, default=stream_workers)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.role:
+        run_role(args.role, args.api_workers)
+        sys.exit(0)
+
+    if args.roles:
+        roles = [role.strip() for role in args.roles.split(",") if role.strip()]
+        unknown = set(roles) - set(ROLES)
+        if unknown:
+            sys.exit(f"Unknown roles: {', '.join(sorted(unknown))}")
+    else:
+        roles = ["api", "ingester"] + (["worker"] if ingestion_mode == "stream" else [])
+
+    # Every role writes its metrics here so /metrics on the API covers the
+    # whole node; it must be set before any role imports prometheus_client
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix="alphacompiler-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    else:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+    # Once per launch rather than in every role process, before the roles
+    # start writing, then daily so a long-running launcher never runs out
+    create_partitions()
+    Supervisor(
+        roles,
+        args.api_workers,
+        args.stream_workers,
+        periodic=[(PARTITION_INTERVAL, create_partitions)],
+    ).run()
@@ -40,3 +40,158 @@ yearly_subscription_fee = os.getenv("YEARLY_SUBSCRIPTION_FEE")
 ethereum_node_url = os.getenv("ETHEREUM_NODE_URL")
 
 commission_percentage = os.getenv("COMMISSION_PERCENTAGE", 0.1)
+
+# Ingestion pipeline sizing
+ingestion_workers = int(os.getenv("INGESTION_WORKERS", 8))
+ingestion_queue_size = int(os.getenv("INGESTION_QUEUE_SIZE", 500))
+ingestion_enqueue_timeout = float(os.getenv("INGESTION_ENQUEUE_TIMEOUT", 30))
+ingestion_stage_limits = {
+    "media": int(os.getenv("INGESTION_MEDIA_CONCURRENCY", 4)),
+    "llm": int(os.getenv("INGESTION_LLM_CONCURRENCY", 4)),
+    "enrichment": int(os.getenv("INGESTION_ENRICHMENT_CONCURRENCY", 8)),
+    "persist": int(os.getenv("INGESTION_PERSIST_CONCURRENCY", 4)),
+}
+ingestion_stats_interval = float(os.getenv("INGESTION_STATS_INTERVAL", 60))
+
+# Process layout used by launcher.py
+api_host = os.getenv("API_HOST", "0.0.0.0")
+api_port = int(os.getenv("API_PORT", 8000))
+api_workers = int(os.getenv("API_WORKERS", os.cpu_count() or 1))
+stream_workers = int(os.getenv("STREAM_WORKERS", 2))
+
+# local: the listener analyzes messages itself
+# stream: the listener publishes them to a Redis Stream for analysis workers
+ingestion_mode = os.getenv("INGESTION_MODE", "local")
+ingestion_stream = os.getenv("INGESTION_STREAM", "ingestion:messages")
+ingestion_stream_group = os.getenv("INGESTION_STREAM_GROUP", "analysis")
+ingestion_stream_consumer = os.getenv("INGESTION_STREAM_CONSUMER")  # default below
+# Slot of this stream worker, set by launcher.py; names the consumer
+# host-worker-N so a restarted worker picks up the entries it left pending
+worker_index = os.getenv("WORKER_INDEX")
+ingestion_stream_dead_letter = os.getenv(
+    "INGESTION_STREAM_DEAD_LETTER", "ingestion:dead"
+)
+ingestion_stream_maxlen = int(os.getenv("INGESTION_STREAM_MAXLEN", 100000))
+ingestion_stream_media_ttl = int(os.getenv("INGESTION_STREAM_MEDIA_TTL", 60 * 60 * 6))
+ingestion_stream_read_count = int(os.getenv("INGESTION_STREAM_READ_COUNT", 32))
+ingestion_stream_claim_idle_ms = int(
+    os.getenv("INGESTION_STREAM_CLAIM_IDLE_MS", 5 * 60 * 1000)
+)
+ingestion_stream_max_deliveries = int(os.getenv("INGESTION_STREAM_MAX_DELIVERIES", 5))
+
+# Write-behind batching of alpha_calls inserts
+alpha_call_writer_batch_size = int(os.getenv("ALPHA_CALL_WRITER_BATCH_SIZE", 500))
+alpha_call_writer_flush_interval_ms = int(
+    os.getenv("ALPHA_CALL_WRITER_FLUSH_INTERVAL_MS", 100)
+)
+alpha_call_writer_max_pending = int(os.getenv("ALPHA_CALL_WRITER_MAX_PENDING", 5000))
+
+# Processes that analyze messages reload their ticker index from
+# alpha_call_rollups this often (seconds), picking up other writers' calls
+ticker_index_refresh_interval = int(os.getenv("TICKER_INDEX_REFRESH_INTERVAL", 300))
+
+# Gemini request scheduling
+gemini_max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", 4))
+gemini_requests_per_minute = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 60))
+gemini_tokens_per_minute = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", 1000000))
+gemini_max_retries = int(os.getenv("GEMINI_MAX_RETRIES", 4))
+gemini_pro_model = os.getenv("GEMINI_PRO_MODEL", "gemini-1.5-pro")
+
+# Fast model first, pro model only for low-confidence or image-heavy messages
+gemini_cascade_enabled = os.getenv("GEMINI_CASCADE_ENABLED", "false").lower() == "true"
+gemini_fast_model = os.getenv("GEMINI_FAST_MODEL", "gemini-1.5-flash")
+gemini_fast_max_concurrency = int(os.getenv("GEMINI_FAST_MAX_CONCURRENCY", 8))
+gemini_fast_requests_per_minute = int(
+    os.getenv("GEMINI_FAST_REQUESTS_PER_MINUTE", 1000)
+)
+gemini_fast_tokens_per_minute = int(os.getenv("GEMINI_FAST_TOKENS_PER_MINUTE", 4000000))
+gemini_cascade_confidence_threshold = float(
+    os.getenv("GEMINI_CASCADE_CONFIDENCE_THRESHOLD", 0.8)
+)
+# Images with less text than this skip the fast model
+gemini_cascade_image_text_chars = int(os.getenv("GEMINI_CASCADE_IMAGE_TEXT_CHARS", 40))
+
+# Per-worker cache of /trending_tokens responses, dropped on new alpha calls
+trending_cache_l1_size = int(os.getenv("TRENDING_CACHE_L1_SIZE", 256))
+trending_cache_l1_ttl = int(os.getenv("TRENDING_CACHE_L1_TTL", 60))
+# Redis entries are rebuilt in the background after the soft TTL and served
+# meanwhile; the hard TTL bounds how stale a served entry can get
+trending_cache_soft_ttl = int(os.getenv("TRENDING_CACHE_SOFT_TTL", 60))
+trending_cache_hard_ttl = int(os.getenv("TRENDING_CACHE_HARD_TTL", 60 * 10))
+trending_invalidate_interval_ms = int(
+    os.getenv("TRENDING_INVALIDATE_INTERVAL_MS", 1000)
+)
+
+# Hourly mention counters in Redis sorted sets; longer windows use Postgres
+trending_counters_enabled = (
+    os.getenv("TRENDING_COUNTERS_ENABLED", "true").lower() == "true"
+)
+trending_counters_max_window_hours = int(
+    os.getenv("TRENDING_COUNTERS_MAX_WINDOW_HOURS", 24 * 30)
+)
+
+# DexScreener data of trending tokens, refreshed ahead of expiry by one API
+# worker for addresses served within the tracking TTL
+market_data_ttl = int(os.getenv("MARKET_DATA_TTL", 60 * 5))
+# Addresses DexScreener has no pairs for; short, since new tokens list fast
+market_data_negative_ttl = int(os.getenv("MARKET_DATA_NEGATIVE_TTL", 60))
+market_data_refresh_interval = int(os.getenv("MARKET_DATA_REFRESH_INTERVAL", 60))
+market_data_track_ttl = int(os.getenv("MARKET_DATA_TRACK_TTL", 60 * 60))
+market_data_max_concurrency = int(os.getenv("MARKET_DATA_MAX_CONCURRENCY", 4))
+
+# /trending_tokens/stream: recompute period, keepalive period (seconds) and
+# how many unread updates a slow client may have before it is disconnected
+trending_stream_interval = float(os.getenv("TRENDING_STREAM_INTERVAL", 5))
+trending_stream_heartbeat = float(os.getenv("TRENDING_STREAM_HEARTBEAT", 15))
+trending_stream_queue_size = int(os.getenv("TRENDING_STREAM_QUEUE_SIZE", 32))
+
+# Analysis result cache for duplicate/forwarded messages
+analysis_cache_ttl = int(os.getenv("ANALYSIS_CACHE_TTL", 60 * 60 * 6))
+analysis_cache_l1_size = int(os.getenv("ANALYSIS_CACHE_L1_SIZE", 1024))
+
+# In-memory image preprocessing before LLM analysis
+image_max_side = int(os.getenv("IMAGE_MAX_SIDE", 1024))
+image_jpeg_quality = int(os.getenv("IMAGE_JPEG_QUALITY", 85))
+image_processing_workers = int(os.getenv("IMAGE_PROCESSING_WORKERS", 2))
+
+# Micro-batching of text-only Gemini analyses
+gemini_batch_enabled = os.getenv("GEMINI_BATCH_ENABLED", "false").lower() == "true"
+gemini_batch_max_size = int(os.getenv("GEMINI_BATCH_MAX_SIZE", 10))
+gemini_batch_max_wait_ms = int(os.getenv("GEMINI_BATCH_MAX_WAIT_MS", 250))
+
+# Catch-up of messages posted while the ingester was down
+telegram_backfill_enabled = (
+    os.getenv("TELEGRAM_BACKFILL_ENABLED", "true").lower() == "true"
+)
+telegram_backfill_seed_limit = int(os.getenv("TELEGRAM_BACKFILL_SEED_LIMIT", 200))
+telegram_backfill_concurrency = int(os.getenv("TELEGRAM_BACKFILL_CONCURRENCY", 3))
+telegram_backfill_page_size = int(os.getenv("TELEGRAM_BACKFILL_PAGE_SIZE", 100))
+telegram_flood_sleep_threshold = int(os.getenv("TELEGRAM_FLOOD_SLEEP_THRESHOLD", 60))
+
+# Cached channel entities/metadata, re-fetched in the background
+channel_metadata_refresh_interval = int(
+    os.getenv("CHANNEL_METADATA_REFRESH_INTERVAL", 60 * 60 * 6)
+)
+
+# Ticker/address -> token resolution cache for DexScreener search
+token_resolution_ttl = int(os.getenv("TOKEN_RESOLUTION_TTL", 60 * 60))
+token_resolution_negative_ttl = int(os.getenv("TOKEN_RESOLUTION_NEGATIVE_TTL", 60 * 5))
+token_resolution_l1_size = int(os.getenv("TOKEN_RESOLUTION_L1_SIZE", 2048))
+
+# Shared outbound HTTP client
+http_timeout = float(os.getenv("HTTP_TIMEOUT", 5))
+http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 2))
+http_pool_size = int(os.getenv("HTTP_POOL_SIZE", 100))
+http_pool_size_per_host = int(os.getenv("HTTP_POOL_SIZE_PER_HOST", 20))
+http_dns_cache_ttl = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+http_hedge_after_ms = int(os.getenv("HTTP_HEDGE_AFTER_MS", 0))  # 0 disables hedging
+http_breaker_failure_threshold = int(os.getenv("HTTP_BREAKER_FAILURE_THRESHOLD", 5))
+http_breaker_reset_timeout = float(os.getenv("HTTP_BREAKER_RESET_TIMEOUT", 30))
+http_stale_cache_size = int(os.getenv("HTTP_STALE_CACHE_SIZE", 1024))
+
+# Upstream providers; point these at local fakes for offline benchmarking
+llm_provider = os.getenv("LLM_PROVIDER", "gemini")  # gemini | fake
+fake_llm_latency_ms = float(os.getenv("FAKE_LLM_LATENCY_MS", 800))
+fake_llm_fast_latency_ms = float(os.getenv("FAKE_LLM_FAST_LATENCY_MS", 250))
+fake_llm_error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", 0.02))
+dexscreener_api_url = os.getenv("DEXSCREENER_API_URL", "https://api.dexscreener.com")
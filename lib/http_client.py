@@ -0,0 +1,212 @@
+import asyncio
+import time
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from cachetools import LRUCache
+from lib.config import (
+    http_timeout,
+    http_connect_timeout,
+    http_pool_size,
+    http_pool_size_per_host,
+    http_dns_cache_ttl,
+    http_hedge_after_ms,
+    http_breaker_failure_threshold,
+    http_breaker_reset_timeout,
+    http_stale_cache_size,
+)
+from lib import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    def __init__(self, url: str, status: int):
+        super().__init__(f"{url} returned {status}")
+        self.status = status
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets a single
+    trial request through once `reset_timeout` has passed."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """Application-wide aiohttp session for outbound JSON APIs.
+
+    Keeps one pooled connector with DNS caching and strict timeouts, a
+    circuit breaker per host, and the last good response per URL so callers
+    keep getting (stale) data while an upstream is failing.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stale: LRUCache = LRUCache(maxsize=http_stale_cache_size)
+        self.hedge_after = http_hedge_after_ms / 1000 if http_hedge_after_ms else None
+        self.hedges = 0
+        self.stale_served = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=http_pool_size,
+                limit_per_host=http_pool_size_per_host,
+                ttl_dns_cache=http_dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=http_timeout, connect=http_connect_timeout
+                ),
+            )
+        return self._session
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                http_breaker_failure_threshold, http_breaker_reset_timeout
+            )
+        return self.breakers[host]
+
+    async def get_json(self, url: str, hedge: bool = True) -> Any:
+        """GET a JSON document.
+
+        Falls back to the last good response for the URL when the request
+        fails or the host's circuit is open; raises if there is none.
+        """
+        breaker = self.breaker(url)
+        requests = metrics.upstream_requests.labels
+        host = urlsplit(url).netloc
+        if not breaker.allow():
+            requests(host=host, outcome="circuit_open").inc()
+            return self._serve_stale(url, CircuitOpenError(f"Circuit open for {url}"))
+        # Allowed while the circuit is not closed: this is the half-open trial
+        trial = breaker.opened_at is not None
+
+        try:
+            if hedge and self.hedge_after:
+                data = await self._hedged_get(url)
+            else:
+                data = await self._get(url)
+        except UpstreamError as e:
+            requests(host=host, outcome="error").inc()
+            # Only throttling and server errors say anything about upstream health
+            if e.status == 429 or e.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return self._serve_stale(url, e)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Connection errors, timeouts, but also e.g. an HTML error page
+            # that fails to decode as JSON
+            requests(host=host, outcome="error").inc()
+            breaker.record_failure()
+            return self._serve_stale(url, e)
+        finally:
+            if trial:
+                # Cancelled trials must not keep the circuit open for good
+                breaker.trial_in_flight = False
+
+        requests(host=host, outcome="ok").inc()
+        breaker.record_success()
+        self.stale[url] = data
+        return data
+
+    def _serve_stale(self, url: str, error: Exception) -> Any:
+        if url in self.stale:
+            self.stale_served += 1
+            logger.warning(f"Serving stale response for {url}: {error}")
+            return self.stale[url]
+        raise error
+
+    async def _get(self, url: str) -> Any:
+        async with self.session.get(url) as response:
+            if response.status != 200:
+                raise UpstreamError(url, response.status)
+            return await response.json()
+
+    async def _hedged_get(self, url: str) -> Any:
+        """Sends a second identical request if the first one is slow and
+        returns whichever succeeds first."""
+        first = asyncio.create_task(self._get(url))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        if done:
+            return first.result()
+
+        self.hedges += 1
+        pending = {first, asyncio.create_task(self._get(url))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breakers": {host: b.state for host, b in self.breakers.items()},
+            "hedges": self.hedges,
+            "stale_served": self.stale_served,
+        }
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+http_client = HttpClient()
@@ -0,0 +1,144 @@
+"""Prometheus metrics for the API and the ingestion path.
+
+When PROMETHEUS_MULTIPROC_DIR is set (launcher.py sets it for every role),
+each process writes its samples there and `/metrics` on any API worker
+reports the sum over all processes on the node.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Seconds; covers cache hits through slow Gemini calls with retries
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "API request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+messages_received = Counter(
+    "ingestion_messages_received_total",
+    "Messages received from Telegram",
+    ["channel"],
+)
+messages_processed = Counter(
+    "ingestion_messages_processed_total",
+    "Messages by how analysis ended",
+    # skipped | alpha_call | not_alpha_call | incomplete | failed
+    ["outcome"],
+)
+messages_dropped = Counter(
+    "ingestion_messages_dropped_total", "Messages dropped on a full ingestion queue"
+)
+queue_depth = Gauge(
+    "ingestion_queue_depth",
+    "Messages waiting for an ingestion worker",
+    multiprocess_mode="livesum",
+)
+queue_wait = Histogram(
+    "ingestion_queue_wait_seconds",
+    "Time from submit until a worker picks a message up",
+    buckets=LATENCY_BUCKETS,
+)
+stage_wait = Histogram(
+    "ingestion_stage_wait_seconds",
+    "Time spent waiting for a stage's concurrency slot",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+stage_duration = Histogram(
+    "ingestion_stage_duration_seconds",
+    "Time spent inside a stage (media, llm, enrichment, persist)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+extractions = Counter(
+    "ingestion_extractions_total",
+    "Local extractor decisions",
+    ["decision"],  # skip | local | escalate
+)
+llm_requests = Counter(
+    "llm_requests_total",
+    "Model requests by outcome",
+    ["model", "outcome"],  # success | retry | error
+)
+llm_request_duration = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of a single model request",
+    ["model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+llm_cascade_decisions = Counter(
+    "llm_cascade_decisions_total",
+    "Where the fast -> pro model cascade settled each analysis",
+    # fast_accepted | escalated_low_confidence | escalated_failed | pro_direct_image
+    ["decision"],
+)
+llm_cascade_confidence = Histogram(
+    "llm_cascade_confidence",
+    "Confidence reported by the fast model",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+llm_tokens = Counter("llm_tokens_total", "Tokens reported by the model", ["model"])
+cache_lookups = Counter(
+    "cache_lookups_total",
+    "Lookups in the analysis, token resolution and trending caches",
+    ["cache", "result"],  # l1_hit | l2_hit | hit | miss | coalesced
+)
+upstream_requests = Counter(
+    "upstream_requests_total",
+    "Outbound HTTP requests by host and outcome",
+    ["host", "outcome"],  # ok | error | circuit_open
+)
+trending_streams = Gauge(
+    "trending_streams_open",
+    "Open /trending_tokens/stream connections",
+    multiprocess_mode="livesum",
+)
+alpha_call_insert_duration = Histogram(
+    "alpha_call_insert_duration_seconds",
+    "Latency of one alpha_calls COPY batch",
+    buckets=LATENCY_BUCKETS,
+)
+alpha_call_inserts = Counter(
+    "alpha_call_inserts_total",
+    "alpha_calls rows by write outcome",
+    ["outcome"],  # written | duplicate | failed
+)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric = histogram.labels(**labels) if labels else histogram
+        metric.observe(time.perf_counter() - started)
+
+
+def render() -> bytes:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead(pid: int):
+    """Drops live gauges of a process that exited (multiprocess mode only)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
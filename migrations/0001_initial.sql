@@ -0,0 +1,74 @@
+-- Schema as created by the old misc/create_tables.py and sql/*.sql.
+-- IF NOT EXISTS so existing databases adopt the migrations unchanged.
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) UNIQUE,
+    wallet_address VARCHAR(255) UNIQUE,
+    role VARCHAR(20) DEFAULT 'basic',
+    stripe_customer_id VARCHAR(255),
+    stripe_subscription_id VARCHAR(255),
+    subscription_end_date TIMESTAMP,
+    crypto_customer_id VARCHAR(255),
+    affiliate_code VARCHAR(255),
+    referred_by_user_id INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    payout_option VARCHAR(20) DEFAULT 'USDT'
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id),
+    plan VARCHAR(20) NOT NULL,
+    start_date TIMESTAMP NOT NULL,
+    end_date TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS referrals (
+    id SERIAL PRIMARY KEY,
+    referrer_id INTEGER REFERENCES users(id),
+    referred_id INTEGER REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(referrer_id, referred_id)
+);
+
+CREATE TABLE IF NOT EXISTS commissions (
+    id SERIAL PRIMARY KEY,
+    referrer_id INTEGER REFERENCES users(id),
+    referred_id INTEGER REFERENCES users(id),
+    amount DECIMAL(10, 2),
+    status VARCHAR(20) DEFAULT 'pending',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS alpha_calls (
+    id SERIAL PRIMARY KEY,
+    token_ticker VARCHAR(20) NOT NULL,
+    token_address TEXT,
+    token_name VARCHAR(100),
+    token_image TEXT,
+    network VARCHAR(50) NOT NULL,
+    additional_info TEXT,
+    channel_name VARCHAR(100) NOT NULL,
+    message_url TEXT NOT NULL,
+    date TIMESTAMP NOT NULL,
+    long_term BOOLEAN NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS alpha_call_rollups (
+    bucket TIMESTAMP NOT NULL,
+    token_ticker VARCHAR(20) NOT NULL,
+    network VARCHAR(50) NOT NULL,
+    token_address TEXT NOT NULL DEFAULT '',
+    mention_count INTEGER NOT NULL,
+    latest_date TIMESTAMP NOT NULL,
+    token_name VARCHAR(100),
+    token_image TEXT,
+    PRIMARY KEY (bucket, token_ticker, network, token_address)
+);
+
+CREATE TABLE IF NOT EXISTS channel_checkpoints (
+    channel_id BIGINT PRIMARY KEY,
+    last_message_id BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
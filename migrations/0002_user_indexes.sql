@@ -0,0 +1,13 @@
+-- Columns UserRepository filters on per request. email and wallet_address
+-- are already covered by their UNIQUE constraints.
+
+CREATE INDEX IF NOT EXISTS idx_users_affiliate_code ON users (affiliate_code);
+CREATE INDEX IF NOT EXISTS idx_users_stripe_subscription_id
+    ON users (stripe_subscription_id);
+CREATE INDEX IF NOT EXISTS idx_users_referred_by_user_id
+    ON users (referred_by_user_id);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_user_id ON subscriptions (user_id);
+-- referrals (referrer_id, referred_id) is covered by its UNIQUE constraint
+CREATE INDEX IF NOT EXISTS idx_referrals_referred_id ON referrals (referred_id);
+CREATE INDEX IF NOT EXISTS idx_commissions_referrer_id ON commissions (referrer_id);
+CREATE INDEX IF NOT EXISTS idx_commissions_referred_id ON commissions (referred_id);
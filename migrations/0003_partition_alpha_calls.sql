@@ -0,0 +1,88 @@
+-- alpha_calls becomes range-partitioned by month on date. Existing rows are
+-- copied over inside this migration's transaction, which locks the table
+-- until it commits; run it while ingestion is stopped.
+
+CREATE OR REPLACE FUNCTION create_alpha_call_partition(month_start DATE)
+RETURNS VOID AS $$
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF alpha_calls '
+        'FOR VALUES FROM (%L) TO (%L)',
+        'alpha_calls_' || to_char(month_start, 'YYYY_MM'),
+        month_start,
+        (month_start + INTERVAL '1 month')::DATE
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Creates this month's partition and the next `months_ahead` ones. Called by
+-- misc/migrate.py and on every service start, from concurrent processes.
+CREATE OR REPLACE FUNCTION ensure_alpha_call_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS VOID AS $$
+DECLARE
+    this_month DATE := date_trunc('month', now() AT TIME ZONE 'UTC')::DATE;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('alpha_calls_partitions'));
+    FOR i IN 0..months_ahead LOOP
+        PERFORM create_alpha_call_partition(
+            (this_month + make_interval(months => i))::DATE
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE alpha_calls RENAME TO alpha_calls_unpartitioned;
+-- Keep ids continuing from the old table
+ALTER SEQUENCE alpha_calls_id_seq OWNED BY NONE;
+
+CREATE TABLE alpha_calls (
+    id INTEGER NOT NULL DEFAULT nextval('alpha_calls_id_seq'),
+    token_ticker VARCHAR(20) NOT NULL,
+    token_address TEXT,
+    token_name VARCHAR(100),
+    token_image TEXT,
+    network VARCHAR(50) NOT NULL,
+    additional_info TEXT,
+    channel_name VARCHAR(100) NOT NULL,
+    message_url TEXT NOT NULL,
+    date TIMESTAMP NOT NULL,
+    long_term BOOLEAN NOT NULL
+) PARTITION BY RANGE (date);
+
+ALTER SEQUENCE alpha_calls_id_seq OWNED BY alpha_calls.id;
+
+-- Rows outside every month partition (clock skew, bad dates) land here
+-- instead of failing a whole insert batch
+CREATE TABLE alpha_calls_default PARTITION OF alpha_calls DEFAULT;
+
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    SELECT date_trunc('month', MIN(date))::DATE INTO month_start
+    FROM alpha_calls_unpartitioned;
+    WHILE month_start < date_trunc('month', now() AT TIME ZONE 'UTC')::DATE LOOP
+        PERFORM create_alpha_call_partition(month_start);
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+END;
+$$;
+SELECT ensure_alpha_call_partitions();
+
+INSERT INTO alpha_calls SELECT
+    id, token_ticker, token_address, token_name, token_image, network,
+    additional_info, channel_name, message_url, date, long_term
+FROM alpha_calls_unpartitioned;
+
+DROP TABLE alpha_calls_unpartitioned;
+
+-- Defined on the parent, so every partition gets them. Loaded after the
+-- copy, which is faster than maintaining them row by row.
+ALTER TABLE alpha_calls ADD PRIMARY KEY (id, date);
+-- Rows arrive in date order, so a BRIN index serves the trending and
+-- rollup rebuild range scans at a fraction of a btree's size
+CREATE INDEX idx_alpha_calls_date ON alpha_calls USING BRIN (date);
+CREATE INDEX idx_alpha_calls_ticker_network ON alpha_calls (token_ticker, network);
+CREATE INDEX idx_alpha_calls_token_address ON alpha_calls (token_address);
+
+ANALYZE alpha_calls;
@@ -0,0 +1,44 @@
+-- create_alpha_call_partition failed once alpha_calls_default held rows of
+-- the month being added: Postgres refuses to create a partition whose range
+-- has rows in the default partition. Such rows are now moved into the new
+-- partition: the default is detached, the partition created, the rows moved
+-- and the default reattached, all in the caller's transaction. Partitions
+-- are created by misc/migrate.py and when launcher.py starts.
+
+CREATE OR REPLACE FUNCTION create_alpha_call_partition(month_start DATE)
+RETURNS VOID AS $$
+DECLARE
+    partition_name TEXT := 'alpha_calls_' || to_char(month_start, 'YYYY_MM');
+    month_end DATE := (month_start + INTERVAL '1 month')::DATE;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM alpha_calls_default
+        WHERE date >= month_start AND date < month_end
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF alpha_calls FOR VALUES FROM (%L) TO (%L)',
+            partition_name, month_start, month_end
+        );
+        RETURN;
+    END IF;
+
+    -- Blocks writers to alpha_calls until the caller commits
+    ALTER TABLE alpha_calls DETACH PARTITION alpha_calls_default;
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF alpha_calls FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, month_end
+    );
+    EXECUTE format(
+        'WITH moved AS ('
+        '    DELETE FROM alpha_calls_default WHERE date >= %L AND date < %L'
+        '    RETURNING *'
+        ') INSERT INTO %I SELECT * FROM moved',
+        month_start, month_end, partition_name
+    );
+    ALTER TABLE alpha_calls ATTACH PARTITION alpha_calls_default DEFAULT;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,16 @@
+-- A message is saved as at most one alpha call. Backfills and restarts
+-- replay messages that were already saved, so inserts skip rows whose
+-- (message_url, date) exists. date is part of the key because unique
+-- constraints on a partitioned table must include the partition key; a
+-- message's date never changes between replays.
+
+-- Duplicates saved by earlier replays; the first copy is kept. Rebuild the
+-- rollups afterwards (python -m misc.rebuild_rollups), they counted them.
+DELETE FROM alpha_calls a
+USING alpha_calls b
+WHERE a.message_url = b.message_url
+    AND a.date = b.date
+    AND a.id > b.id;
+
+ALTER TABLE alpha_calls
+    ADD CONSTRAINT alpha_calls_message_url_date_key UNIQUE (message_url, date);
@@ -0,0 +1,134 @@
+"""Offline throughput/latency benchmark of the ingestion pipeline.
+
+Runs scripted messages through the real queue, extractor, analysis cache,
+Gemini scheduler and DexScreener enrichment, with the model and DexScreener
+replaced by local fakes. Nothing is saved unless --persist is given.
+
+    python -m misc.benchmark_pipeline --messages 2000 --model-latency-ms 600
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--script", help="JSONL script instead of generated messages")
+    parser.add_argument("--rate", type=float, default=0, help="messages/s, 0 = max")
+    parser.add_argument("--model-latency-ms", type=float, default=800)
+    parser.add_argument("--model-error-rate", type=float, default=0.02)
+    parser.add_argument("--dex-latency-ms", type=float, default=150)
+    parser.add_argument("--dex-error-rate", type=float, default=0.0)
+    parser.add_argument("--dex-port", type=int, default=8081)
+    parser.add_argument("--rpm", type=int, default=100000, help="Gemini RPM budget")
+    parser.add_argument(
+        "--cascade", action="store_true", help="fast model first, then pro"
+    )
+    parser.add_argument("--fast-model-latency-ms", type=float, default=250)
+    parser.add_argument("--persist", action="store_true", help="save to Postgres")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(args):
+    # Configuration is read at import time, so providers are chosen first
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.model_latency_ms)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.model_error_rate)
+    os.environ["DEXSCREENER_API_URL"] = f"http://127.0.0.1:{args.dex_port}"
+    os.environ["GEMINI_REQUESTS_PER_MINUTE"] = str(args.rpm)
+    os.environ["GEMINI_FAST_REQUESTS_PER_MINUTE"] = str(args.rpm)
+    os.environ["GEMINI_CASCADE_ENABLED"] = "true" if args.cascade else "false"
+    os.environ["FAKE_LLM_FAST_LATENCY_MS"] = str(args.fast_model_latency_ms)
+    os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost")
+    os.environ.setdefault("TELEGRAM_CHANNEL_USERNAMES", "")
+
+    from providers.fake_dexscreener import FakeDexScreener
+    from providers.scripted_source import ScriptedMessageSource, generate_script
+    from db.db_operations import db_operations
+    from lib.http_client import http_client
+    import telegram_client
+
+    dex = FakeDexScreener(
+        args.dex_latency_ms, error_rate=args.dex_error_rate, seed=args.seed
+    )
+    await dex.start(port=args.dex_port)
+    if args.persist:
+        await db_operations.connect()
+        await db_operations.token_repo.load_ticker_index()
+        db_operations.token_repo.alpha_call_writer.start()
+
+    if args.script:
+        source = ScriptedMessageSource.from_file(args.script, args.rate)
+    else:
+        source = ScriptedMessageSource(
+            generate_script(args.messages, args.channels, args.seed), args.rate
+        )
+
+    latencies = []
+    alpha_calls = 0
+    pipeline = telegram_client.pipeline
+
+    async def handle(event):
+        nonlocal alpha_calls
+        alpha_call = await telegram_client.analyze_message(
+            event.message, event.get_chat
+        )
+        if alpha_call:
+            alpha_calls += 1
+            if args.persist:
+                async with pipeline.stage("persist"):
+                    await db_operations.token_repo.save_alpha_call(alpha_call)
+        latencies.append(time.monotonic() - event.created_at)
+
+    pipeline.handler = handle
+    pipeline.start()
+    started = time.monotonic()
+    try:
+        await source.run(pipeline.submit)
+        await pipeline.queue.join()
+    finally:
+        elapsed = time.monotonic() - started
+        await pipeline.stop()
+        if args.persist:
+            await db_operations.token_repo.alpha_call_writer.stop()
+        await http_client.close()
+        await dex.stop()
+        telegram_client.gemini_scheduler.shutdown()
+        if telegram_client.gemini_cascade:
+            telegram_client.gemini_cascade.shutdown()
+        telegram_client.image_processing.shutdown()
+        if args.persist:
+            await db_operations.close()
+
+    print(f"messages:        {len(latencies)}")
+    print(f"alpha calls:     {alpha_calls}")
+    print(f"elapsed:         {elapsed:.2f}s")
+    print(f"throughput:      {len(latencies) / elapsed:.1f} msg/s")
+    if latencies:
+        print(f"latency mean:    {statistics.mean(latencies) * 1000:.0f} ms")
+        for pct in (50, 90, 99):
+            print(f"latency p{pct}:     {percentile(latencies, pct) * 1000:.0f} ms")
+    print(f"pipeline:        {pipeline.stats()}")
+    print(f"gemini:          {telegram_client.gemini_scheduler.stats()}")
+    if telegram_client.gemini_cascade:
+        print(f"cascade:         {telegram_client.gemini_cascade.stats()}")
+    print(f"analysis cache:  {telegram_client.analysis_cache.stats()}")
+    print(f"token resolver:  {telegram_client.token_resolver.stats()}")
+    print(f"dexscreener:     {dex.requests} requests")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,100 @@
+"""Applies the numbered SQL files in migrations/ that haven't run yet.
+
+    python -m misc.migrate            # apply pending migrations
+    python -m misc.migrate --status   # list applied and pending ones
+
+Each file runs in its own transaction and is recorded in schema_migrations.
+Afterwards, the upcoming monthly alpha_calls partitions are created; the
+launcher does that too (see `ensure_partitions`).
+"""
+
+import argparse
+import asyncio
+import re
+from pathlib import Path
+from typing import List, Tuple
+import asyncpg
+from lib.config import pg_user, pg_password, pg_database, pg_host
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Serializes runners started at the same time, e.g. by several nodes
+MIGRATION_LOCK_ID = 7305124301
+
+
+def find_migrations() -> List[Tuple[int, str, Path]]:
+    migrations = []
+    for path in MIGRATIONS_DIR.iterdir():
+        match = MIGRATION_FILE.match(path.name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), path))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise SystemExit("Duplicate migration numbers in migrations/")
+    return migrations
+
+
+async def applied_versions(conn) -> set:
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC')
+        )
+        """)
+    rows = await conn.fetch("SELECT version FROM schema_migrations")
+    return {row["version"] for row in rows}
+
+
+async def connect():
+    return await asyncpg.connect(
+        user=pg_user, password=pg_password, database=pg_database, host=pg_host
+    )
+
+
+async def ensure_partitions():
+    """Creates this month's and the next alpha_calls partitions if missing."""
+    conn = await connect()
+    try:
+        await conn.execute("SELECT ensure_alpha_call_partitions()")
+    finally:
+        await conn.close()
+
+
+async def migrate(status_only: bool = False):
+    conn = await connect()
+    try:
+        await conn.execute("SET timezone TO 'UTC';")
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        applied = await applied_versions(conn)
+        pending = [m for m in find_migrations() if m[0] not in applied]
+
+        if status_only:
+            for version, name, _ in find_migrations():
+                state = "pending" if version not in applied else "applied"
+                print(f"{version:04d} {name}: {state}")
+            return
+
+        for version, name, path in pending:
+            print(f"Applying {path.name}")
+            async with conn.transaction():
+                await conn.execute(path.read_text())
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    version,
+                    name,
+                )
+        if not pending:
+            print("Database is up to date")
+
+        await conn.execute("SELECT ensure_alpha_call_partitions()")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="only list migrations")
+    asyncio.run(migrate(parser.parse_args().status))
@@ -0,0 +1,29 @@
+"""Recomputes alpha_call_rollups from the raw alpha_calls rows.
+
+Run once after creating the table, and whenever rows were changed outside
+the alpha call writer. Rebuilds only from a given hour on with --since.
+
+    python -m misc.rebuild_rollups --since 2024-08-01T00:00:00
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+from db.db_operations import db_operations
+
+
+async def rebuild(since):
+    await db_operations.db.connect()
+    try:
+        result = await db_operations.token_repo.rebuild_rollups(since)
+        print(f"Rollups rebuilt: {result}")
+        # The Redis mention counters are seeded from the rollups
+        await db_operations.token_repo.seed_mention_counters(force=True)
+    finally:
+        await db_operations.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", type=datetime.fromisoformat, help="naive UTC")
+    asyncio.run(rebuild(parser.parse_args().since))
@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable
+
+
+class MessageSource(ABC):
+    """Produces Telethon-like NewMessage events.
+
+    Events expose `.message` (with `id`, `text`, `date`, `media`, `photo`,
+    `document`, `peer_id` and `download_media`) and an async `get_chat()`.
+    """
+
+    @abstractmethod
+    async def run(self, on_event: Callable[[Any], Awaitable[None]]) -> None:
+        pass
+
+
+class LanguageModel(ABC):
+    """The subset of `genai.GenerativeModel` the analysis code relies on.
+
+    `generate_content` is blocking and is called from a worker thread; the
+    response needs `.text` and may carry `.usage_metadata`.
+    """
+
+    @abstractmethod
+    def generate_content(self, contents) -> Any:
+        pass
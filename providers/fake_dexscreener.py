@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from typing import Optional
+from aiohttp import web
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+EVM_CHAINS = ["ethereum", "bsc", "base", "arbitrum"]
+
+
+def _digest(seed: str) -> bytes:
+    return hashlib.sha256(seed.encode()).digest()
+
+
+def _base58(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    return encoded
+
+
+def address_for(chain_id: str, seed: str) -> str:
+    if chain_id == "solana":
+        return _base58(_digest(f"{chain_id}:{seed}"))
+    return "0x" + _digest(f"{chain_id}:{seed}").hex()[:40]
+
+
+def chain_for_address(address: str) -> str:
+    if address.startswith("0x"):
+        return EVM_CHAINS[_digest(address.lower())[0] % len(EVM_CHAINS)]
+    return "solana"
+
+
+def make_pair(chain_id: str, address: str, symbol: Optional[str] = None) -> dict:
+    """A DexScreener-shaped pair whose numbers are stable for an address."""
+    rng = random.Random(_digest(address.lower()))
+    symbol = symbol or "".join(
+        rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(4)
+    )
+    price = rng.uniform(0.000001, 2.0)
+    quote_symbol = "SOL" if chain_id == "solana" else "WETH"
+    # Prices drift a little between requests, like a live market
+    drift = 1 + rng.uniform(-0.02, 0.02) * (time.time() % 60) / 60
+    return {
+        "chainId": chain_id,
+        "dexId": "raydium" if chain_id == "solana" else "uniswap",
+        "url": f"https://dexscreener.com/{chain_id}/{address}",
+        "pairAddress": address_for(chain_id, f"pair:{address}"),
+        "baseToken": {"address": address, "name": f"{symbol} Token", "symbol": symbol},
+        "quoteToken": {
+            "address": address_for(chain_id, quote_symbol),
+            "name": quote_symbol,
+            "symbol": quote_symbol,
+        },
+        "priceNative": f"{price / 150:.10f}",
+        "priceUsd": f"{price * drift:.10f}",
+        "txns": {
+            "h24": {"buys": rng.randint(10, 5000), "sells": rng.randint(10, 5000)}
+        },
+        "volume": {
+            "h24": round(rng.uniform(1e3, 5e6), 2),
+            "h6": round(rng.uniform(1e2, 1e6), 2),
+            "h1": round(rng.uniform(10, 2e5), 2),
+            "m5": round(rng.uniform(0, 2e4), 2),
+        },
+        "priceChange": {
+            "m5": round(rng.uniform(-5, 5), 2),
+            "h1": round(rng.uniform(-20, 20), 2),
+            "h6": round(rng.uniform(-40, 40), 2),
+            "h24": round(rng.uniform(-80, 300), 2),
+        },
+        "liquidity": {
+            "usd": round(rng.uniform(5e3, 2e6), 2),
+            "base": rng.randint(10**6, 10**9),
+            "quote": round(rng.uniform(10, 5000), 2),
+        },
+        "fdv": rng.randint(10**4, 10**9),
+        "pairCreatedAt": int(time.time() * 1000) - rng.randint(0, 90) * 86400000,
+        "info": {"imageUrl": f"https://example.invalid/{symbol.lower()}.png"},
+    }
+
+
+class FakeDexScreener:
+    """Local server for the DexScreener endpoints we call.
+
+    Serves `/latest/dex/search` and `/latest/dex/tokens/{addresses}` with
+    deterministic payloads, after a configurable latency and with a share of
+    429/503 responses.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 150,
+        jitter_ms: float = 100,
+        error_rate: float = 0.0,
+        not_found_rate: float = 0.1,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.app = web.Application()
+        self.app.router.add_get("/latest/dex/search", self.search)
+        self.app.router.add_get("/latest/dex/tokens/{addresses}", self.tokens)
+        self.runner: Optional[web.AppRunner] = None
+
+    async def _simulate(self) -> Optional[web.Response]:
+        self.requests += 1
+        await asyncio.sleep(
+            max(0.0, self.latency + self.random.uniform(-1, 1) * self.jitter)
+        )
+        if self.random.random() < self.error_rate:
+            return web.json_response(
+                {"error": "simulated"}, status=self.random.choice([429, 503])
+            )
+        return None
+
+    async def search(self, request: web.Request) -> web.Response:
+        error = await self._simulate()
+        if error:
+            return error
+
+        query = request.query.get("q", "")
+        if query.startswith("0x") or len(query) >= 32:
+            pairs = [make_pair(chain_for_address(query), query)]
+        elif _digest(query)[0] / 255 < self.not_found_rate:
+            pairs = []
+        else:
+            # A ticker usually exists on a few chains; the first is the biggest
+            chains = ["solana"] + EVM_CHAINS
+            count = 1 + _digest(query)[1] % 3
+            pairs = [
+                make_pair(chain_id, address_for(chain_id, query), query.upper())
+                for chain_id in chains[:count]
+            ]
+        return web.json_response({"schemaVersion": "1.0.0", "pairs": pairs})
+
+    async def tokens(self, request: web.Request) -> web.Response:
+        error = await self._simulate()
+        if error:
+            return error
+
+        addresses = request.match_info["addresses"].split(",")[:30]
+        pairs = [
+            make_pair(chain_for_address(address), address) for address in addresses
+        ]
+        return web.json_response({"schemaVersion": "1.0.0", "pairs": pairs})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> str:
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake DexScreener API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeDexScreener(args.latency_ms, args.jitter_ms, args.error_rate)
+    web.run_app(server.app, host=args.host, port=args.port)
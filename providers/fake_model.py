@@ -0,0 +1,87 @@
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Optional
+from google.api_core import exceptions as google_exceptions
+from providers.base import LanguageModel
+from token_extractor import extract_token_signals
+
+MESSAGE_RE = re.compile(r"Message: (.*?)\n\s*Determine if", re.DOTALL)
+BATCH_RE = re.compile(r"Messages: (\[.*?\])\n\s*Determine if", re.DOTALL)
+
+
+class FakeModel(LanguageModel):
+    """Offline stand-in for Gemini with configurable latency and error rate.
+
+    Answers are derived from the message text with the local token
+    extractor, so downstream enrichment and persistence see realistic calls.
+    A share of requests fail with 429/503 to exercise the retry path.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        jitter_ms: float = 400,
+        error_rate: float = 0.02,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    def generate_content(self, contents):
+        prompt = contents[0] if isinstance(contents, list) else contents
+        has_image = isinstance(contents, list) and len(contents) > 1
+        time.sleep(max(0.0, self.latency + self.random.uniform(-1, 1) * self.jitter))
+
+        if self.random.random() < self.error_rate:
+            error = self.random.choice(
+                [
+                    google_exceptions.ResourceExhausted,
+                    google_exceptions.ServiceUnavailable,
+                ]
+            )
+            raise error("Simulated upstream failure")
+
+        batch = BATCH_RE.search(prompt)
+        if batch:
+            messages = json.loads(batch.group(1))
+            result = [
+                {"message_id": m["message_id"], **self._analyze(m["text"], False)}
+                for m in messages
+            ]
+        else:
+            match = MESSAGE_RE.search(prompt)
+            result = self._analyze(match.group(1) if match else "", has_image)
+
+        text = json.dumps(result)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                total_token_count=len(prompt) // 4 + len(text) // 4
+            ),
+        )
+
+    def _analyze(self, text: str, has_image: bool):
+        extraction = extract_token_signals(text, has_image)
+        tickers = extraction.tickers
+        networks = extraction.networks
+        is_alpha_call = bool(tickers) and self.random.random() > 0.1
+        # Clear-cut messages are answered confidently, ambiguous ones are not
+        if not tickers or (len(tickers) == 1 and networks):
+            confidence = self.random.uniform(0.85, 1.0)
+        elif len(tickers) == 1:
+            confidence = self.random.uniform(0.6, 1.0)
+        else:
+            confidence = self.random.uniform(0.3, 0.8)
+        return {
+            "is_alpha_call": is_alpha_call,
+            "token_ticker": tickers[0] if tickers else None,
+            "network": networks[0] if networks else None,
+            "additional_info": "Simulated analysis",
+            "long_term": self.random.random() < 0.3,
+            "confidence": round(confidence, 2),
+        }
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from providers.base import MessageSource
+from providers.fake_dexscreener import address_for
+
+SAMPLE_TICKERS = ["PEPE", "WIF", "BONK", "MOG", "TURBO", "POPCAT", "BRETT", "GIGA"]
+CHATTER = [
+    "gm everyone",
+    "market looks shaky today, stay safe",
+    "who's watching the fed meeting?",
+    "new video on our youtube, link in bio",
+]
+
+
+class ScriptedMessage:
+    def __init__(self, channel_id: int, message_id: int, text: str, date: datetime):
+        self.id = message_id
+        self.text = text
+        self.date = date
+        self.media = None
+        self.photo = None
+        self.document = None
+        self.peer_id = SimpleNamespace(channel_id=channel_id)
+
+    async def download_media(self, file=None):
+        return None
+
+
+class ScriptedEvent:
+    def __init__(self, message: ScriptedMessage, chat):
+        self.message = message
+        self.chat = chat
+        self.created_at = time.monotonic()
+
+    async def get_chat(self):
+        return self.chat
+
+
+def generate_script(count: int, channels: int = 5, seed: Optional[int] = None):
+    """A synthetic mix of chatter, clear calls, ticker-only and noisy calls."""
+    rng = random.Random(seed)
+    script = []
+    for _ in range(count):
+        ticker = rng.choice(SAMPLE_TICKERS)
+        chain_id = rng.choice(["solana", "ethereum"])
+        address = address_for(chain_id, ticker)
+        kind = rng.random()
+        if kind < 0.35:
+            text = rng.choice(CHATTER)
+        elif kind < 0.7:
+            text = f"${ticker} just launched 🚀 CA: {address}"
+        elif kind < 0.85:
+            text = f"Loading more ${ticker} here, looks ready to send"
+        else:
+            other = rng.choice(SAMPLE_TICKERS)
+            text = f"${ticker} and ${other} both looking good, which one?"
+        script.append({"channel": rng.randrange(channels), "text": text})
+    return script
+
+
+class ScriptedMessageSource(MessageSource):
+    """Replays a list of {"channel", "text", "delay_ms"} entries as events.
+
+    Entries without a delay are emitted at `rate` messages per second
+    (0 means as fast as the consumer accepts them).
+    """
+
+    def __init__(self, script: List[Dict[str, Any]], rate: float = 0):
+        self.script = script
+        self.rate = rate
+        self.message_ids: Dict[int, int] = {}
+
+    @classmethod
+    def from_file(cls, path: str, rate: float = 0):
+        with open(path) as f:
+            return cls([json.loads(line) for line in f if line.strip()], rate)
+
+    def _chat(self, channel: int):
+        return SimpleNamespace(
+            id=1000 + channel, title=f"Scripted channel {channel}", username=None
+        )
+
+    async def run(self, on_event: Callable[[Any], Awaitable[None]]) -> None:
+        for entry in self.script:
+            delay = entry.get("delay_ms")
+            if delay is not None:
+                await asyncio.sleep(delay / 1000)
+            elif self.rate:
+                await asyncio.sleep(1 / self.rate)
+
+            channel = int(entry.get("channel", 0))
+            message_id = self.message_ids.get(channel, 0) + 1
+            self.message_ids[channel] = message_id
+            message = ScriptedMessage(
+                1000 + channel, message_id, entry["text"], datetime.now(timezone.utc)
+            )
+            await on_event(ScriptedEvent(message, self._chat(channel)))
@@ -1,21 +1,22 @@
-from typing import Optional
+from typing import Literal, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from datetime import timedelta
 from db.db_operations import db_operations
-from helpers.api_helpers import get_current_user
+from helpers.api_helpers import get_current_user, get_stream_user
 from models.user_models import User
+from trending_stream import trending_hub
 
 router = APIRouter()
 
+SortBy = Literal["mention_count", "latest_date", "price", "h24_change", "h24_volume"]
+SortOrder = Literal["asc", "desc"]
 
-@router.get("/trending_tokens")
-async def get_trending_tokens(
-    time_window: str = "24h",
-    current_user: Optional[User] = Depends(get_current_user),
-    limit: int = 10,
-    sort_by: str = "mention_count",
-    sort_order: str = "desc",
-):
+
+def resolve_trending_query(
+    time_window: str, limit: int, current_user: Optional[User]
+) -> Tuple[timedelta, int]:
+    """The window and limit a user gets, given what they asked for."""
     limit = limit if current_user and current_user.role == "premium" else 3
 
     # if time window ends with h, use hours, if time window ends with d, use days
@@ -29,6 +30,18 @@ async def get_trending_tokens(
     window = (
         window if current_user and current_user.role == "premium" else timedelta(days=7)
     )
+    return window, limit
+
+
+@router.get("/trending_tokens")
+async def get_trending_tokens(
+    time_window: str = "24h",
+    current_user: Optional[User] = Depends(get_current_user),
+    limit: int = 10,
+    sort_by: SortBy = "mention_count",
+    sort_order: SortOrder = "desc",
+):
+    window, limit = resolve_trending_query(time_window, limit, current_user)
 
     # # Convert time_window to timedelta
     # if time_window == "24h":
@@ -49,3 +62,25 @@ async def get_trending_tokens(
         return {"trending_tokens": trending_tokens}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/trending_tokens/stream")
+async def stream_trending_tokens(
+    time_window: str = "24h",
+    current_user: Optional[User] = Depends(get_stream_user),
+    limit: int = 10,
+    sort_by: SortBy = "mention_count",
+    sort_order: SortOrder = "desc",
+):
+    """Server-sent events: a `snapshot` of the leaderboard, then `update`
+    events with added, removed and re-ranked or re-priced tokens."""
+    try:
+        window, limit = resolve_trending_query(time_window, limit, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        trending_hub.stream((window, limit, sort_by, sort_order)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,8 +0,0 @@
-CREATE TABLE commissions (
-    id SERIAL PRIMARY KEY,
-    referrer_id INTEGER REFERENCES users(id),
-    referred_id INTEGER REFERENCES users(id),
-    amount DECIMAL(10, 2),
-    status VARCHAR(20) DEFAULT 'pending',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
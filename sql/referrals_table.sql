@@ -1,7 +0,0 @@
-CREATE TABLE referrals (
-    id SERIAL PRIMARY KEY,
-    referrer_id INTEGER REFERENCES users(id),
-    referred_id INTEGER REFERENCES users(id),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(referrer_id, referred_id)
-);
\ No newline at end of file
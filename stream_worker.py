@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from lib.config import ingestion_stats_interval
+from db.db_operations import db_operations
+from lib.http_client import http_client
+import image_processing
+from telegram_client import (
+    analyze_message,
+    alpha_call_writer,
+    analysis_cache,
+    gemini_batcher,
+    gemini_cascade,
+    gemini_scheduler,
+    pipeline,
+    stream_queue,
+    token_resolver,
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def process_entry(entry):
+    entry_id, message = entry
+    try:
+        alpha_call = await analyze_message(message, message.get_chat)
+        if alpha_call:
+            # The slot covers queueing only; waiting for the flush while
+            # holding it would cap a batch at the stage limit
+            async with pipeline.stage("persist"):
+                written = await db_operations.token_repo.submit_alpha_call(alpha_call)
+            await written
+    except Exception:
+        # Left pending; reclaimed later or dead-lettered after max deliveries
+        stream_queue.release(entry_id)
+        raise
+    await stream_queue.ack(entry_id, message)
+
+
+async def submit_entry(entry):
+    if not await pipeline.submit(entry):
+        stream_queue.release(entry[0])
+
+
+async def run_stream_worker():
+    """Analysis worker fed from the ingestion stream.
+
+    Needs no Telegram session; run as many as Gemini quota allows, on any
+    node that can reach Redis and Postgres.
+    """
+    await db_operations.connect()
+    await db_operations.token_repo.start_ticker_index()
+    pipeline.handler = process_entry
+    alpha_call_writer.start()
+    pipeline.start()
+    stats_task = asyncio.create_task(
+        pipeline.log_stats(
+            ingestion_stats_interval,
+            extra={
+                "Ingestion stream": stream_queue.stats,
+                "Gemini": gemini_scheduler.stats,
+                "Analysis cache": analysis_cache.stats,
+                "Token resolver": token_resolver.stats,
+                "HTTP client": http_client.stats,
+                "Alpha call writer": alpha_call_writer.stats,
+                "Ticker index": db_operations.token_repo.ticker_index.stats,
+                **({"Gemini batcher": gemini_batcher.stats} if gemini_batcher else {}),
+                **({"Gemini cascade": gemini_cascade.stats} if gemini_cascade else {}),
+            },
+        )
+    )
+
+    logger.info(f"Consuming ingestion stream as {stream_queue.consumer}")
+    try:
+        await stream_queue.consume(submit_entry)
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+    finally:
+        stats_task.cancel()
+        await pipeline.stop()
+        await db_operations.token_repo.stop_ticker_index()
+        await alpha_call_writer.stop()
+        gemini_scheduler.shutdown()
+        if gemini_cascade:
+            gemini_cascade.shutdown()
+        image_processing.shutdown()
+        await http_client.close()
+        await db_operations.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_stream_worker())
@@ -1,15 +1,38 @@
-import os
-import aiohttp
+from typing import Any, Dict, Optional
 from telethon import TelegramClient, events
-from telethon.tl.types import InputPeerChannel
 from lib.config import (
     telegram_api_id,
     telegram_api_hash,
     telegram_phone_number,
     telegram_channel_usernames,
+    ingestion_workers,
+    ingestion_queue_size,
+    ingestion_enqueue_timeout,
+    ingestion_stage_limits,
+    ingestion_stats_interval,
+    telegram_backfill_enabled,
+    telegram_flood_sleep_threshold,
+    ingestion_mode,
+)
+from gemini_llm import (
+    analyze_with_gemini,
+    batcher as gemini_batcher,
+    cascade as gemini_cascade,
+    scheduler as gemini_scheduler,
 )
-from gemini_llm import analyze_with_gemini
 from db.db_operations import db_operations
+from ingestion import IngestionPipeline, TransientAnalysisError
+from token_extractor import extract_token_signals
+from analysis_cache import analysis_cache
+from token_resolver import token_resolver
+from lib.http_client import http_client
+from backfill import CheckpointTracker, backfill_channels
+from work_queue import RedisStreamQueue
+from channel_cache import channel_cache
+from lib import metrics
+import image_processing
+from image_processing import process_image
+import asyncio
 import logging
 
 # Set up logging
@@ -17,72 +40,112 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def download_image(message, client):
-    if message.photo:
-        path = await message.download_media("downloaded_media")
-        return path
-    elif message.document and message.document.mime_type.startswith("image"):
-        path = await message.download_media("downloaded_media")
-        return path
-
-
-async def fetch_token_info_from_dexscreener(ticker):
-    async with aiohttp.ClientSession() as session:
-        url = f"https://api.dexscreener.io/latest/dex/search?q={ticker}"
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if data["pairs"] and len(data["pairs"]) > 0:
-                    pair = data["pairs"][0]
-                    return {
-                        "token_address": pair["baseToken"]["address"],
-                        "token_name": pair["baseToken"]["name"],
-                        "token_image": pair.get("info", {}).get("imageUrl"),
-                        "network": (
-                            pair["chainId"].capitalize()
-                            if pair.get("chainId")
-                            else None
-                        ),
-                        "token_ticker": (
-                            pair["baseToken"]["symbol"]
-                            if pair.get("baseToken")
-                            else ticker
-                        ),
-                    }
-    return None
+def has_image(message):
+    return bool(
+        message.photo
+        or (
+            message.document
+            and message.document.mime_type
+            and message.document.mime_type.startswith("image")
+        )
+    )
 
 
-async def message_handler(event):
-    message = event.message
-    image_path = await download_image(message, event.client) if message.media else None
+async def download_image(message):
+    # Download straight into memory; nothing is written to disk
+    if has_image(message):
+        return await message.download_media(file=bytes)
+
+
+def llm_slot():
+    # Taken per Gemini request, not while a message waits to be batched
+    return pipeline.stage("llm")
 
-    analysis_result = await analyze_with_gemini(image_path, message.text)
 
+async def analyze_message(message, get_chat) -> Optional[Dict[str, Any]]:
+    """Runs one message through extraction, analysis and enrichment.
+
+    Returns the alpha call ready to be saved, or None if the message is
+    discarded. Raises TransientAnalysisError if the LLM or the enrichment
+    lookup failed, so the message is retried rather than dropped. Shared by
+    live ingestion, stream workers and backfill.
+    """
     try:
+        extraction = extract_token_signals(message.text, has_image(message))
+        metrics.extractions.labels(decision=extraction.decision).inc()
+        if extraction.decision == "skip":
+            print("Message discarded: No token signal")
+            metrics.messages_processed.labels(outcome="skipped").inc()
+            return None
+
+        if extraction.decision == "local":
+            analysis_result = extraction.analysis
+        else:
+            image_data = None
+            image_hash = None
+            if message.media:
+                async with pipeline.stage("media"):
+                    raw_image = await download_image(message)
+                    if raw_image:
+                        prepared = await process_image(raw_image)
+                        if prepared:
+                            image_data, image_hash = prepared
+
+            # Forwarded and cross-posted copies reuse the first analysis
+            cache_key = analysis_cache.make_key(message.text, image_hash)
+            analysis_result = await analysis_cache.get(cache_key)
+            if analysis_result is None:
+                analysis_result = await analyze_with_gemini(
+                    image_data, message.text, slot=llm_slot
+                )
+                if analysis_result:
+                    await analysis_cache.set(cache_key, analysis_result)
+
         if analysis_result:
-            if analysis_result["is_alpha_call"] and analysis_result["token_ticker"]:
+            if analysis_result["is_alpha_call"] and (
+                analysis_result.get("token_ticker")
+                or analysis_result.get("token_address")
+            ):
                 # Remove $ from ticker if present
-                if analysis_result["token_ticker"].startswith("$"):
+                if (analysis_result.get("token_ticker") or "").startswith("$"):
                     analysis_result["token_ticker"] = analysis_result["token_ticker"][
                         1:
                     ]
 
-                # Check for missing network
-                # if not analysis_result.get("network"):
-                #     network = await db_operations.token_repo.get_network_for_ticker(
-                #         analysis_result["token_ticker"]
-                #     )
-                #     # network might be null
-                #     if network and network != "null":
-                #         analysis_result["network"] = network
-
-                # Fetch token info from DexScreener if network or address is missing
-                if not analysis_result.get("network") or not analysis_result.get(
-                    "token_address"
+                # Fill a missing network/address from what we have seen before
+                ticker_index = db_operations.token_repo.ticker_index
+                if analysis_result.get("token_ticker"):
+                    if not analysis_result.get("network"):
+                        network = ticker_index.network_for(
+                            analysis_result["token_ticker"]
+                        )
+                        # network might be null
+                        if network and network != "null":
+                            analysis_result["network"] = network
+                    if not analysis_result.get("token_address"):
+                        analysis_result["token_address"] = ticker_index.address_for(
+                            analysis_result["token_ticker"],
+                            analysis_result.get("network"),
+                        )
+
+                # Fetch token info from DexScreener if network, address or ticker is missing
+                if (
+                    not analysis_result.get("network")
+                    or not analysis_result.get("token_address")
+                    or not analysis_result.get("token_ticker")
                 ):
-                    token_info = await fetch_token_info_from_dexscreener(
-                        analysis_result["token_ticker"]
-                    )
+                    async with pipeline.stage("enrichment"):
+                        try:
+                            # An address is a more precise search than a ticker
+                            token_info = await token_resolver.resolve(
+                                analysis_result.get("token_address")
+                                or analysis_result["token_ticker"],
+                                analysis_result.get("network"),
+                            )
+                        except Exception as e:
+                            raise TransientAnalysisError(
+                                f"Token enrichment failed: {e}"
+                            ) from e
                     if token_info:
                         analysis_result["token_address"] = token_info["token_address"]
                         analysis_result["token_name"] = token_info["token_name"]
@@ -92,7 +155,7 @@ async def message_handler(event):
                         if not analysis_result.get("network"):
                             analysis_result["network"] = token_info["network"]
 
-                channel = await event.get_chat()
+                channel = await get_chat()
                 analysis_result["channel_name"] = channel.title
                 if channel.username:  # Public channel
                     analysis_result["message_url"] = (
@@ -102,31 +165,127 @@ async def message_handler(event):
                     analysis_result["message_url"] = (
                         f"https://t.me/c/{channel.id}/{message.id}"
                     )
-                analysis_result["date"] = message.date.isoformat()
+                analysis_result["date"] = message.date
 
                 # Only save the alpha call if we have all required information
-                if analysis_result.get("network") and analysis_result.get(
-                    "token_address"
+                if (
+                    analysis_result.get("network")
+                    and analysis_result.get("token_address")
+                    and analysis_result.get("token_ticker")
                 ):
                     print("Alpha call detected")
-                    await db_operations.token_repo.save_alpha_call(analysis_result)
+                    metrics.messages_processed.labels(outcome="alpha_call").inc()
+                    return analysis_result
                 else:
-                    print("Message discarded: Missing network or token_address")
+                    print(
+                        "Message discarded: Missing network, token_address or token_ticker"
+                    )
+                    metrics.messages_processed.labels(outcome="incomplete").inc()
             else:
                 print(
                     "Message discarded: Not an alpha call or missing required information"
                 )
+                metrics.messages_processed.labels(outcome="not_alpha_call").inc()
         else:
-            print("Failed to analyze message")
+            raise TransientAnalysisError("LLM analysis failed")
+    except TransientAnalysisError:
+        metrics.messages_processed.labels(outcome="failed").inc()
+        raise
     except Exception as e:
         logger.error(f"An error occurred: {e}")
+        metrics.messages_processed.labels(outcome="failed").inc()
+    return None
+
+
+async def process_message(event):
+    message = event.message
+    channel_id = getattr(message.peer_id, "channel_id", None)
+    try:
+        alpha_call = await analyze_message(message, channel_cache.chat_getter(event))
+        if alpha_call:
+            # The slot covers queueing only; waiting for the flush while
+            # holding it would cap a batch at the stage limit
+            async with pipeline.stage("persist"):
+                written = await db_operations.token_repo.submit_alpha_call(alpha_call)
+            await written
+    except Exception:
+        # Left for the next backfill, which starts below it
+        if channel_id:
+            checkpoints.abandon(channel_id, message.id)
+        raise
+
+    if channel_id:
+        await checkpoints.complete(channel_id, message.id)
 
-    if image_path:
-        os.remove(image_path)  # Clean up the downloaded image
+
+pipeline = IngestionPipeline(
+    process_message,
+    workers=ingestion_workers,
+    queue_size=ingestion_queue_size,
+    stage_limits=ingestion_stage_limits,
+    enqueue_timeout=ingestion_enqueue_timeout,
+)
+
+
+checkpoints = CheckpointTracker(db_operations.channel_repo)
+alpha_call_writer = db_operations.token_repo.alpha_call_writer
+
+
+stream_queue = RedisStreamQueue(db_operations.db)
+
+
+async def publish_to_stream(message, chat):
+    """XADDs a message, with any image the analysis will look at."""
+    media = None
+    if (
+        has_image(message)
+        and extract_token_signals(message.text, True).decision == "escalate"
+    ):
+        media = await download_image(message)
+    await stream_queue.publish(message, chat, media)
+
+
+async def publish_message(event):
+    message = event.message
+    channel_id = getattr(message.peer_id, "channel_id", None)
+    try:
+        chat = await channel_cache.chat_getter(event)()
+        await publish_to_stream(message, chat)
+    except Exception as e:
+        logger.error(f"Failed to publish message {message.id}: {e}")
+        if channel_id:
+            checkpoints.abandon(channel_id, message.id)
+        return
+
+    # The stream holds it until a worker acks it, so it counts as received
+    if channel_id:
+        await checkpoints.complete(channel_id, message.id)
+
+
+async def message_handler(event):
+    channel_id = getattr(event.message.peer_id, "channel_id", None)
+    metrics.messages_received.labels(channel=str(channel_id or "unknown")).inc()
+    if channel_id:
+        checkpoints.track(channel_id, event.message.id)
+    if ingestion_mode == "stream":
+        # Analysis workers (stream_worker.py) pick it up from Redis
+        await publish_message(event)
+    else:
+        # Only enqueue here; the pipeline workers do the actual processing
+        if not await pipeline.submit(event) and channel_id:
+            checkpoints.abandon(channel_id, event.message.id)
 
 
 async def start_telegram_client():
-    client = TelegramClient("session", telegram_api_id, telegram_api_hash)
+    client = TelegramClient(
+        "session",
+        telegram_api_id,
+        telegram_api_hash,
+        flood_sleep_threshold=telegram_flood_sleep_threshold,
+    )
+    stats_task = None
+    backfill_task = None
+    refresh_task = None
 
     try:
         await client.start(phone=telegram_phone_number)
@@ -136,17 +295,73 @@ async def start_telegram_client():
             await client.send_code_request(telegram_phone_number)
             await client.sign_in(telegram_phone_number, input("Enter the code: "))
 
-        channels = []
-        for username in telegram_channel_usernames:
-            channel = await client.get_entity(username)
-            channels.append(InputPeerChannel(channel.id, channel.access_hash))
+        # Only usernames never seen before cost a get_entity call
+        entities = await channel_cache.resolve(client, telegram_channel_usernames)
+        channels = [entity.input_peer() for entity in entities]
+        refresh_task = asyncio.create_task(channel_cache.refresh(client))
+
+        # Seeded by the listener alone; every writer keeps them current after
+        await db_operations.token_repo.seed_mention_counters()
+        alpha_call_writer.start()
+        if ingestion_mode == "stream":
+            stats_extra = {
+                "Ingestion stream": stream_queue.stats,
+                "Channel cache": channel_cache.stats,
+            }
+        else:
+            # Only a listener that analyzes messages itself needs the index
+            await db_operations.token_repo.start_ticker_index()
+            pipeline.start()
+            stats_extra = {
+                "Gemini": gemini_scheduler.stats,
+                "Analysis cache": analysis_cache.stats,
+                "Token resolver": token_resolver.stats,
+                "HTTP client": http_client.stats,
+                "Ticker index": db_operations.token_repo.ticker_index.stats,
+                "Alpha call writer": alpha_call_writer.stats,
+                "Channel cache": channel_cache.stats,
+                **({"Gemini batcher": gemini_batcher.stats} if gemini_batcher else {}),
+                **({"Gemini cascade": gemini_cascade.stats} if gemini_cascade else {}),
+            }
+        stats_task = asyncio.create_task(
+            pipeline.log_stats(ingestion_stats_interval, extra=stats_extra)
+        )
 
         # Register the message handler
         client.add_event_handler(message_handler, events.NewMessage(chats=channels))
 
+        # Catch up on anything posted while we were down; live messages are
+        # handled concurrently and are never part of the backfill range. In
+        # stream mode the workers analyze replayed messages like live ones.
+        if telegram_backfill_enabled:
+            backfill_task = asyncio.create_task(
+                backfill_channels(
+                    client,
+                    entities,
+                    analyze_message,
+                    checkpoints,
+                    publish=publish_to_stream if ingestion_mode == "stream" else None,
+                )
+            )
+
         print("Listening for new messages...")
         await client.run_until_disconnected()
     except Exception as e:
         logger.error(f"An error occurred: {e}")
     finally:
+        if stats_task:
+            stats_task.cancel()
+        if backfill_task:
+            backfill_task.cancel()
+        if refresh_task:
+            refresh_task.cancel()
+        await pipeline.stop()
+        await db_operations.token_repo.stop_ticker_index()
+        # Flush whatever the workers queued before they stopped
+        await alpha_call_writer.stop()
+        gemini_scheduler.shutdown()
+        if gemini_cascade:
+            gemini_cascade.shutdown()
+        image_processing.shutdown()
+        await http_client.close()
         await client.disconnect()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# lib.config reads these at import time
+os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost")
+os.environ.setdefault("TELEGRAM_CHANNEL_USERNAMES", "")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+import telegram_client
+from db.alpha_call_writer import AlphaCallRecord, AlphaCallWriter
+from db.db_operations import db_operations
+
+
+def record(message_id):
+    return AlphaCallRecord(
+        token_ticker="PEPE",
+        token_address="address",
+        token_name=None,
+        token_image=None,
+        network="Solana",
+        additional_info=None,
+        channel_name="Channel",
+        message_url=f"https://t.me/channel/{message_id}",
+        date=datetime(2024, 1, 1),
+        long_term=False,
+    )
+
+
+class SlowRepo:
+    def __init__(self):
+        self.rows = []
+        self.started = asyncio.Event()
+
+    async def insert_alpha_calls(self, records):
+        self.started.set()
+        await asyncio.sleep(0.05)
+        self.rows.extend(records)
+        return records
+
+
+def test_stop_waits_for_the_batch_being_written():
+    async def run():
+        repo = SlowRepo()
+        writer = AlphaCallWriter(
+            repo, batch_size=10, flush_interval=0.01, max_pending=100
+        )
+        writer.start()
+        futures = [await writer.submit(record(i)) for i in range(2)]
+        # The periodic flush takes them out of the buffer and starts writing
+        await repo.started.wait()
+        futures.append(await writer.submit(record(2)))
+        await writer.stop()
+        return repo, futures
+
+    repo, futures = asyncio.run(run())
+    assert [row.message_url[-1] for row in repo.rows] == ["0", "1", "2"]
+    assert all(future.done() and future.exception() is None for future in futures)
+
+
+class BatchRepo:
+    def __init__(self):
+        self.batches = []
+
+    async def insert_alpha_calls(self, records):
+        self.batches.append(len(records))
+        return records
+
+
+def test_concurrent_messages_are_written_in_one_batch(monkeypatch):
+    repo = BatchRepo()
+    # Only the batch size can trigger the flush within the test's timeout
+    writer = AlphaCallWriter(repo, batch_size=20, flush_interval=60, max_pending=100)
+    monkeypatch.setattr(db_operations.token_repo, "alpha_call_writer", writer)
+
+    async def analyze_message(message, get_chat):
+        return record(message.id)._asdict()
+
+    monkeypatch.setattr(telegram_client, "analyze_message", analyze_message)
+
+    async def run():
+        writer.start()
+        events = [
+            SimpleNamespace(message=SimpleNamespace(id=i, peer_id=None), chat=None)
+            for i in range(20)
+        ]
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*map(telegram_client.process_message, events)), 5
+            )
+        finally:
+            await writer.stop()
+
+    asyncio.run(run())
+    # More messages than persist slots waited on the same COPY
+    assert repo.batches == [20]
@@ -0,0 +1,166 @@
+import asyncio
+from types import SimpleNamespace
+import backfill
+from backfill import CheckpointTracker
+
+
+class StubChannelRepo:
+    def __init__(self):
+        self.checkpoints = {}
+
+    async def update_checkpoint(self, channel_id, message_id):
+        # Mirrors the GREATEST in ChannelRepository.update_checkpoint
+        self.checkpoints[channel_id] = max(
+            self.checkpoints.get(channel_id, 0), message_id
+        )
+
+
+def run(tracker, steps):
+    async def go():
+        for step, message_id in steps:
+            if step == "complete":
+                await tracker.complete(1, message_id)
+            else:
+                getattr(tracker, step)(1, message_id)
+
+    asyncio.run(go())
+
+
+def test_out_of_order_completions_advance_contiguously():
+    repo = StubChannelRepo()
+    tracker = CheckpointTracker(repo)
+    run(tracker, [("track", i) for i in (10, 11, 12, 13)])
+
+    run(tracker, [("complete", 12), ("complete", 13)])
+    assert repo.checkpoints == {}
+
+    run(tracker, [("complete", 10)])
+    assert repo.checkpoints[1] == 10
+
+    run(tracker, [("complete", 11)])
+    assert repo.checkpoints[1] == 13
+    assert tracker.completed[1] == []
+
+
+def test_never_advances_past_an_abandoned_message():
+    repo = StubChannelRepo()
+    tracker = CheckpointTracker(repo)
+    run(tracker, [("track", i) for i in (10, 11, 12)])
+
+    # e.g. pipeline.submit returned False for 11
+    run(tracker, [("abandon", 11), ("complete", 12), ("complete", 10)])
+    assert repo.checkpoints[1] == 10
+
+    run(tracker, [("track", 13), ("complete", 13)])
+    assert repo.checkpoints[1] == 10
+    # Nothing above the abandoned id is kept around
+    assert tracker.completed[1] == []
+
+
+def test_live_completions_are_deferred_while_backfilling():
+    repo = StubChannelRepo()
+    tracker = CheckpointTracker(repo)
+    tracker.begin(1)
+    run(tracker, [("track", 50), ("track", 51), ("complete", 51), ("complete", 50)])
+    assert repo.checkpoints == {}
+
+    asyncio.run(tracker.finish(1))
+    assert repo.checkpoints[1] == 51
+
+
+def test_failed_backfill_keeps_the_checkpoint_below_its_range(monkeypatch):
+    repo = StubChannelRepo()
+    repo.checkpoints[1] = 40
+
+    async def get_checkpoints():
+        return dict(repo.checkpoints)
+
+    repo.get_checkpoints = get_checkpoints
+    monkeypatch.setattr(backfill, "db_operations", SimpleNamespace(channel_repo=repo))
+    tracker = CheckpointTracker(repo)
+
+    async def failing_backfill(client, channel, analyze, last_id, publish=None):
+        # A live message completes while the range 41-49 is being replayed
+        await tracker.complete(1, 50)
+        raise RuntimeError("analysis failed")
+
+    monkeypatch.setattr(backfill, "backfill_channel", failing_backfill)
+
+    async def go():
+        tracker.track(1, 50)
+        await backfill.backfill_channels(
+            None, [SimpleNamespace(id=1)], None, tracker
+        )
+        tracker.track(1, 51)
+        await tracker.complete(1, 51)
+
+    asyncio.run(go())
+    assert repo.checkpoints[1] == 40
+    assert 1 not in tracker.deferred
+
+
+def test_backfill_is_skipped_when_checkpoints_cannot_be_read(monkeypatch):
+    repo = StubChannelRepo()
+
+    async def get_checkpoints():
+        raise ConnectionError("database unavailable")
+
+    async def backfill_channel(*args):
+        raise AssertionError("must not backfill without checkpoints")
+
+    repo.get_checkpoints = get_checkpoints
+    monkeypatch.setattr(backfill, "db_operations", SimpleNamespace(channel_repo=repo))
+    monkeypatch.setattr(backfill, "backfill_channel", backfill_channel)
+    tracker = CheckpointTracker(repo)
+
+    async def go():
+        await backfill.backfill_channels(
+            None, [SimpleNamespace(id=1)], None, tracker
+        )
+        tracker.track(1, 50)
+        await tracker.complete(1, 50)
+
+    asyncio.run(go())
+    # The gap since the stored checkpoint is left for the next start
+    assert repo.checkpoints == {}
+
+
+class StubClient:
+    def __init__(self, ids):
+        self.messages = [SimpleNamespace(id=i) for i in ids]
+
+    async def get_messages(self, peer, limit):
+        return self.messages[-limit:]
+
+    async def iter_messages(self, peer, min_id, max_id, reverse):
+        for message in self.messages:
+            if min_id < message.id < max_id:
+                yield message
+
+
+def test_stream_mode_backfill_publishes_instead_of_analyzing(monkeypatch):
+    repo = StubChannelRepo()
+    monkeypatch.setattr(backfill, "db_operations", SimpleNamespace(channel_repo=repo))
+    channel = SimpleNamespace(id=1, input_peer=lambda: None)
+    published = []
+
+    async def analyze(message, get_chat):
+        raise AssertionError("stream workers analyze replayed messages")
+
+    async def publish(message, chat):
+        if message.id == 14:
+            raise ConnectionError("redis unavailable")
+        published.append(message.id)
+
+    async def go():
+        await backfill.backfill_channel(
+            StubClient(range(10, 17)), channel, analyze, 10, publish
+        )
+
+    try:
+        asyncio.run(go())
+    except ConnectionError:
+        pass
+    assert sorted(published) == [11, 12, 13, 15, 16]
+    # Up to the first message that could not be published
+    assert repo.checkpoints[1] == 13
@@ -0,0 +1,93 @@
+import asyncio
+from gemini_llm import GeminiBatcher, GeminiScheduler
+from ingestion import STAGES, IngestionPipeline
+from providers.fake_model import FakeModel
+
+
+def make_tier(model):
+    return GeminiScheduler(
+        model,
+        max_concurrency=8,
+        requests_per_minute=10**6,
+        tokens_per_minute=10**9,
+        max_retries=0,
+    )
+
+
+def make_pipeline(llm_limit):
+    async def handler(item):
+        pass
+
+    limits = {stage: 8 for stage in STAGES}
+    limits["llm"] = llm_limit
+    return IngestionPipeline(handler, workers=1, queue_size=1, stage_limits=limits)
+
+
+class TrackingModel(FakeModel):
+    def __init__(self, pipeline):
+        super().__init__(latency_ms=20, jitter_ms=0, error_rate=0, seed=1)
+        self.pipeline = pipeline
+        self.max_in_flight = 0
+
+    def generate_content(self, contents):
+        self.max_in_flight = max(self.max_in_flight, self.pipeline.in_flight["llm"])
+        return super().generate_content(contents)
+
+
+def test_stage_limit_does_not_cap_batch_size():
+    pipeline = make_pipeline(llm_limit=2)
+    model = TrackingModel(pipeline)
+    tier = make_tier(model)
+    batcher = GeminiBatcher(max_size=8, max_wait=1.0, tier=tier)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                batcher.analyze(f"$TOK{i} on Solana", lambda: pipeline.stage("llm"))
+                for i in range(16)
+            )
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        tier.shutdown()
+
+    assert all(result is not None for result in results)
+    stats = batcher.stats()
+    # Full batches are sent at once; they never wait out max_wait for slots
+    assert stats["batches"] == 2
+    assert stats["avg_batch_size"] == 8.0
+    assert stats["fallbacks"] == 0
+    assert 1 <= model.max_in_flight <= 2
+
+
+def test_fallbacks_take_a_slot_per_request():
+    pipeline = make_pipeline(llm_limit=1)
+
+    class NoBatchAnswers(TrackingModel):
+        def generate_content(self, contents):
+            if "Messages:" in contents:
+                raise ValueError("unparseable batch")
+            return super().generate_content(contents)
+
+    model = NoBatchAnswers(pipeline)
+    tier = make_tier(model)
+    batcher = GeminiBatcher(max_size=4, max_wait=1.0, tier=tier)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                batcher.analyze(f"$TOK{i} on Solana", lambda: pipeline.stage("llm"))
+                for i in range(4)
+            )
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        tier.shutdown()
+
+    assert all(result is not None for result in results)
+    assert batcher.stats()["fallbacks"] == 4
+    assert model.max_in_flight == 1
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import pytest
+from lib.http_client import CircuitBreaker, CircuitOpenError, HttpClient, UpstreamError
+
+URL = "https://upstream.example/data"
+
+
+class ScriptedClient(HttpClient):
+    """HttpClient whose requests run `responses` in order instead of aiohttp."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.hedge_after = None
+        self.responses = list(responses)
+
+    async def _get(self, url):
+        response = self.responses.pop(0)
+        if isinstance(response, BaseException):
+            raise response
+        if callable(response):
+            return await response()
+        return response
+
+
+def open_breaker(client: HttpClient) -> CircuitBreaker:
+    breaker = client.breaker(URL)
+    breaker.reset_timeout = 0
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = 0.0
+    return breaker
+
+
+def test_breaker_opens_after_threshold_and_serves_stale():
+    client = ScriptedClient([{"ok": 1}] + [UpstreamError(URL, 503)] * 10)
+    assert asyncio.run(client.get_json(URL)) == {"ok": 1}
+    breaker = client.breaker(URL)
+    breaker.reset_timeout = 60
+
+    for _ in range(breaker.failure_threshold):
+        assert asyncio.run(client.get_json(URL)) == {"ok": 1}
+    assert breaker.state == "open"
+    remaining = len(client.responses)
+    assert asyncio.run(client.get_json(URL)) == {"ok": 1}
+    assert len(client.responses) == remaining  # short-circuited
+
+
+def test_half_open_trial_success_closes():
+    client = ScriptedClient([{"ok": 2}])
+    breaker = open_breaker(client)
+    assert breaker.state == "half_open"
+    assert asyncio.run(client.get_json(URL)) == {"ok": 2}
+    assert breaker.state == "closed"
+    assert not breaker.trial_in_flight
+
+
+def test_half_open_trial_decode_error_reopens():
+    client = ScriptedClient([json.JSONDecodeError("Expecting value", "<html>", 0)])
+    breaker = open_breaker(client)
+    with pytest.raises(json.JSONDecodeError):
+        asyncio.run(client.get_json(URL))
+    assert not breaker.trial_in_flight
+    assert breaker.opened_at is not None
+    # The next call gets its own trial instead of a permanently open circuit
+    client.responses.append({"ok": 3})
+    assert asyncio.run(client.get_json(URL)) == {"ok": 3}
+    assert breaker.state == "closed"
+
+
+def test_cancelled_half_open_trial_releases_it():
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def run():
+        client = ScriptedClient([hang, {"ok": 4}])
+        breaker = open_breaker(client)
+        task = asyncio.create_task(client.get_json(URL))
+        await asyncio.sleep(0)
+        assert breaker.trial_in_flight
+        # A concurrent caller is refused while the trial runs
+        with pytest.raises(CircuitOpenError):
+            await client.get_json(URL)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not breaker.trial_in_flight
+        assert await client.get_json(URL) == {"ok": 4}
+
+    asyncio.run(run())
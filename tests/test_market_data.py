@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+from fakeredis import aioredis
+from db.market_data import UNKNOWN_KEY, MarketData
+
+
+def pair(address, price):
+    return {
+        "baseToken": {"address": address, "symbol": address.upper()},
+        "quoteToken": {"symbol": "SOL"},
+        "priceUsd": price,
+        "priceChange": {"h24": 1.5},
+        "volume": {"h24": 1000},
+    }
+
+
+def make_market_data(responses):
+    redis = aioredis.FakeRedis()
+    market_data = MarketData(
+        SimpleNamespace(redis=redis),
+        ttl=300,
+        negative_ttl=60,
+        refresh_interval=60,
+        track_ttl=600,
+        max_concurrency=2,
+    )
+    requests = []
+
+    async def fetch_pairs(addresses):
+        requests.append(list(addresses))
+        return responses.pop(0)
+
+    market_data.fetch_pairs = fetch_pairs
+    return market_data, redis, requests
+
+
+def test_addresses_without_pairs_are_not_fetched_again():
+    market_data, redis, requests = make_market_data([[pair("known", "0.5")]])
+
+    async def run():
+        first = await market_data.get_many(["known", "unknown"])
+        second = await market_data.get_many(["known", "unknown"])
+        return first, second, await redis.ttl(UNKNOWN_KEY.format("unknown"))
+
+    first, second, ttl = asyncio.run(run())
+    assert set(first) == set(second) == {"known"}
+    assert requests == [["known", "unknown"]]
+    assert 0 < ttl <= 60
+    assert market_data.stats()["unknown"] == 1
+
+
+def test_failed_requests_are_not_negatively_cached():
+    market_data, redis, requests = make_market_data([None, [pair("token", "2")]])
+
+    async def run():
+        first = await market_data.get_many(["token"])
+        second = await market_data.get_many(["token"])
+        return first, second, await redis.exists(UNKNOWN_KEY.format("token"))
+
+    first, second, unknown = asyncio.run(run())
+    assert first == {}
+    assert second["token"]["price"] == "2"
+    assert requests == [["token"], ["token"]]
+    assert not unknown
+
+
+def test_pairs_missing_volume_or_price_change_are_kept():
+    new_pair = pair("new", "0.1")
+    del new_pair["volume"]
+    del new_pair["priceChange"]
+    market_data, _, _ = make_market_data([[new_pair, {"chainId": "solana"}]])
+
+    result = asyncio.run(market_data.get_many(["new"]))
+
+    assert result == {
+        "new": {
+            "pair": "NEW/SOL",
+            "price": "0.1",
+            "h24_change": None,
+            "h24_volume": None,
+        }
+    }
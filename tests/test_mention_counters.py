@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from fakeredis import aioredis
+from db.mention_counters import SEEDED_KEY, MentionCounters
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def hour(date):
+    return date.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup(date, ticker, count, name=None):
+    return (
+        hour(date),
+        ticker,
+        "Solana",
+        f"{ticker.lower()}-address",
+        count,
+        date,
+        name,
+        None,
+    )
+
+
+def make_counters():
+    redis = aioredis.FakeRedis()
+    return MentionCounters(SimpleNamespace(redis=redis), timedelta(hours=24)), redis
+
+
+def test_top_sums_hours_of_the_window():
+    counters, redis = make_counters()
+    now = utcnow()
+
+    async def run():
+        await counters.record(
+            [
+                rollup(now - timedelta(hours=2), "AAA", 4, name="Triple A"),
+                rollup(now, "AAA", 3),
+                rollup(now - timedelta(minutes=1), "BBB", 5),
+                # Outside the window
+                rollup(now - timedelta(hours=6), "CCC", 50),
+            ]
+        )
+        await redis.set(SEEDED_KEY, "1")
+        start = now - timedelta(hours=3)
+        by_count = await counters.top(start, 10, "mention_count", "desc")
+        by_latest = await counters.top(start, 1, "latest_date", "desc")
+        leftovers = await redis.keys("trending:union:*")
+        return by_count, by_latest, leftovers
+
+    by_count, by_latest, leftovers = asyncio.run(run())
+
+    assert [(row["token_ticker"], row["mention_count"]) for row in by_count] == [
+        ("AAA", 7),
+        ("BBB", 5),
+    ]
+    assert by_count[0]["token_name"] == "Triple A"
+    assert by_count[0]["token_address"] == "aaa-address"
+    assert abs(by_count[0]["latest_date"] - now) < timedelta(seconds=1)
+    assert [row["token_ticker"] for row in by_latest] == ["AAA"]
+    assert by_latest[0]["mention_count"] == 7
+    assert leftovers == []
+
+
+def test_top_is_none_until_seeded():
+    counters, redis = make_counters()
+    now = utcnow()
+
+    async def run():
+        await counters.record([rollup(now, "AAA", 1)])
+        return await counters.top(now - timedelta(hours=1), 10, "mention_count", "asc")
+
+    assert asyncio.run(run()) is None
+
+
+def test_latest_outlives_the_oldest_hour_of_the_window():
+    counters, redis = make_counters()
+    now = utcnow()
+    # Inside the rounded-out window, but older than max_window
+    oldest = hour(now - timedelta(hours=24))
+
+    async def run():
+        await counters.record([rollup(oldest, "AAA", 2)])
+        await redis.set(SEEDED_KEY, "1")
+        return await counters.top(
+            now - timedelta(hours=24), 10, "mention_count", "desc"
+        )
+
+    [row] = asyncio.run(run())
+    assert row["mention_count"] == 2
+    assert row["latest_date"] == oldest
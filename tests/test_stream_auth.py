@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+import helpers.api_helpers as api_helpers
+from helpers.api_helpers import get_stream_user
+
+
+def make_client(monkeypatch):
+    monkeypatch.setattr(api_helpers, "secret_key", "test-secret")
+
+    async def get_user_by_identifier(identifier):
+        return SimpleNamespace(email=identifier)
+
+    monkeypatch.setattr(api_helpers, "get_user_by_identifier", get_user_by_identifier)
+    app = FastAPI()
+
+    @app.get("/stream")
+    async def stream(user=Depends(get_stream_user)):
+        return {"user": user.email}
+
+    token = jwt.encode({"sub": "a@example.com"}, "test-secret", algorithm="HS256")
+    return TestClient(app), token
+
+
+def test_stream_accepts_the_token_without_an_authorization_header(monkeypatch):
+    client, token = make_client(monkeypatch)
+
+    # What an EventSource can send: a query parameter or a cookie
+    assert client.get(f"/stream?access_token={token}").json() == {
+        "user": "a@example.com"
+    }
+    client.cookies.set("access_token", token)
+    assert client.get("/stream").json() == {"user": "a@example.com"}
+
+
+def test_stream_still_requires_a_valid_token(monkeypatch):
+    client, token = make_client(monkeypatch)
+
+    assert client.get("/stream").status_code == 401
+    assert client.get("/stream?access_token=invalid").status_code == 401
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/stream", headers=headers).status_code == 200
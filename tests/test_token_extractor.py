@@ -0,0 +1,35 @@
+import pytest
+from token_extractor import extract_token_signals
+
+ADDRESS = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+
+
+def test_one_token_with_a_network_is_classified_locally():
+    result = extract_token_signals("New gem $PEPE on Solana, sending it")
+    assert result.decision == "local"
+    assert result.analysis["token_ticker"] == "PEPE"
+    assert result.analysis["network"] == "Solana"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "$PEPE on Solana is a rug, avoid",
+        "Dev rugged $PEPE on Solana",
+        f"{ADDRESS} is a honeypot",
+        "Don't buy $PEPE on Solana",
+        "Don’t ape $PEPE on Solana",
+        "$PEPE on Solana: scam, stay away",
+        "Warning: fake $PEPE contract on Solana",
+        "This is not a call: $PEPE on Solana",
+    ],
+)
+def test_warnings_and_negations_escalate(text):
+    result = extract_token_signals(text)
+    assert result.decision == "escalate"
+    assert result.analysis is None
+
+
+def test_words_containing_keywords_do_not_escalate():
+    result = extract_token_signals("$DRUG on Solana, scampering higher")
+    assert result.decision == "local"
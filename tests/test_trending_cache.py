@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from fakeredis import aioredis
+from db.token_repo import TokenRepository, TrendingToken
+from db.trending_cache import TrendingCache
+
+
+def make_cache(soft_ttl=60):
+    return TrendingCache(
+        SimpleNamespace(redis=aioredis.FakeRedis()),
+        TrendingToken,
+        l1_size=10,
+        l1_ttl=60,
+        soft_ttl=soft_ttl,
+        hard_ttl=300,
+        invalidate_interval=0,
+    )
+
+
+TOKENS = [
+    TrendingToken(
+        token_ticker="PEPE",
+        network="Ethereum",
+        token_address=None,
+        mention_count=3,
+        latest_date=datetime(2024, 1, 1, 12),
+        price=0.5,
+    )
+]
+
+
+def test_entries_record_their_generation():
+    cache = make_cache()
+    key = cache.key("1 day, 0:00:00:10:mention_count:desc")
+    assert key == "trending_tokens:1 day, 0:00:00:10:mention_count:desc"
+
+    async def run():
+        await cache.write(key, TOKENS, cache.generation)
+        fresh = await cache.read(key)
+        cache._apply(cache.generation + 1)
+        return fresh, await cache.read(key)
+
+    fresh, after_bump = asyncio.run(run())
+    assert fresh == (TOKENS, 0, False)
+    # Not soft-expired; the caller compares generations
+    assert after_bump == (TOKENS, 0, False)
+    assert cache.get(key) is None
+
+
+def test_entries_of_an_older_generation_are_rebuilt_before_serving():
+    repo = TokenRepository(SimpleNamespace(pool=None, redis=aioredis.FakeRedis()))
+    cache = repo.trending_cache
+    key = cache.key("1 day, 0:00:00:10:mention_count:desc")
+    rebuilt = TOKENS[0].model_copy(update={"mention_count": 4})
+    builds = []
+
+    async def fetch_fresh_data(cache_key, generation, *args):
+        builds.append(generation)
+        await cache.write(cache_key, [rebuilt], generation)
+        return [rebuilt]
+
+    repo.fetch_fresh_data = fetch_fresh_data
+
+    async def run():
+        await cache.write(key, TOKENS, cache.generation)
+        # New alpha calls were written
+        cache._apply(cache.generation + 1)
+        responses = await asyncio.gather(
+            *(repo.get_trending_tokens(timedelta(days=1)) for _ in range(3))
+        )
+        return responses, await cache.read(key)
+
+    responses, entry = asyncio.run(run())
+    assert responses == [[rebuilt]] * 3
+    # One single-flight build under the new generation
+    assert builds == [1]
+    assert entry == ([rebuilt], 1, False)
+
+
+def test_soft_expired_entries_are_stale():
+    cache = make_cache(soft_ttl=0)
+    key = cache.key("window")
+
+    async def run():
+        await cache.write(key, TOKENS, cache.generation)
+        return await cache.read(key)
+
+    tokens, generation, stale = asyncio.run(run())
+    assert stale and tokens == TOKENS
+
+
+def test_l1_only_keeps_models_of_the_current_generation():
+    cache = make_cache()
+    key = cache.key("window")
+    cache._apply(2)
+
+    cache.set(key, TOKENS, generation=1)
+    assert cache.get(key) is None
+
+    async def run():
+        await cache.write(key, TOKENS, generation=2)
+        return await cache.read(key)
+
+    tokens, _, _ = asyncio.run(run())
+    assert cache.get(key) is TOKENS
+    assert all(isinstance(token, TrendingToken) for token in tokens)
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import trending_stream
+from db.token_repo import TokenRepository
+from trending_stream import Leaderboard, TrendingHub
+
+KEY = (timedelta(hours=24), 10, "mention_count", "desc")
+TOKEN = {"network": "Solana", "token_address": "a", "token_ticker": "A"}
+ROW = {
+    "token_ticker": "PEPE",
+    "network": "Solana",
+    "token_address": None,
+    "token_name": None,
+    "token_image": None,
+    "mention_count": 3,
+    "latest_date": datetime(2024, 1, 1),
+}
+
+
+class FlakyPool:
+    """Fails its first `failures` queries, then returns `rows`."""
+
+    def __init__(self, failures: int, rows):
+        self.failures = failures
+        self.rows = rows
+
+    def acquire(self):
+        return self
+
+    async def __aenter__(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def fetch(self, query, *args):
+        return self.rows
+
+
+def use_repo(monkeypatch, pool):
+    repo = TokenRepository(SimpleNamespace(pool=pool, redis=None))
+    repo.mention_counters = None
+    monkeypatch.setattr(
+        trending_stream, "db_operations", SimpleNamespace(token_repo=repo)
+    )
+
+
+def parse(event: bytes):
+    lines = event.decode().strip().splitlines()
+    if lines[0].startswith(":"):
+        return "keepalive", None
+    return lines[0][len("event: ") :], json.loads(lines[1][len("data: ") :])
+
+
+def collect_until_snapshot(monkeypatch, compute=None):
+    if compute:
+        monkeypatch.setattr(Leaderboard, "compute", compute)
+    hub = TrendingHub(interval=0.01, heartbeat=0.05, queue_size=4)
+
+    async def run():
+        events = []
+        stream = hub.stream(KEY)
+        async for event in stream:
+            events.append(parse(event))
+            if events[-1][0] == "snapshot":
+                break
+        await stream.aclose()
+        return events, dict(hub.leaderboards)
+
+    return asyncio.run(run())
+
+
+def test_error_events_while_the_first_compute_keeps_failing(monkeypatch):
+    use_repo(monkeypatch, FlakyPool(failures=8, rows=[]))
+
+    events, leaderboards = collect_until_snapshot(monkeypatch)
+
+    *waiting, snapshot = events
+    assert waiting and all(name == "error" for name, _ in waiting)
+    assert waiting[0][1]["failures"] >= 1
+    # Empty only once a compute succeeded and found nothing
+    assert snapshot == ("snapshot", {"tokens": []})
+    # The last stream closing stops the leaderboard
+    assert leaderboards == {}
+
+
+def test_failed_recompute_keeps_the_last_board(monkeypatch):
+    pool = FlakyPool(failures=0, rows=[ROW])
+    use_repo(monkeypatch, pool)
+    leaderboard = Leaderboard(KEY, interval=0.01, queue_size=4)
+
+    async def run():
+        leaderboard.start()
+        await leaderboard.wait_ready(1)
+        queue = leaderboard.subscribe()
+        # Without Redis only L1 caches the board; later recomputes query
+        trending_stream.db_operations.token_repo.trending_cache.l1.clear()
+        pool.failures = 1000
+        await asyncio.sleep(0.1)
+        await leaderboard.stop()
+        return [parse(queue.get_nowait()) for _ in range(queue.qsize())]
+
+    events = asyncio.run(run())
+
+    [(name, data)] = events
+    assert name == "snapshot" and data["tokens"][0]["token_ticker"] == "PEPE"
+    assert leaderboard.failures >= 1
+    assert leaderboard.tokens[0]["token_ticker"] == "PEPE"
+
+
+def test_keepalives_while_the_first_compute_is_slow(monkeypatch):
+    async def compute(self):
+        await asyncio.sleep(0.12)
+        return [TOKEN]
+
+    events, _ = collect_until_snapshot(monkeypatch, compute)
+
+    *waiting, snapshot = events
+    assert waiting and all(name == "keepalive" for name, _ in waiting)
+    assert snapshot[0] == "snapshot"
@@ -0,0 +1,207 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from work_queue import MessageEnvelope, RedisStreamQueue
+
+
+class StubPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+
+        return call
+
+    async def execute(self):
+        return [
+            await getattr(self.redis, name)(*args, **kwargs)
+            for name, args, kwargs in self.calls
+        ]
+
+
+def stream_id(entry_id):
+    return tuple(int(part) for part in entry_id.split("-"))
+
+
+class StubRedis:
+    """The stream commands `reclaim` and `dead_letter` use, for one group."""
+
+    def __init__(self):
+        self.entries = {}
+        # entry id -> [consumer, idle ms, times delivered]
+        self.pending = {}
+        self.dead = []
+
+    def add(self, entry_id, message_id, idle, delivered, consumer="crashed"):
+        envelope = MessageEnvelope(
+            channel_id=1,
+            message_id=message_id,
+            text="$PEPE",
+            date=datetime(2024, 1, 1),
+            chat_id=1,
+        )
+        self.entries[entry_id] = {b"envelope": envelope.model_dump_json().encode()}
+        self.pending[entry_id] = [consumer, idle, delivered]
+
+    async def xpending_range(
+        self, stream, group, start, end, count, consumername=None
+    ):
+        start = (0, 0) if start == "-" else stream_id(start)
+        return [
+            {
+                "message_id": entry_id.encode(),
+                "consumer": consumer.encode(),
+                "time_since_delivered": idle,
+                "times_delivered": delivered,
+            }
+            for entry_id, (consumer, idle, delivered) in sorted(
+                self.pending.items(), key=lambda item: stream_id(item[0])
+            )
+            if stream_id(entry_id) >= start
+            and consumername in (None, consumer)
+        ][:count]
+
+    async def xclaim(self, stream, group, consumer, min_idle_time, ids):
+        claimed = []
+        for entry_id in ids:
+            state = self.pending.get(entry_id)
+            if state is None or state[1] < min_idle_time:
+                continue
+            self.pending[entry_id] = [consumer, 0, state[2] + 1]
+            claimed.append((entry_id.encode(), self.entries.get(entry_id)))
+        return claimed
+
+    async def xack(self, stream, group, *ids):
+        for entry_id in ids:
+            self.pending.pop(entry_id, None)
+        return len(ids)
+
+    async def xadd(self, stream, fields, **kwargs):
+        self.dead.append((stream, fields))
+        return b"0-1"
+
+    def pipeline(self, transaction=True):
+        return StubPipeline(self)
+
+
+def make_queue(redis, **kwargs):
+    return RedisStreamQueue(
+        SimpleNamespace(redis=redis),
+        consumer="worker-0",
+        claim_idle_ms=1000,
+        max_deliveries=3,
+        **kwargs,
+    )
+
+
+def test_reclaims_stale_entries_of_other_consumers():
+    redis = StubRedis()
+    redis.add("1-0", message_id=10, idle=5000, delivered=1)
+    redis.add("2-0", message_id=11, idle=10, delivered=1)
+    queue = make_queue(redis)
+    submitted = []
+
+    async def submit(entry):
+        submitted.append(entry)
+
+    asyncio.run(queue.reclaim(submit))
+
+    assert [(entry_id, message.id) for entry_id, message in submitted] == [("1-0", 10)]
+    assert redis.pending["1-0"][0] == "worker-0"
+    # Not idle long enough; its consumer may still be working on it
+    assert redis.pending["2-0"][0] == "crashed"
+    assert queue.reclaimed == 1 and queue.in_progress == {"1-0"}
+
+
+def test_in_progress_entries_are_not_reclaimed_until_released():
+    redis = StubRedis()
+    redis.add("1-0", message_id=10, idle=5000, delivered=1)
+    queue = make_queue(redis)
+    queue.in_progress.add("1-0")
+    submitted = []
+
+    async def submit(entry):
+        submitted.append(entry)
+
+    asyncio.run(queue.reclaim(submit))
+    assert submitted == []
+
+    # A failed analysis leaves it pending without acking it
+    queue.release("1-0")
+    asyncio.run(queue.reclaim(submit))
+    assert [entry_id for entry_id, _ in submitted] == ["1-0"]
+    assert "1-0" in redis.pending
+
+
+def test_dead_letters_entries_delivered_too_often():
+    redis = StubRedis()
+    redis.add("1-0", message_id=10, idle=5000, delivered=3)
+    queue = make_queue(redis, dead_letter_stream="dead")
+    submitted = []
+
+    async def submit(entry):
+        submitted.append(entry)
+
+    asyncio.run(queue.reclaim(submit))
+
+    assert submitted == []
+    assert "1-0" not in redis.pending
+    [(stream, fields)] = redis.dead
+    assert stream == "dead"
+    assert fields["entry_id"] == "1-0"
+    assert fields["reason"] == "delivered 3 times"
+    assert json.loads(fields[b"envelope"])["message_id"] == 10
+    assert queue.dead_lettered == 1
+
+
+def test_trimmed_entries_are_acked():
+    redis = StubRedis()
+    redis.add("1-0", message_id=10, idle=5000, delivered=1)
+    del redis.entries["1-0"]
+    queue = make_queue(redis)
+
+    async def submit(entry):
+        raise AssertionError("trimmed entries have nothing to process")
+
+    asyncio.run(queue.reclaim(submit))
+    assert redis.pending == {}
+
+
+def test_reclaim_pages_through_all_pending_entries():
+    redis = StubRedis()
+    for i in range(5):
+        redis.add(f"{i + 1}-0", message_id=10 + i, idle=5000, delivered=1)
+    queue = make_queue(redis, read_count=2)
+    submitted = []
+
+    async def submit(entry):
+        submitted.append(entry)
+
+    asyncio.run(queue.reclaim(submit))
+    assert [message.id for _, message in submitted] == [10, 11, 12, 13, 14]
+
+
+def test_own_poison_entries_are_dead_lettered_at_startup():
+    redis = StubRedis()
+    # Left pending by earlier runs of this consumer, e.g. crashed on entry 1-0
+    redis.add("1-0", message_id=10, idle=0, delivered=3, consumer="worker-0")
+    redis.add("2-0", message_id=11, idle=0, delivered=1, consumer="worker-0")
+    redis.add("3-0", message_id=12, idle=0, delivered=1, consumer="other")
+    queue = make_queue(redis, dead_letter_stream="dead")
+    submitted = []
+
+    async def submit(entry):
+        submitted.append(entry)
+
+    asyncio.run(queue.recover(submit))
+
+    assert [entry_id for entry_id, _ in submitted] == ["2-0"]
+    assert redis.pending["2-0"][2] == 2
+    assert [fields["entry_id"] for _, fields in redis.dead] == ["1-0"]
+    assert "1-0" not in redis.pending
+    # Another consumer's entries are left to it until they go stale
+    assert redis.pending["3-0"][0] == "other"
@@ -0,0 +1,144 @@
+import re
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel
+
+EVM_ADDRESS_RE = re.compile(r"(?<![0-9a-zA-Z])0x[0-9a-fA-F]{40}(?![0-9a-zA-Z])")
+SOLANA_ADDRESS_RE = re.compile(
+    r"(?<![1-9A-HJ-NP-Za-km-z])[1-9A-HJ-NP-Za-km-z]{32,44}(?![1-9A-HJ-NP-Za-km-z])"
+)
+TICKER_RE = re.compile(r"(?<![\w$])\$([A-Za-z][A-Za-z0-9]{0,14})(?![\w])")
+DEXSCREENER_CHAIN_RE = re.compile(r"dexscreener\.com/([a-z]+)/", re.IGNORECASE)
+
+# Keyword -> network name, using the names the LLM is prompted to return
+NETWORK_KEYWORDS = [
+    (re.compile(r"\b(ethereum|eth chain|on eth|erc-?20|uniswap)\b", re.I), "Ethereum"),
+    (re.compile(r"\b(solana|sol chain|pump\.fun|raydium|jupiter)\b", re.I), "Solana"),
+    (re.compile(r"\b(bsc|bnb chain|bep-?20|pancakeswap)\b", re.I), "BSC"),
+    (re.compile(r"\b(base chain|on base|basechain|aerodrome)\b", re.I), "Base"),
+    (re.compile(r"\b(arbitrum|arb chain)\b", re.I), "Arbitrum"),
+    (re.compile(r"\b(polygon|matic chain)\b", re.I), "Polygon"),
+    (re.compile(r"\b(avalanche|avax chain)\b", re.I), "Avalanche"),
+]
+DEXSCREENER_CHAINS = {
+    "ethereum": "Ethereum",
+    "solana": "Solana",
+    "bsc": "BSC",
+    "base": "Base",
+    "arbitrum": "Arbitrum",
+    "polygon": "Polygon",
+    "avalanche": "Avalanche",
+}
+EVM_NETWORKS = {"Ethereum", "BSC", "Base", "Arbitrum", "Polygon", "Avalanche"}
+
+# Tickers that are usually mentioned as the quote side ("bought with 2 $SOL")
+QUOTE_TICKERS = {"SOL", "ETH", "WETH", "BTC", "BNB", "USD", "USDT", "USDC"}
+
+LONG_TERM_RE = re.compile(r"\b(hodl|long[ -]?term|hold for|accumulate)\b", re.I)
+
+# Negations and warnings: "$XYZ is a rug, avoid" names a token as plainly as
+# a call does, so such messages are left to the model
+WARNING_RE = re.compile(
+    r"\b(rug(s|ged|pull|pulled)?|rug pull(ed)?|scam(s|mer|mers|my)?|honey ?pot"
+    r"|avoid|stay away|beware|warning|fake|exploit(s|ed)?|hack(s|ed)?"
+    r"|drain(s|ed|er)?|dump(s|ed|ing)?|sell(ing)? now"
+    r"|(don['’]?t|do not|never|not) (buy|ape|touch|invest)"
+    r"|not (an? )?(alpha|call|buy))\b",
+    re.I,
+)
+
+Decision = Literal["skip", "local", "escalate"]
+
+
+class ExtractionResult(BaseModel):
+    decision: Decision
+    evm_addresses: List[str] = []
+    solana_addresses: List[str] = []
+    tickers: List[str] = []
+    networks: List[str] = []
+    analysis: Optional[Dict[str, Any]] = None
+
+
+def _unique(values) -> List[str]:
+    return list(dict.fromkeys(values))
+
+
+def _is_solana_address(candidate: str) -> bool:
+    # Plain words never reach 32 characters, but hashes and ids can;
+    # mints are mixed-case base58 with at least one digit.
+    return (
+        any(c.isdigit() for c in candidate)
+        and any(c.isupper() for c in candidate)
+        and any(c.islower() for c in candidate)
+    )
+
+
+def detect_networks(text: str) -> List[str]:
+    networks = [
+        DEXSCREENER_CHAINS[chain.lower()]
+        for chain in DEXSCREENER_CHAIN_RE.findall(text)
+        if chain.lower() in DEXSCREENER_CHAINS
+    ]
+    networks += [name for pattern, name in NETWORK_KEYWORDS if pattern.search(text)]
+    return _unique(networks)
+
+
+def extract_token_signals(text: Optional[str], has_image: bool = False):
+    """Deterministic pre-pass over a message before it is sent to the LLM.
+
+    Returns "skip" when there is nothing token-like to analyse, "local" with a
+    ready analysis result when the message names exactly one token and has
+    no negation or warning keywords, and "escalate" for everything that
+    needs the model to disambiguate.
+    """
+    text = text or ""
+    evm_addresses = _unique(EVM_ADDRESS_RE.findall(text))
+    # Checksummed EVM addresses contain base58-looking runs, so strip them first
+    solana_addresses = _unique(
+        a
+        for a in SOLANA_ADDRESS_RE.findall(EVM_ADDRESS_RE.sub(" ", text))
+        if _is_solana_address(a)
+    )
+    all_tickers = _unique(TICKER_RE.findall(text))
+    tickers = [t for t in all_tickers if t.upper() not in QUOTE_TICKERS]
+    networks = detect_networks(text)
+
+    result = ExtractionResult(
+        decision="escalate",
+        evm_addresses=evm_addresses,
+        solana_addresses=solana_addresses,
+        tickers=tickers,
+        networks=networks,
+    )
+
+    addresses = evm_addresses + solana_addresses
+    if not addresses and not all_tickers:
+        # A screenshot can still carry the call, so only text-only messages
+        # are dropped outright
+        result.decision = "escalate" if has_image else "skip"
+        return result
+
+    if len(addresses) > 1 or len(tickers) > 1 or WARNING_RE.search(text):
+        return result
+
+    network = None
+    if solana_addresses:
+        network = "Solana"
+    elif evm_addresses:
+        evm_networks = [n for n in networks if n in EVM_NETWORKS]
+        # Unknown EVM chain is fine; enrichment resolves it by address
+        network = evm_networks[0] if len(evm_networks) == 1 else None
+    elif tickers and len(networks) == 1:
+        network = networks[0]
+    else:
+        return result
+
+    result.decision = "local"
+    result.analysis = {
+        "is_alpha_call": True,
+        "token_ticker": tickers[0] if tickers else None,
+        "token_address": addresses[0] if addresses else None,
+        "network": network,
+        "additional_info": "Extracted from message text without LLM analysis",
+        "long_term": bool(LONG_TERM_RE.search(text)),
+    }
+    return result
@@ -0,0 +1,155 @@
+import json
+import time
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+from cachetools import LRUCache
+from db.db_operations import db_operations
+from lib.config import (
+    token_resolution_ttl,
+    token_resolution_negative_ttl,
+    token_resolution_l1_size,
+    dexscreener_api_url,
+)
+from lib.single_flight import SingleFlight
+from lib.http_client import http_client
+from lib import metrics
+
+logger = logging.getLogger(__name__)
+
+# Network names as we store them -> DexScreener chainId
+NETWORK_CHAIN_IDS = {
+    "ethereum": "ethereum",
+    "solana": "solana",
+    "bsc": "bsc",
+    "base": "base",
+    "arbitrum": "arbitrum",
+    "polygon": "polygon",
+    "avalanche": "avalanche",
+}
+
+
+def _pick_pair(pairs, query: str, network: Optional[str]):
+    chain_id = NETWORK_CHAIN_IDS.get((network or "").lower())
+    if chain_id:
+        pairs = [p for p in pairs if p.get("chainId") == chain_id] or pairs
+    # When searching by address, prefer a pair where it is the base token
+    return next(
+        (p for p in pairs if p["baseToken"]["address"].lower() == query.lower()),
+        pairs[0],
+    )
+
+
+async def fetch_token_info_from_dexscreener(query, network=None):
+    # Raises on upstream errors, so they are never cached as "not found"
+    data = await http_client.get_json(
+        f"{dexscreener_api_url}/latest/dex/search?q={quote(query)}"
+    )
+
+    if not data.get("pairs"):
+        return None
+
+    pair = _pick_pair(data["pairs"], query, network)
+    return {
+        "token_address": pair["baseToken"]["address"],
+        "token_name": pair["baseToken"]["name"],
+        "token_image": pair.get("info", {}).get("imageUrl"),
+        "network": (pair["chainId"].capitalize() if pair.get("chainId") else None),
+        "token_ticker": (
+            pair["baseToken"]["symbol"] if pair.get("baseToken") else query
+        ),
+    }
+
+
+class TokenResolver:
+    """Ticker/address -> token info, cached in process and in Redis.
+
+    Both found and not-found answers are cached, with separate TTLs, and
+    concurrent lookups of the same key share one upstream request.
+    """
+
+    def __init__(self, db, ttl: int, negative_ttl: int, l1_size: int):
+        self.db = db
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # key -> (expires_at, token_info or None)
+        self.l1: LRUCache = LRUCache(maxsize=l1_size)
+        self.single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(query: str, network: Optional[str]) -> str:
+        return f"token_resolution:{(network or '*').lower()}:{query}"
+
+    async def resolve(
+        self, query: str, network: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        key = self.make_key(query, network)
+
+        lookups = metrics.cache_lookups.labels
+        cached = self.l1.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.hits += 1
+            lookups(cache="token_resolution", result="l1_hit").inc()
+            return dict(cached[1]) if cached[1] else None
+
+        if self.db.redis:
+            try:
+                cached_data = await self.db.redis.get(key)
+                if cached_data:
+                    token_info = json.loads(cached_data)["token_info"]
+                    ttl = self.ttl if token_info else self.negative_ttl
+                    self.l1[key] = (time.monotonic() + ttl, token_info)
+                    self.hits += 1
+                    lookups(cache="token_resolution", result="l2_hit").inc()
+                    return dict(token_info) if token_info else None
+            except Exception as e:
+                logger.error(f"Token resolution cache error: {e}")
+
+        if self.single_flight.in_flight(key):
+            self.coalesced += 1
+            lookups(cache="token_resolution", result="coalesced").inc()
+        else:
+            self.misses += 1
+            lookups(cache="token_resolution", result="miss").inc()
+        try:
+            token_info = await self.single_flight.do(
+                key, lambda: self._lookup(key, query, network)
+            )
+        except Exception as e:
+            # Unlike "not found", a failed lookup is the caller's to retry
+            logger.error(f"Error resolving token {query}: {e}")
+            raise
+        return dict(token_info) if token_info else None
+
+    async def _lookup(self, key: str, query: str, network: Optional[str]):
+        token_info = await fetch_token_info_from_dexscreener(query, network)
+        ttl = self.ttl if token_info else self.negative_ttl
+        self.l1[key] = (time.monotonic() + ttl, token_info)
+        if self.db.redis:
+            try:
+                await self.db.redis.set(
+                    key, json.dumps({"token_info": token_info}), ex=ttl
+                )
+            except Exception as e:
+                logger.error(f"Failed to cache token resolution: {e}")
+        return token_info
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_resolver = TokenResolver(
+    db_operations.db,
+    ttl=token_resolution_ttl,
+    negative_ttl=token_resolution_negative_ttl,
+    l1_size=token_resolution_l1_size,
+)
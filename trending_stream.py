@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from fastapi.encoders import jsonable_encoder
+from db.db_operations import db_operations
+from lib.config import (
+    trending_stream_interval,
+    trending_stream_heartbeat,
+    trending_stream_queue_size,
+)
+from lib import metrics
+
+logger = logging.getLogger(__name__)
+
+# Fields whose changes are pushed for a token that stays on the board
+TRACKED_FIELDS = (
+    "mention_count",
+    "latest_date",
+    "token_name",
+    "token_image",
+    "pair",
+    "price",
+    "h24_change",
+    "h24_volume",
+)
+
+LeaderboardKey = Tuple[timedelta, int, str, str]
+
+
+def token_key(token: Dict[str, Any]) -> str:
+    return f"{token['network']}:{token.get('token_address') or token['token_ticker']}"
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def diff_tokens(
+    previous: List[Dict[str, Any]], current: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """What changed between two leaderboards, or None if nothing did.
+
+    `added` carries whole tokens with their rank, `removed` the keys that
+    left, and `updated` the new rank and changed fields of the others.
+    """
+    before = {token_key(token): (rank, token) for rank, token in enumerate(previous)}
+    after = {token_key(token): (rank, token) for rank, token in enumerate(current)}
+
+    added, updated = [], []
+    for key, (rank, token) in after.items():
+        if key not in before:
+            added.append({"key": key, "rank": rank + 1, "token": token})
+            continue
+        previous_rank, previous_token = before[key]
+        changes = {
+            field: token.get(field)
+            for field in TRACKED_FIELDS
+            if token.get(field) != previous_token.get(field)
+        }
+        if changes or rank != previous_rank:
+            updated.append(
+                {
+                    "key": key,
+                    "rank": rank + 1,
+                    "previous_rank": previous_rank + 1,
+                    "changes": changes,
+                }
+            )
+    removed = [key for key in before if key not in after]
+    if not (added or updated or removed):
+        return None
+    return {"added": added, "updated": updated, "removed": removed}
+
+
+class Leaderboard:
+    """One trending query recomputed for all of its subscribers.
+
+    Each recompute goes through `get_trending_tokens`, so it is served by
+    the trending caches. The event for a change is encoded once and put on
+    every subscriber's queue. A subscriber whose queue is full is dropped;
+    its client reconnects and gets a fresh snapshot. `failures` counts
+    consecutive failed recomputes; a failed one keeps the last board.
+    """
+
+    def __init__(self, key: LeaderboardKey, interval: float, queue_size: int):
+        self.key = key
+        self.interval = interval
+        self.queue_size = queue_size
+        self.subscribers: Set[asyncio.Queue] = set()
+        # Streams using this board, including those still waiting to subscribe
+        self.clients = 0
+        self.tokens: Optional[List[Dict[str, Any]]] = None
+        self.ready = asyncio.Event()
+        self.failures = 0
+        self.task: Optional[asyncio.Task] = None
+
+    async def compute(self) -> List[Dict[str, Any]]:
+        time_window, limit, sort_by, sort_order = self.key
+        tokens = await db_operations.token_repo.get_trending_tokens(
+            time_window,
+            limit=limit,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            # An empty list would be pushed as every token leaving the board
+            raise_errors=True,
+        )
+        return jsonable_encoder(tokens)
+
+    async def run(self):
+        while True:
+            try:
+                tokens = await self.compute()
+                self.failures = 0
+                if self.tokens is None:
+                    self.tokens = tokens
+                    self.ready.set()
+                else:
+                    changes = diff_tokens(self.tokens, tokens)
+                    self.tokens = tokens
+                    if changes:
+                        self.broadcast(sse_event("update", changes))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Error recomputing trending leaderboard: {e}")
+            await asyncio.sleep(self.interval)
+
+    def broadcast(self, event: bytes):
+        for queue in list(self.subscribers):
+            if queue.qsize() < self.queue_size:
+                queue.put_nowait(event)
+            else:
+                self.subscribers.discard(queue)
+                queue.put_nowait(None)  # room was kept for the close marker
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Whether the first compute finished within `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def subscribe(self) -> asyncio.Queue:
+        """A queue starting with the current snapshot; needs `ready`."""
+        # One slot more than data events, for the close marker
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size + 1)
+        queue.put_nowait(sse_event("snapshot", {"tokens": self.tokens}))
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+class TrendingHub:
+    """Leaderboards shared by the streams open on this worker."""
+
+    def __init__(self, interval: float, heartbeat: float, queue_size: int):
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self.leaderboards: Dict[LeaderboardKey, Leaderboard] = {}
+
+    async def stream(self, key: LeaderboardKey) -> AsyncIterator[bytes]:
+        """SSE bytes for one client: a snapshot, then updates and heartbeats."""
+        leaderboard = self.leaderboards.get(key)
+        if leaderboard is None:
+            leaderboard = Leaderboard(key, self.interval, self.queue_size)
+            self.leaderboards[key] = leaderboard
+
+        leaderboard.clients += 1
+        metrics.trending_streams.inc()
+        queue = None
+        try:
+            leaderboard.start()
+            while not await leaderboard.wait_ready(self.heartbeat):
+                if leaderboard.failures:
+                    # Still retrying; lets the client show why nothing arrived
+                    yield sse_event(
+                        "error",
+                        {
+                            "detail": "Trending tokens are unavailable, retrying",
+                            "failures": leaderboard.failures,
+                        },
+                    )
+                else:
+                    yield b": keepalive\n\n"
+            queue = leaderboard.subscribe()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing idle connections
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            leaderboard.clients -= 1
+            metrics.trending_streams.dec()
+            if queue is not None:
+                leaderboard.unsubscribe(queue)
+            if not leaderboard.clients and self.leaderboards.get(key) is leaderboard:
+                # Last subscriber gone; stop recomputing until someone returns
+                del self.leaderboards[key]
+                await leaderboard.stop()
+
+    async def stop(self):
+        leaderboards = list(self.leaderboards.values())
+        self.leaderboards.clear()
+        for leaderboard in leaderboards:
+            await leaderboard.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leaderboards": len(self.leaderboards),
+            "subscribers": sum(
+                len(leaderboard.subscribers)
+                for leaderboard in self.leaderboards.values()
+            ),
+        }
+
+
+trending_hub = TrendingHub(
+    interval=trending_stream_interval,
+    heartbeat=trending_stream_heartbeat,
+    queue_size=trending_stream_queue_size,
+)
@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from aioredis.exceptions import ResponseError
+from pydantic import BaseModel
+from lib.config import (
+    ingestion_stream,
+    ingestion_stream_group,
+    ingestion_stream_consumer,
+    ingestion_stream_dead_letter,
+    ingestion_stream_maxlen,
+    ingestion_stream_media_ttl,
+    ingestion_stream_read_count,
+    ingestion_stream_claim_idle_ms,
+    ingestion_stream_max_deliveries,
+    worker_index,
+)
+
+logger = logging.getLogger(__name__)
+
+# How long a consumer blocks on XREADGROUP before checking for stale entries
+READ_BLOCK_MS = 5000
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _next_id(entry_id: str) -> str:
+    """The smallest stream id after `entry_id`, to page inclusive ranges."""
+    ms, seq = entry_id.split("-")
+    return f"{ms}-{int(seq) + 1}"
+
+
+class MessageEnvelope(BaseModel):
+    """What the listener publishes for each received message."""
+
+    channel_id: int
+    message_id: int
+    text: Optional[str] = None
+    date: datetime
+    media_key: Optional[str] = None
+    chat_id: int
+    chat_title: Optional[str] = None
+    chat_username: Optional[str] = None
+
+
+class StreamMessage:
+    """Telethon-like message rebuilt from an envelope on a worker.
+
+    Media is read back from Redis, where the listener left it.
+    """
+
+    def __init__(self, envelope: MessageEnvelope, redis):
+        self.envelope = envelope
+        self.redis = redis
+        self.id = envelope.message_id
+        self.text = envelope.text
+        self.date = envelope.date
+        self.media = envelope.media_key
+        self.photo = envelope.media_key
+        self.document = None
+        self.peer_id = SimpleNamespace(channel_id=envelope.channel_id)
+
+    async def download_media(self, file=None):
+        if not self.envelope.media_key:
+            return None
+        return await self.redis.get(self.envelope.media_key)
+
+    async def get_chat(self):
+        return SimpleNamespace(
+            id=self.envelope.chat_id,
+            title=self.envelope.chat_title,
+            username=self.envelope.chat_username,
+        )
+
+
+StreamEntry = Tuple[str, StreamMessage]
+
+
+def default_consumer() -> str:
+    # Stable across restarts of a supervised worker; pid only as a last resort
+    if worker_index is not None:
+        return f"{socket.gethostname()}-worker-{worker_index}"
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class RedisStreamQueue:
+    """Message hand-off between the Telegram listener and analysis workers.
+
+    The listener XADDs one envelope per message. Workers on any node read
+    them through a consumer group and XACK once an entry is fully handled.
+    Entries left pending by a crashed or stuck worker are XCLAIMed by
+    another one after `claim_idle_ms`. Entries delivered `max_deliveries`
+    times are moved to a dead-letter stream instead of being retried.
+    """
+
+    def __init__(
+        self,
+        db,
+        stream: str = ingestion_stream,
+        group: str = ingestion_stream_group,
+        consumer: Optional[str] = None,
+        dead_letter_stream: str = ingestion_stream_dead_letter,
+        maxlen: int = ingestion_stream_maxlen,
+        media_ttl: int = ingestion_stream_media_ttl,
+        read_count: int = ingestion_stream_read_count,
+        claim_idle_ms: int = ingestion_stream_claim_idle_ms,
+        max_deliveries: int = ingestion_stream_max_deliveries,
+    ):
+        self.db = db
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or ingestion_stream_consumer or default_consumer()
+        self.dead_letter_stream = dead_letter_stream
+        self.maxlen = maxlen
+        self.media_ttl = media_ttl
+        self.read_count = read_count
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        # Entries handed to this process and not acked yet; never reclaimed
+        self.in_progress: Set[str] = set()
+        self.published = 0
+        self.consumed = 0
+        self.acked = 0
+        self.reclaimed = 0
+        self.dead_lettered = 0
+
+    @property
+    def redis(self):
+        return self.db.redis
+
+    async def publish(
+        self, message, chat, media: Optional[bytes] = None
+    ) -> Optional[str]:
+        channel_id = getattr(message.peer_id, "channel_id", None) or chat.id
+        media_key = None
+        if media:
+            media_key = f"{self.stream}:media:{channel_id}:{message.id}"
+            # Outlives the entry's expected processing time; a worker that
+            # finds it gone analyzes the text alone
+            await self.redis.set(media_key, media, ex=self.media_ttl)
+
+        envelope = MessageEnvelope(
+            channel_id=channel_id,
+            message_id=message.id,
+            text=message.text,
+            date=message.date,
+            media_key=media_key,
+            chat_id=chat.id,
+            chat_title=getattr(chat, "title", None),
+            chat_username=getattr(chat, "username", None),
+        )
+        entry_id = await self.redis.xadd(
+            self.stream,
+            {"envelope": envelope.model_dump_json()},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+        self.published += 1
+        return _decode(entry_id)
+
+    async def ensure_group(self):
+        try:
+            await self.redis.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _entry(self, entry_id, fields) -> Optional[StreamEntry]:
+        entry_id = _decode(entry_id)
+        fields = {_decode(key): value for key, value in fields.items()}
+        try:
+            envelope = MessageEnvelope.model_validate_json(fields["envelope"])
+        except Exception as e:
+            logger.error(f"Malformed stream entry {entry_id}: {e}")
+            return None
+        return entry_id, StreamMessage(envelope, self.redis)
+
+    async def consume(self, submit: Callable[[StreamEntry], Awaitable[Any]]):
+        """Feeds entries for this consumer to `submit` until cancelled.
+
+        `submit` should apply back-pressure (e.g. a bounded queue), since
+        entries are read as fast as it returns.
+        """
+        await self.ensure_group()
+        # Our own entries left pending by a previous run of this consumer
+        await self.recover(submit)
+        last_reclaim = time.monotonic()
+        while True:
+            try:
+                if time.monotonic() - last_reclaim >= self.claim_idle_ms / 1000 / 2:
+                    last_reclaim = time.monotonic()
+                    await self.reclaim(submit)
+                await self._read(submit, block=READ_BLOCK_MS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading from {self.stream}: {e}")
+                await asyncio.sleep(1)
+
+    async def _read(self, submit, block: Optional[int] = None):
+        """Reads one batch of entries never delivered to the group."""
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=self.read_count,
+            block=block,
+        )
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                await self._submit(entry_id, fields, submit)
+
+    async def _submit(self, entry_id, fields, submit):
+        entry = self._entry(entry_id, fields)
+        if entry is None:
+            await self.dead_letter(_decode(entry_id), fields, "malformed envelope")
+            return
+        self.consumed += 1
+        self.in_progress.add(entry[0])
+        await submit(entry)
+
+    async def _pending(self, consumer: Optional[str] = None):
+        """Pages through the group's pending entries, or one consumer's."""
+        start = "-"
+        while True:
+            page = await self.redis.xpending_range(
+                self.stream,
+                self.group,
+                start,
+                "+",
+                self.read_count,
+                consumername=consumer,
+            )
+            if page:
+                yield page
+            if len(page) < self.read_count:
+                return
+            start = _next_id(_decode(page[-1]["message_id"]))
+
+    async def recover(self, submit):
+        """Resubmits the entries a previous run of this consumer left pending.
+
+        They go through the same delivery count check as reclaimed ones, so
+        an entry that crashes the worker is dead-lettered instead of being
+        read again on every restart.
+        """
+        async for pending in self._pending(self.consumer):
+            await self._claim(pending, 0, submit)
+
+    async def reclaim(self, submit):
+        try:
+            async for pending in self._pending():
+                stale = [
+                    entry
+                    for entry in pending
+                    if entry["time_since_delivered"] >= self.claim_idle_ms
+                    and _decode(entry["message_id"]) not in self.in_progress
+                ]
+                if stale:
+                    await self._claim(stale, self.claim_idle_ms, submit)
+        except Exception as e:
+            logger.error(f"Error reclaiming pending entries: {e}")
+
+    async def _claim(self, pending, min_idle_time: int, submit):
+        deliveries = {
+            _decode(entry["message_id"]): entry["times_delivered"]
+            for entry in pending
+        }
+        claimed = await self.redis.xclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time,
+            list(deliveries),
+        )
+        for entry_id, fields in claimed:
+            if entry_id is None:
+                continue
+            entry_id = _decode(entry_id)
+            if not fields:
+                # Trimmed from the stream while pending
+                await self.redis.xack(self.stream, self.group, entry_id)
+            elif deliveries.get(entry_id, 0) >= self.max_deliveries:
+                await self.dead_letter(
+                    entry_id, fields, f"delivered {deliveries[entry_id]} times"
+                )
+            else:
+                self.reclaimed += 1
+                await self._submit(entry_id, fields, submit)
+
+    async def ack(self, entry_id: str, message: Optional[StreamMessage] = None):
+        self.in_progress.discard(entry_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(self.stream, self.group, entry_id)
+        if message is not None and message.envelope.media_key:
+            pipe.delete(message.envelope.media_key)
+        await pipe.execute()
+        self.acked += 1
+
+    def release(self, entry_id: str):
+        """Leave a failed entry pending so it is retried or dead-lettered."""
+        self.in_progress.discard(entry_id)
+
+    async def dead_letter(self, entry_id: str, fields: Dict, reason: str):
+        logger.error(f"Dead-lettering stream entry {entry_id}: {reason}")
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(
+            self.dead_letter_stream,
+            {**fields, "entry_id": entry_id, "reason": reason},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+        pipe.xack(self.stream, self.group, entry_id)
+        await pipe.execute()
+        self.dead_lettered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "consumer": self.consumer,
+            "published": self.published,
+            "consumed": self.consumed,
+            "acked": self.acked,
+            "reclaimed": self.reclaimed,
+            "dead_lettered": self.dead_lettered,
+            "in_progress": len(self.in_progress),
+        }